@@ -24,6 +24,8 @@ if ($_SERVER['REQUEST_METHOD'] === 'OPTIONS') {
 // 설정
 define('OLLAMA_API', 'http://localhost:11434');
 define('SD_API', 'http://localhost:7861');
+define('POSE_API', 'http://127.0.0.1:7870');
+define('TTS_API', 'http://127.0.0.1:7880');
 define('PYTHON_PATH', 'C:\\xampp\\htdocs\\ai_test_sec\\venv\\Scripts\\python.exe');
 define('SCRIPT_PATH', 'C:\\xampp\\htdocs\\ai_test_sec\\scripts');
 define('UPLOAD_PATH', 'C:\\xampp\\htdocs\\ai_test_sec\\uploads');
@@ -118,78 +120,86 @@ function chat_with_ollama($message, $model = 'phi3:mini') {
 }
 
 /**
- * 카메라 포즈 감지 (고도화 버전)
+ * 업로드된 이미지 원본 바이트 읽기
+ * - multipart 파일 필드 (바이너리 전송, 권장)
+ * - base64 data URL 문자열 (이전 클라이언트 호환)
+ */
+function read_image_input($field = 'image') {
+    if (isset($_FILES[$field]) && $_FILES[$field]['error'] === UPLOAD_ERR_OK) {
+        return file_get_contents($_FILES[$field]['tmp_name']);
+    }
+
+    $image_data = $_POST[$field] ?? '';
+    if (empty($image_data)) {
+        return false;
+    }
+
+    $image_parts = explode(',', $image_data);
+    $image_base64 = isset($image_parts[1]) ? $image_parts[1] : $image_data;
+    return base64_decode($image_base64);
+}
+
+/**
+ * 카메라 포즈 감지 (고도화 버전) - base64 입력
  */
 function detect_pose($image_data, $advanced = true, $draw_hands = true, $draw_face = true, $external_transaction = null) {
+    $image_parts = explode(',', $image_data);
+    $image_base64 = isset($image_parts[1]) ? $image_parts[1] : $image_data;
+    $decoded = base64_decode($image_base64);
+
+    if ($decoded === false) {
+        if ($external_transaction !== null) {
+            throw new Exception('이미지 디코딩 실패');
+        }
+        return ['success' => false, 'error' => '이미지 디코딩 실패'];
+    }
+
+    return detect_pose_bytes($decoded, $advanced, $draw_hands, $draw_face, $external_transaction);
+}
+
+/**
+ * 카메라 포즈 감지 (고도화 버전) - 이미지 원본 바이트 입력
+ * 데몬이 실행 중이면 바이트를 그대로 전달하고 (임시 파일/base64 없음),
+ * 아니면 임시 파일 + Python 스크립트 실행으로 처리
+ * $skeleton_format: 'mediapipe' (기본 스켈레톤) 또는 'openpose' (ControlNet OpenPose 컬러 맵)
+ */
+function detect_pose_bytes($image_bytes, $advanced = true, $draw_hands = true, $draw_face = true, $external_transaction = null, $skeleton_format = 'mediapipe') {
     // 외부 트랜잭션이 있으면 사용, 없으면 새로 생성
     $transaction = $external_transaction ?? new FileTransaction();
     $is_own_transaction = ($external_transaction === null);
 
     try {
         $timestamp = time();
-        $temp_image = UPLOAD_PATH . "/webcam_$timestamp.jpg";
         $skeleton_image = OUTPUT_PATH . "/skeleton_$timestamp.png";
 
-        // Base64 이미지 저장
-        $image_parts = explode(',', $image_data);
-        $image_base64 = isset($image_parts[1]) ? $image_parts[1] : $image_data;
-        $decoded = base64_decode($image_base64);
-
-        if ($decoded === false) {
-            throw new Exception('이미지 디코딩 실패');
-        }
-
-        file_put_contents($temp_image, $decoded);
-        $transaction->addFile($temp_image);
-
-        // Python 스크립트 선택 (고도화 버전 또는 기본 버전)
-        $script = $advanced ?
-            SCRIPT_PATH . '\\camera_detect_advanced.py' :
-            SCRIPT_PATH . '\\camera_detect.py';
-
         // 고도화 버전 옵션
-        $options = json_encode([
+        $options = [
             'draw_hands' => $draw_hands,
             'draw_face' => $draw_face,
             'colorful' => false,
-            'min_quality' => 30.0
-        ]);
+            'min_quality' => 30.0,
+            'skeleton_format' => $skeleton_format,
+            // 응답에는 파일 경로만 사용하므로 base64 인코딩 생략
+            'render' => 'file'
+        ];
 
+        $result = null;
         if ($advanced) {
-            $command = '"' . PYTHON_PATH . '" "' . $script . '" file "' . $temp_image . '" "' . $skeleton_image . '" \'' . addslashes($options) . '\' 2>&1';
-        } else {
-            $command = '"' . PYTHON_PATH . '" "' . $script . '" file "' . $temp_image . '" "' . $skeleton_image . '" 2>&1';
+            $result = pose_server_binary_request('/detect/binary', $image_bytes, [
+                'output' => $skeleton_image,
+                'options' => json_encode($options)
+            ]);
         }
 
-        exec($command, $output, $return_var);
+        if ($result === null) {
+            $result = run_pose_script($image_bytes, $advanced, $options, $skeleton_image, $transaction);
+        }
 
         // skeleton_image가 생성되었다면 트랜잭션에 추가
         if (file_exists($skeleton_image)) {
             $transaction->addFile($skeleton_image);
         }
 
-        // Filter out non-JSON lines (like TensorFlow INFO messages)
-        $json_lines = [];
-        foreach ($output as $line) {
-            $trimmed = trim($line);
-            if (!empty($trimmed) && strlen($trimmed) > 0) {
-                $first_char = $trimmed[0];
-                if ($first_char === '{' || $first_char === '[') {
-                    $json_lines[] = $line;
-                }
-            }
-        }
-
-        $output_str = implode("\n", $json_lines);
-
-        // JSON 파싱
-        $result = json_decode($output_str, true);
-
-        // JSON 파싱 실패 시 원본 출력 반환
-        if (json_last_error() !== JSON_ERROR_NONE) {
-            throw new Exception("JSON 파싱 실패: " . $output_str);
-        }
-
         if ($result && isset($result['success']) && $result['success']) {
             // 자체 트랜잭션일 때만 커밋
             if ($is_own_transaction) {
@@ -202,7 +212,7 @@ function detect_pose($image_data, $advanced = true, $draw_hands = true, $draw_fa
                 'message' => '포즈 감지 성공'
             ];
         } else {
-            $error = $result['error'] ?? $output_str;
+            $error = $result['error'] ?? '알 수 없는 오류';
             throw new Exception("포즈 감지 실패: $error");
         }
     } catch (Exception $e) {
@@ -216,10 +226,200 @@ function detect_pose($image_data, $advanced = true, $draw_hands = true, $draw_fa
     }
 }
 
+/**
+ * 포즈 감지 Python 스크립트 실행 (데몬 미실행 또는 기본 버전)
+ */
+function run_pose_script($image_bytes, $advanced, $options, $skeleton_image, $transaction) {
+    $timestamp = time();
+    $temp_image = UPLOAD_PATH . "/webcam_$timestamp.jpg";
+
+    file_put_contents($temp_image, $image_bytes);
+    $transaction->addFile($temp_image);
+
+    // Python 스크립트 선택 (고도화 버전 또는 기본 버전)
+    // 고도화 버전은 씬 클라이언트 → pose_server.py 데몬 (미실행 시 직접 처리)
+    $script = $advanced ?
+        SCRIPT_PATH . '\\pose_client.py' :
+        SCRIPT_PATH . '\\camera_detect.py';
+
+    if ($advanced) {
+        $command = '"' . PYTHON_PATH . '" "' . $script . '" file "' . $temp_image . '" "' . $skeleton_image . '" \'' . addslashes(json_encode($options)) . '\' 2>&1';
+    } else {
+        $command = '"' . PYTHON_PATH . '" "' . $script . '" file "' . $temp_image . '" "' . $skeleton_image . '" 2>&1';
+    }
+
+    exec($command, $output, $return_var);
+
+    // Filter out non-JSON lines (like TensorFlow INFO messages)
+    $json_lines = [];
+    foreach ($output as $line) {
+        $trimmed = trim($line);
+        if (!empty($trimmed) && strlen($trimmed) > 0) {
+            $first_char = $trimmed[0];
+            if ($first_char === '{' || $first_char === '[') {
+                $json_lines[] = $line;
+            }
+        }
+    }
+
+    $output_str = implode("\n", $json_lines);
+
+    // JSON 파싱
+    $result = json_decode($output_str, true);
+
+    // JSON 파싱 실패 시 원본 출력 반환
+    if (json_last_error() !== JSON_ERROR_NONE) {
+        throw new Exception("JSON 파싱 실패: " . $output_str);
+    }
+
+    return $result;
+}
+
+/**
+ * 포즈 감지 데몬 (pose_server.py) 호출
+ */
+function pose_server_request($path, $payload, $timeout = 30) {
+    $ch = curl_init(POSE_API . $path);
+    curl_setopt($ch, CURLOPT_RETURNTRANSFER, true);
+    curl_setopt($ch, CURLOPT_POST, true);
+    curl_setopt($ch, CURLOPT_POSTFIELDS, json_encode($payload));
+    curl_setopt($ch, CURLOPT_HTTPHEADER, ['Content-Type: application/json']);
+    curl_setopt($ch, CURLOPT_TIMEOUT, $timeout);
+
+    $response = curl_exec($ch);
+
+    if (curl_errno($ch)) {
+        $error = curl_error($ch);
+        curl_close($ch);
+        return ['success' => false, 'error' => "포즈 감지 데몬 연결 실패: $error"];
+    }
+
+    curl_close($ch);
+
+    $result = json_decode($response, true);
+    if (!is_array($result)) {
+        return ['success' => false, 'error' => '포즈 감지 데몬 응답 형식 오류'];
+    }
+    return $result;
+}
+
+/**
+ * 포즈 감지 데몬에 이미지 원본 바이트 전달 (옵션은 쿼리 문자열)
+ * 데몬에 연결할 수 없으면 null 반환 (호출 측에서 대체 경로 사용)
+ */
+function pose_server_binary_request($path, $image_bytes, $params = [], $timeout = 60) {
+    $ch = curl_init(POSE_API . $path . '?' . http_build_query($params));
+    curl_setopt($ch, CURLOPT_RETURNTRANSFER, true);
+    curl_setopt($ch, CURLOPT_POST, true);
+    curl_setopt($ch, CURLOPT_POSTFIELDS, $image_bytes);
+    curl_setopt($ch, CURLOPT_HTTPHEADER, ['Content-Type: application/octet-stream', 'Accept: application/json']);
+    curl_setopt($ch, CURLOPT_CONNECTTIMEOUT, 2);
+    curl_setopt($ch, CURLOPT_TIMEOUT, $timeout);
+
+    $response = curl_exec($ch);
+    $errno = curl_errno($ch);
+
+    if ($errno) {
+        $error = curl_error($ch);
+        curl_close($ch);
+        if ($errno === CURLE_COULDNT_CONNECT) {
+            return null;
+        }
+        return ['success' => false, 'error' => "포즈 감지 데몬 오류: $error"];
+    }
+
+    curl_close($ch);
+
+    $result = json_decode($response, true);
+    if (!is_array($result)) {
+        return ['success' => false, 'error' => '포즈 감지 데몬 응답 형식 오류'];
+    }
+    return $result;
+}
+
+/**
+ * SD WebUI 백엔드 주소 목록 (config.json의 sd_backends, 없으면 SD_API)
+ * 실제 요청 분산은 Python 쪽 백엔드 풀(sd_backends.py)이 담당
+ */
+function sd_backend_urls() {
+    $config_file = dirname(__DIR__) . '/config.json';
+    $config = file_exists($config_file) ? json_decode(file_get_contents($config_file), true) : null;
+    $urls = [];
+    foreach (($config['sd_backends'] ?? []) as $backend) {
+        $url = is_array($backend) ? ($backend['url'] ?? '') : $backend;
+        if ($url) {
+            $urls[] = rtrim($url, '/');
+        }
+    }
+    return $urls ?: [SD_API];
+}
+
+/**
+ * 스트리밍 세션 모션 게이트 임계값 (config.json의 pose_motion_threshold, pose_empty_threshold)
+ * 설정하지 않은 값은 데몬 기본값 사용
+ */
+function pose_stream_options() {
+    $config_file = dirname(__DIR__) . '/config.json';
+    $config = file_exists($config_file) ? json_decode(file_get_contents($config_file), true) : null;
+    $options = [];
+    if (isset($config['pose_motion_threshold'])) {
+        $options['motion_threshold'] = (float)$config['pose_motion_threshold'];
+    }
+    if (isset($config['pose_empty_threshold'])) {
+        $options['empty_threshold'] = (float)$config['pose_empty_threshold'];
+    }
+    return $options;
+}
+
+/**
+ * 스트리밍 포즈 감지 (라이브 프리뷰)
+ * 세션마다 추적 모드 Holistic이 데몬에 유지됨
+ * 움직임이 없는 프레임은 데몬이 이전 랜드마크를 재사용 (응답의 gate: infer/reuse/empty)
+ * best: 최근 프레임 중 포즈 품질이 가장 높은 프레임 번호 (연속 촬영 후 캡처할 프레임 선택)
+ * $render = 'none'이면 스켈레톤/랜드마크 없이 품질 점수만 반환
+ */
+function pose_stream($command, $session_id = '', $image_bytes = '', $draw_hands = true, $draw_face = true, $render = 'both') {
+    switch ($command) {
+        case 'open':
+            $request = ['session_id' => $session_id ?: null];
+            $options = pose_stream_options();
+            if ($options) {
+                $request['options'] = $options;
+            }
+            return pose_server_request('/stream/open', $request);
+
+        case 'frame':
+            $options = [
+                'draw_hands' => $draw_hands,
+                'draw_face' => $draw_face,
+                'colorful' => false,
+                'render' => $render
+            ];
+            if ($render === 'none') {
+                $options['landmarks_format'] = 'none';
+            }
+            $result = pose_server_binary_request('/stream/frame/binary', $image_bytes, [
+                'session_id' => $session_id,
+                'options' => json_encode($options)
+            ], 10);
+            return $result ?? ['success' => false, 'error' => '포즈 감지 데몬 연결 실패'];
+
+        case 'best':
+            return pose_server_request('/stream/best', ['session_id' => $session_id]);
+
+        case 'close':
+            return pose_server_request('/stream/close', ['session_id' => $session_id]);
+
+        default:
+            return ['success' => false, 'error' => '유효하지 않은 스트림 명령'];
+    }
+}
+
 /**
  * 이미지 생성
+ * 같은 요청은 outputs/cache/images의 캐시된 이미지를 사용 ($no_cache = true면 새로 생성)
  */
-function generate_image($prompt, $skeleton_path = null, $mode = 'simple', $external_transaction = null) {
+function generate_image($prompt, $skeleton_path = null, $mode = 'simple', $external_transaction = null, $no_cache = false) {
     // 외부 트랜잭션이 있으면 사용, 없으면 새로 생성
     $transaction = $external_transaction ?? new FileTransaction();
     $is_own_transaction = ($external_transaction === null);
@@ -230,10 +430,11 @@ function generate_image($prompt, $skeleton_path = null, $mode = 'simple', $exter
 
         $script = SCRIPT_PATH . '\\image_generate.py';
 
+        $cache_flag = $no_cache ? ' --no-cache' : '';
         if ($mode === 'controlnet' && $skeleton_path) {
-            $command = '"' . PYTHON_PATH . '" "' . $script . '" controlnet "' . $prompt . '" "' . $skeleton_path . '" "' . $output_image . '" 2>&1';
+            $command = '"' . PYTHON_PATH . '" "' . $script . '" controlnet "' . $prompt . '" "' . $skeleton_path . '" "' . $output_image . '"' . $cache_flag . ' 2>&1';
         } else {
-            $command = '"' . PYTHON_PATH . '" "' . $script . '" simple "' . $prompt . '" "' . $output_image . '" 2>&1';
+            $command = '"' . PYTHON_PATH . '" "' . $script . '" simple "' . $prompt . '" "' . $output_image . '"' . $cache_flag . ' 2>&1';
         }
 
         exec($command, $output, $return_var);
@@ -291,13 +492,21 @@ function generate_image($prompt, $skeleton_path = null, $mode = 'simple', $exter
 
 /**
  * 포즈 기반 이미지 생성 (통합)
+ * 고도화 버전은 pose_pipeline.py 한 번으로 처리 (감지 중에 SD 요청 준비, 스켈레톤은 메모리로 전달)
+ * - 데몬 실행 중: POST /pipeline (모델 로드 없음)
+ * - 데몬 미실행: pose_pipeline.py CLI (프로세스 하나)
  */
-function generate_pose_image($image_data, $prompt, $advanced = true, $draw_hands = true, $draw_face = true) {
+function generate_pose_image($image_bytes, $prompt, $advanced = true, $draw_hands = true, $draw_face = true) {
+    if ($advanced) {
+        return run_pose_pipeline($image_bytes, $prompt, $draw_hands, $draw_face);
+    }
+
     $transaction = new FileTransaction();
 
     try {
         // 1. 포즈 감지 (고도화 버전) - 트랜잭션 전달
-        $pose_result = detect_pose($image_data, $advanced, $draw_hands, $draw_face, $transaction);
+        // ControlNet에 바로 넣을 수 있도록 OpenPose 컬러 맵으로 렌더링
+        $pose_result = detect_pose_bytes($image_bytes, $advanced, $draw_hands, $draw_face, $transaction, 'openpose');
 
         if (!$pose_result['success']) {
             throw new Exception($pose_result['error']);
@@ -326,6 +535,335 @@ function generate_pose_image($image_data, $prompt, $advanced = true, $draw_hands
     }
 }
 
+/**
+ * 포즈 감지 + 이미지 생성 파이프라인 (pose_pipeline.py)
+ */
+function run_pose_pipeline($image_bytes, $prompt, $draw_hands = true, $draw_face = true) {
+    $transaction = new FileTransaction();
+
+    try {
+        $timestamp = time() . '_' . rand(1000, 9999);
+        $skeleton_image = OUTPUT_PATH . "/skeleton_$timestamp.png";
+        $output_image = OUTPUT_PATH . "/generated_$timestamp.png";
+        $options = json_encode([
+            'draw_hands' => (bool)$draw_hands,
+            'draw_face' => (bool)$draw_face,
+            'min_quality' => 30.0
+        ]);
+
+        $result = pose_server_binary_request('/pipeline', $image_bytes, [
+            'prompt' => $prompt,
+            'output' => $skeleton_image,
+            'image_output' => $output_image,
+            'options' => $options
+        ], 320);
+
+        if ($result === null) {
+            // 데몬 미실행: 입력 이미지를 임시 파일로 넘겨 CLI 실행
+            $temp_image = UPLOAD_PATH . "/webcam_$timestamp.jpg";
+            file_put_contents($temp_image, $image_bytes);
+            $transaction->addFile($temp_image);
+
+            $command = '"' . PYTHON_PATH . '" "' . SCRIPT_PATH . '\\pose_pipeline.py"';
+            foreach ([$temp_image, $prompt, $skeleton_image, $output_image, $options] as $arg) {
+                $command .= ' ' . escapeshellarg($arg);
+            }
+            exec($command . ' 2>&1', $output, $return_var);
+
+            $json_lines = [];
+            foreach ($output as $line) {
+                $trimmed = trim($line);
+                if ($trimmed !== '' && ($trimmed[0] === '{' || $trimmed[0] === '[')) {
+                    $json_lines[] = $line;
+                }
+            }
+            $output_str = implode("\n", $json_lines);
+            $result = json_decode($output_str, true);
+            if (!is_array($result)) {
+                throw new Exception("JSON 파싱 실패: " . implode("\n", $output));
+            }
+        }
+
+        foreach ([$skeleton_image, $output_image] as $file) {
+            if (file_exists($file)) {
+                $transaction->addFile($file);
+            }
+        }
+
+        if (empty($result['success'])) {
+            throw new Exception($result['error'] ?? '알 수 없는 오류');
+        }
+
+        $transaction->commit();
+        // 입력 이미지 임시 파일은 커밋 후에도 필요 없으므로 삭제
+        if (isset($temp_image) && file_exists($temp_image)) {
+            unlink($temp_image);
+        }
+
+        return [
+            'success' => true,
+            'skeleton_url' => '/ai_test_sec/outputs/' . basename($skeleton_image),
+            'image_url' => '/ai_test_sec/outputs/' . basename($output_image),
+            'pose_quality' => $result['pose_quality'] ?? null,
+            'message' => '포즈 기반 이미지 생성 완료'
+        ];
+    } catch (Exception $e) {
+        $transaction->rollback();
+        return ['success' => false, 'error' => $e->getMessage()];
+    }
+}
+
+/**
+ * 이미지 생성 작업 큐 (generation_queue.py) 명령 실행
+ * enqueue/status는 SD를 호출하지 않으므로 바로 반환됨
+ */
+function queue_command($args) {
+    $command = '"' . PYTHON_PATH . '" "' . SCRIPT_PATH . '\\generation_queue.py"';
+    foreach ($args as $arg) {
+        $command .= ' ' . escapeshellarg((string)$arg);
+    }
+    return $command . ' 2>&1';
+}
+
+function run_queue_command($args) {
+    exec(queue_command($args), $output, $return_var);
+
+    // JSON 줄만 사용
+    $json_lines = [];
+    foreach ($output as $line) {
+        $trimmed = trim($line);
+        if ($trimmed !== '' && ($trimmed[0] === '{' || $trimmed[0] === '[')) {
+            $json_lines[] = $line;
+        }
+    }
+
+    $output_str = implode("\n", $json_lines);
+    $result = json_decode($output_str, true);
+    if (!is_array($result)) {
+        return ['success' => false, 'error' => '작업 큐 응답 형식 오류: ' . implode("\n", $output)];
+    }
+    return $result;
+}
+
+/**
+ * 이미지 생성 작업 등록 (비동기)
+ * 작업 ID를 바로 반환하고, 생성은 generation_queue.py worker가 처리
+ * client_id가 같은 키오스크의 같은 요청이 처리 중이면 기존 작업을 반환 (duplicate: true)
+ * 실행 중인 워커가 없으면 작업을 취소하고 바로 생성 (generate_job_sync, job_id 없이 image_url 반환)
+ */
+function enqueue_image($prompt, $skeleton_path = null, $mode = 'simple', $no_cache = false, $client_id = null) {
+    $output_image = OUTPUT_PATH . '/generated_' . uniqid() . '.png';
+    $args = [
+        'enqueue', $mode, $prompt, $output_image,
+        ($mode === 'controlnet' && $skeleton_path) ? $skeleton_path : '',
+        json_encode(['no_cache' => (bool)$no_cache]),
+        $client_id ?? ''
+    ];
+
+    $result = run_queue_command($args);
+    if (empty($result['success'])) {
+        return ['success' => false, 'error' => '작업 등록 실패: ' . ($result['error'] ?? '알 수 없는 오류')];
+    }
+
+    if (isset($result['worker_alive']) && !$result['worker_alive']) {
+        $sync_result = generate_job_sync($result);
+        if ($sync_result !== null) {
+            return $sync_result;
+        }
+    }
+
+    return [
+        'success' => true,
+        'job_id' => $result['job_id'],
+        'status' => $result['status'],
+        'position' => $result['position'] ?? null,
+        'duplicate' => !empty($result['duplicate'])
+    ];
+}
+
+/**
+ * 워커 없이 작업을 바로 생성 (워커가 없을 때의 대체 경로)
+ * 대기 중인 작업을 취소한 뒤 같은 프롬프트/스켈레톤으로 generate_image 실행
+ * 취소 전에 워커가 작업을 가져갔으면 null (계속 작업 결과를 기다리면 됨)
+ */
+function generate_job_sync($job) {
+    $cancel = run_queue_command(['cancel', $job['job_id']]);
+    if (empty($cancel['success'])) {
+        return null;
+    }
+
+    $result = generate_image(
+        $job['prompt'], $job['skeleton_path'] ?? null, $job['mode'], null,
+        !empty($job['params']['no_cache'])
+    );
+    $result['sync'] = true;
+    return $result;
+}
+
+/**
+ * 키오스크가 작업을 기다리는 중 워커가 없어진 경우 (job_fallback)
+ * 작업이 이미 실행 중이거나 끝났으면 현재 상태를 그대로 반환
+ */
+function fallback_job($job_id) {
+    $result = run_queue_command(['status', $job_id]);
+    if (empty($result['success'])) {
+        return $result;
+    }
+    if ($result['status'] === 'queued') {
+        $sync_result = generate_job_sync($result);
+        if ($sync_result !== null) {
+            return $sync_result;
+        }
+        $result = run_queue_command(['status', $job_id]);
+        if (empty($result['success'])) {
+            return $result;
+        }
+    }
+    return job_response($result);
+}
+
+/**
+ * 작업 딕셔너리 → API 응답 (status, watch 공용)
+ * progress: 0~1, eta: 남은 초, preview_url: 생성 중 미리보기 (WebUI 라이브 미리보기 사용 시)
+ */
+function job_response($result) {
+    $response = [
+        'success' => true,
+        'job_id' => $result['job_id'],
+        'status' => $result['status'],
+        'position' => $result['position'] ?? null,
+        'progress' => $result['progress'] ?? null,
+        'eta' => $result['eta'] ?? null,
+        'worker_alive' => $result['worker_alive'] ?? null
+    ];
+
+    if (!empty($result['preview_path'])) {
+        // 같은 파일을 덮어쓰므로 브라우저 캐시를 피하도록 갱신 시각을 붙임
+        $response['preview_url'] = '/ai_test_sec/outputs/previews/' . basename($result['preview_path'])
+            . '?t=' . rawurlencode((string)($result['updated_at'] ?? time()));
+    }
+
+    if ($result['status'] === 'done') {
+        $response['image_url'] = '/ai_test_sec/outputs/' . basename($result['output_path']);
+    } elseif ($result['status'] === 'failed') {
+        $response['error'] = '이미지 생성 실패: ' . $result['error'];
+    }
+    return $response;
+}
+
+/**
+ * 이미지 생성 작업 상태 조회
+ * status: queued, running, done, failed
+ */
+function job_status($job_id) {
+    $result = run_queue_command(['status', $job_id]);
+    if (empty($result['success'])) {
+        return $result;
+    }
+    return job_response($result);
+}
+
+/**
+ * 작업 진행 상황 SSE 스트림
+ * generation_queue.py watch 프로세스 하나가 상태가 바뀔 때마다 출력하는 줄을 그대로 이벤트로 중계
+ * (요청마다 Python을 새로 띄우는 폴링보다 가벼움)
+ *
+ * 이벤트: progress (queued/running), done, failed, error (작업 없음 등)
+ */
+function stream_job_events($job_id) {
+    header('Content-Type: text/event-stream; charset=utf-8');
+    header('Cache-Control: no-cache');
+    header('X-Accel-Buffering: no');
+    set_time_limit(0);
+    while (ob_get_level() > 0) {
+        ob_end_flush();
+    }
+
+    $send = function ($event, $data) {
+        echo "event: $event\n";
+        echo 'data: ' . json_encode($data, JSON_UNESCAPED_UNICODE) . "\n\n";
+        flush();
+    };
+
+    $handle = popen(queue_command(['watch', $job_id]), 'r');
+    if ($handle === false) {
+        $send('error', ['success' => false, 'error' => '작업 큐 실행 실패']);
+        return;
+    }
+
+    while (($line = fgets($handle)) !== false) {
+        $trimmed = trim($line);
+        if ($trimmed === '' || $trimmed[0] !== '{') {
+            continue;
+        }
+        $result = json_decode($trimmed, true);
+        if (!is_array($result)) {
+            continue;
+        }
+        if (empty($result['success'])) {
+            $send('error', $result);
+            break;
+        }
+
+        $response = job_response($result);
+        $status = $response['status'];
+        $send(($status === 'done' || $status === 'failed') ? $status : 'progress', $response);
+
+        if (connection_aborted()) {
+            break;
+        }
+    }
+    pclose($handle);
+}
+
+/**
+ * 포즈 기반 이미지 생성 (비동기)
+ * 포즈 감지는 바로 처리하고 (데몬 사용 시 빠름), 이미지 생성은 작업 큐에 등록
+ */
+function enqueue_pose_image($image_bytes, $prompt, $advanced = true, $draw_hands = true, $draw_face = true, $client_id = null) {
+    $transaction = new FileTransaction();
+
+    try {
+        $pose_result = detect_pose_bytes($image_bytes, $advanced, $draw_hands, $draw_face, $transaction, 'openpose');
+
+        if (!$pose_result['success']) {
+            throw new Exception($pose_result['error']);
+        }
+
+        $job = enqueue_image($prompt, $pose_result['skeleton_path'], 'controlnet', false, $client_id);
+        if (!$job['success']) {
+            throw new Exception($job['error']);
+        }
+
+        // 스켈레톤은 워커가 읽어야 하므로 작업 등록 후 커밋
+        $transaction->commit();
+
+        if (!isset($job['job_id'])) {
+            // 워커가 없어 바로 생성한 경우
+            return [
+                'success' => true,
+                'skeleton_url' => $pose_result['skeleton_url'],
+                'image_url' => $job['image_url'],
+                'sync' => true,
+                'message' => '포즈 기반 이미지 생성 완료'
+            ];
+        }
+
+        return [
+            'success' => true,
+            'skeleton_url' => $pose_result['skeleton_url'],
+            'job_id' => $job['job_id'],
+            'status' => $job['status'],
+            'position' => $job['position'],
+            'duplicate' => $job['duplicate'],
+            'message' => '포즈 감지 완료, 이미지 생성 대기 중'
+        ];
+    } catch (Exception $e) {
+        $transaction->rollback();
+        return ['success' => false, 'error' => $e->getMessage()];
+    }
+}
+
 /**
  * TTS (Text-to-Speech) - 텍스트를 음성으로 변환
  */
@@ -378,6 +916,11 @@ function text_to_speech($text) {
             throw new Exception("TTS 서비스 오류: " . $output_str);
         }
 
+        // Piper 백엔드는 확장자가 .wav로 바뀌므로 실제 경로도 트랜잭션에 추가
+        if (!empty($result['audio_path'])) {
+            $transaction->addFile($result['audio_path']);
+        }
+
         // 결과 검증
         if (!isset($result['success']) || !$result['success']) {
             $error = $result['error'] ?? 'Unknown error';
@@ -397,6 +940,162 @@ function text_to_speech($text) {
     }
 }
 
+/**
+ * TTS 스트리밍 (tts_server.py 중계)
+ * 서버가 보내는 음성 조각을 받는 대로 클라이언트에 전달 (첫 조각부터 재생 가능)
+ * 서버가 실행 중이 아니면 text_to_speech로 파일을 만든 뒤 전송
+ */
+function stream_tts($text, $no_cache = false) {
+    $status = 0;
+    $content_type = 'audio/mpeg';
+    $started = false;
+    $error_body = '';
+
+    $ch = curl_init(TTS_API . '/tts');
+    curl_setopt($ch, CURLOPT_POST, true);
+    curl_setopt($ch, CURLOPT_POSTFIELDS, json_encode(['text' => $text, 'no_cache' => (bool)$no_cache]));
+    curl_setopt($ch, CURLOPT_HTTPHEADER, ['Content-Type: application/json']);
+    curl_setopt($ch, CURLOPT_CONNECTTIMEOUT, 2);
+    curl_setopt($ch, CURLOPT_TIMEOUT, 120);
+    curl_setopt($ch, CURLOPT_HEADERFUNCTION, function ($ch, $header) use (&$status, &$content_type) {
+        if (preg_match('#^HTTP/\S+\s+(\d+)#', $header, $matches)) {
+            $status = (int)$matches[1];
+        } elseif (preg_match('#^Content-Type:\s*(audio/\S+)#i', $header, $matches)) {
+            // 백엔드에 따라 audio/mpeg (ElevenLabs) 또는 audio/wav (Piper)
+            $content_type = $matches[1];
+        }
+        return strlen($header);
+    });
+    curl_setopt($ch, CURLOPT_WRITEFUNCTION, function ($ch, $data) use (&$status, &$content_type, &$started, &$error_body) {
+        if ($status !== 200) {
+            $error_body .= $data;
+            return strlen($data);
+        }
+        if (!$started) {
+            // 첫 조각을 받은 뒤에 헤더를 보내야 실패 시 JSON 오류로 응답할 수 있음
+            header('Content-Type: ' . $content_type);
+            header('Cache-Control: no-cache');
+            header('X-Accel-Buffering: no');
+            while (ob_get_level() > 0) {
+                ob_end_flush();
+            }
+            $started = true;
+        }
+        echo $data;
+        flush();
+        // 클라이언트가 재생을 멈췄으면 전송 중단
+        return connection_aborted() ? 0 : strlen($data);
+    });
+
+    curl_exec($ch);
+    $errno = curl_errno($ch);
+    $curl_error = curl_error($ch);
+    curl_close($ch);
+
+    if ($started) {
+        return true;
+    }
+
+    if ($errno === CURLE_COULDNT_CONNECT) {
+        // TTS 서버 미실행: 전체 합성 후 파일 전송
+        $result = text_to_speech($text);
+        if (!empty($result['success']) && !empty($result['audio_path']) && file_exists($result['audio_path'])) {
+            $is_wav = strtolower(pathinfo($result['audio_path'], PATHINFO_EXTENSION)) === 'wav';
+            header('Content-Type: ' . ($is_wav ? 'audio/wav' : 'audio/mpeg'));
+            header('Content-Length: ' . filesize($result['audio_path']));
+            readfile($result['audio_path']);
+            return true;
+        }
+        $error = $result['error'] ?? 'TTS 실패';
+    } elseif ($errno) {
+        $error = "TTS 서버 오류: $curl_error";
+    } else {
+        $decoded = json_decode($error_body, true);
+        $error = $decoded['error'] ?? 'TTS 서버 오류';
+    }
+
+    http_response_code(502);
+    echo json_encode(['success' => false, 'error' => $error], JSON_UNESCAPED_UNICODE);
+    return false;
+}
+
+/**
+ * 챗봇 답변 + 문장별 음성 (SSE)
+ * 모델이 답변을 생성하는 동안 완성된 문장부터 음성으로 합성해 바로 전달
+ * - text: 답변 조각, sentence: 문장 음성 (audio_url, 순서대로), done / error: 종료
+ * tts_server.py가 실행 중이면 /chat을 중계 (음성 모델 재사용), 아니면 chat_speech.py 실행
+ */
+function stream_chat_speech($message, $no_cache = false) {
+    header('Content-Type: text/event-stream; charset=utf-8');
+    header('Cache-Control: no-cache');
+    header('X-Accel-Buffering: no');
+    set_time_limit(0);
+    while (ob_get_level() > 0) {
+        ob_end_flush();
+    }
+
+    $finished = false;
+    $relay = function ($line) use (&$finished) {
+        $trimmed = trim($line);
+        if ($trimmed === '' || $trimmed[0] !== '{') {
+            return;
+        }
+        $event = json_decode($trimmed, true);
+        if (!is_array($event) || empty($event['type'])) {
+            return;
+        }
+        echo 'event: ' . $event['type'] . "\n";
+        echo 'data: ' . json_encode($event, JSON_UNESCAPED_UNICODE) . "\n\n";
+        flush();
+        if ($event['type'] === 'done' || $event['type'] === 'error') {
+            $finished = true;
+        }
+    };
+
+    $buffer = '';
+    $ch = curl_init(TTS_API . '/chat');
+    curl_setopt($ch, CURLOPT_POST, true);
+    curl_setopt($ch, CURLOPT_POSTFIELDS, json_encode(['message' => $message, 'no_cache' => (bool)$no_cache]));
+    curl_setopt($ch, CURLOPT_HTTPHEADER, ['Content-Type: application/json']);
+    curl_setopt($ch, CURLOPT_CONNECTTIMEOUT, 2);
+    curl_setopt($ch, CURLOPT_TIMEOUT, 300);
+    curl_setopt($ch, CURLOPT_WRITEFUNCTION, function ($ch, $data) use (&$buffer, $relay) {
+        // 조각이 줄 중간에서 끊길 수 있으므로 완성된 줄만 전달
+        $buffer .= $data;
+        while (($pos = strpos($buffer, "\n")) !== false) {
+            $relay(substr($buffer, 0, $pos));
+            $buffer = substr($buffer, $pos + 1);
+        }
+        return connection_aborted() ? 0 : strlen($data);
+    });
+    curl_exec($ch);
+    $errno = curl_errno($ch);
+    curl_close($ch);
+    $relay($buffer);
+
+    if ($errno === CURLE_COULDNT_CONNECT) {
+        // TTS 서버 미실행: 같은 이벤트를 CLI로 생성
+        $command = '"' . PYTHON_PATH . '" "' . SCRIPT_PATH . '\\chat_speech.py" ' . escapeshellarg($message);
+        if ($no_cache) {
+            $command .= ' --no-cache';
+        }
+        $handle = popen($command . ' 2>&1', 'r');
+        if ($handle !== false) {
+            while (($line = fgets($handle)) !== false) {
+                $relay($line);
+                if (connection_aborted()) {
+                    break;
+                }
+            }
+            pclose($handle);
+        }
+    }
+
+    if (!$finished && !connection_aborted()) {
+        $relay(json_encode(['type' => 'error', 'success' => false, 'error' => '챗봇 음성 파이프라인 실행 실패']));
+    }
+}
+
 // API 라우팅
 $action = $_POST['action'] ?? $_GET['action'] ?? '';
 
@@ -412,18 +1111,48 @@ switch ($action) {
         echo json_encode($result, JSON_UNESCAPED_UNICODE);
         break;
 
+    case 'chat_speech':
+        // EventSource용 (GET): 답변 조각과 문장별 음성을 생기는 대로 스트리밍
+        $message = $_GET['message'] ?? $_POST['message'] ?? '';
+        $no_cache = filter_var($_GET['no_cache'] ?? $_POST['no_cache'] ?? false, FILTER_VALIDATE_BOOLEAN);
+
+        if (empty($message)) {
+            echo json_encode(['success' => false, 'error' => '메시지가 비어있습니다']);
+            exit;
+        }
+
+        stream_chat_speech($message, $no_cache);
+        break;
+
     case 'detect_pose':
-        $image_data = $_POST['image'] ?? '';
+        $image_bytes = read_image_input('image');
         $advanced = $_POST['advanced'] ?? true;
         $draw_hands = $_POST['draw_hands'] ?? true;
         $draw_face = $_POST['draw_face'] ?? true;
 
-        if (empty($image_data)) {
+        if (empty($image_bytes)) {
             echo json_encode(['success' => false, 'error' => '이미지 데이터가 비어있습니다']);
             exit;
         }
 
-        $result = detect_pose($image_data, $advanced, $draw_hands, $draw_face);
+        $result = detect_pose_bytes($image_bytes, $advanced, $draw_hands, $draw_face);
+        echo json_encode($result, JSON_UNESCAPED_UNICODE);
+        break;
+
+    case 'pose_stream':
+        $command = $_POST['command'] ?? '';
+        $session_id = $_POST['session_id'] ?? '';
+        $image_bytes = $command === 'frame' ? read_image_input('image') : '';
+        $draw_hands = $_POST['draw_hands'] ?? true;
+        $draw_face = $_POST['draw_face'] ?? true;
+        $render = in_array($_POST['render'] ?? 'both', ['none', 'both'], true) ? ($_POST['render'] ?? 'both') : 'both';
+
+        if ($command === 'frame' && (empty($session_id) || empty($image_bytes))) {
+            echo json_encode(['success' => false, 'error' => '세션 ID 또는 이미지 데이터가 비어있습니다']);
+            exit;
+        }
+
+        $result = pose_stream($command, $session_id, $image_bytes, $draw_hands, $draw_face, $render);
         echo json_encode($result, JSON_UNESCAPED_UNICODE);
         break;
 
@@ -431,29 +1160,90 @@ switch ($action) {
         $prompt = $_POST['prompt'] ?? '';
         $mode = $_POST['mode'] ?? 'simple';
         $skeleton_path = $_POST['skeleton_path'] ?? null;
+        $no_cache = filter_var($_POST['no_cache'] ?? false, FILTER_VALIDATE_BOOLEAN);
 
         if (empty($prompt)) {
             echo json_encode(['success' => false, 'error' => '프롬프트가 비어있습니다']);
             exit;
         }
 
-        $result = generate_image($prompt, $skeleton_path, $mode);
+        $result = generate_image($prompt, $skeleton_path, $mode, null, $no_cache);
+        echo json_encode($result, JSON_UNESCAPED_UNICODE);
+        break;
+
+    case 'enqueue_image':
+        // 비동기 생성: 작업 ID를 바로 반환, job_status로 결과 확인
+        $prompt = $_POST['prompt'] ?? '';
+        $mode = $_POST['mode'] ?? 'simple';
+        $skeleton_path = $_POST['skeleton_path'] ?? null;
+        $no_cache = filter_var($_POST['no_cache'] ?? false, FILTER_VALIDATE_BOOLEAN);
+        $client_id = $_POST['client_id'] ?? null;
+
+        if (empty($prompt)) {
+            echo json_encode(['success' => false, 'error' => '프롬프트가 비어있습니다']);
+            exit;
+        }
+
+        $result = enqueue_image($prompt, $skeleton_path, $mode, $no_cache, $client_id);
+        echo json_encode($result, JSON_UNESCAPED_UNICODE);
+        break;
+
+    case 'job_status':
+        $job_id = $_POST['job_id'] ?? $_GET['job_id'] ?? '';
+
+        if (empty($job_id)) {
+            echo json_encode(['success' => false, 'error' => '작업 ID가 비어있습니다']);
+            exit;
+        }
+
+        $result = job_status($job_id);
+        echo json_encode($result, JSON_UNESCAPED_UNICODE);
+        break;
+
+    case 'job_events':
+        // EventSource용 (GET): 진행률/남은 시간/미리보기를 끝날 때까지 스트리밍
+        $job_id = $_GET['job_id'] ?? $_POST['job_id'] ?? '';
+
+        if (empty($job_id)) {
+            echo json_encode(['success' => false, 'error' => '작업 ID가 비어있습니다']);
+            exit;
+        }
+
+        stream_job_events($job_id);
+        break;
+
+    case 'job_fallback':
+        // 대기 중인 작업을 처리할 워커가 없을 때: 취소하고 바로 생성 (이미 실행 중이면 현재 상태)
+        $job_id = $_POST['job_id'] ?? '';
+
+        if (empty($job_id)) {
+            echo json_encode(['success' => false, 'error' => '작업 ID가 비어있습니다']);
+            exit;
+        }
+
+        $result = fallback_job($job_id);
         echo json_encode($result, JSON_UNESCAPED_UNICODE);
         break;
 
     case 'pose_image':
-        $image_data = $_POST['image'] ?? '';
+        $image_bytes = read_image_input('image');
         $prompt = $_POST['prompt'] ?? '';
         $advanced = $_POST['advanced'] ?? true;
         $draw_hands = $_POST['draw_hands'] ?? true;
         $draw_face = $_POST['draw_face'] ?? true;
+        $async = filter_var($_POST['async'] ?? false, FILTER_VALIDATE_BOOLEAN);
+        $client_id = $_POST['client_id'] ?? null;
 
-        if (empty($image_data) || empty($prompt)) {
+        if (empty($image_bytes) || empty($prompt)) {
             echo json_encode(['success' => false, 'error' => '이미지 또는 프롬프트가 비어있습니다']);
             exit;
         }
 
-        $result = generate_pose_image($image_data, $prompt, $advanced, $draw_hands, $draw_face);
+        if ($async) {
+            $result = enqueue_pose_image($image_bytes, $prompt, $advanced, $draw_hands, $draw_face, $client_id);
+        } else {
+            $result = generate_pose_image($image_bytes, $prompt, $advanced, $draw_hands, $draw_face);
+        }
         echo json_encode($result, JSON_UNESCAPED_UNICODE);
         break;
 
@@ -473,16 +1263,42 @@ switch ($action) {
         echo json_encode($result, JSON_UNESCAPED_UNICODE);
         break;
 
+    case 'tts_stream':
+        // <audio src>에서 바로 재생할 수 있도록 GET도 허용
+        $text = $_POST['text'] ?? $_GET['text'] ?? '';
+        $no_cache = filter_var($_POST['no_cache'] ?? $_GET['no_cache'] ?? false, FILTER_VALIDATE_BOOLEAN);
+
+        if (empty($text)) {
+            http_response_code(400);
+            echo json_encode(['success' => false, 'error' => '텍스트가 비어있습니다']);
+            exit;
+        }
+
+        stream_tts($text, $no_cache);
+        break;
+
     case 'health':
         // 헬스 체크
         $ollama_ok = @file_get_contents(OLLAMA_API . '/api/tags') !== false;
-        $sd_ok = @file_get_contents(SD_API . '/sdapi/v1/sd-models') !== false;
+
+        // SD 백엔드별 상태 (하나라도 살아 있으면 생성 가능)
+        $context = stream_context_create(['http' => ['timeout' => 2]]);
+        $sd_backends = [];
+        foreach (sd_backend_urls() as $url) {
+            $sd_backends[$url] = @file_get_contents($url . '/sdapi/v1/progress?skip_current_image=true', false, $context) !== false;
+        }
+
+        // 이미지 생성 워커 heartbeat (없으면 생성 요청은 동기 처리로 대체됨)
+        $workers = run_queue_command(['workers']);
 
         echo json_encode([
             'success' => true,
             'services' => [
                 'ollama' => $ollama_ok,
-                'stable_diffusion' => $sd_ok,
+                'stable_diffusion' => in_array(true, $sd_backends, true),
+                'sd_backends' => $sd_backends,
+                'generation_worker' => !empty($workers['alive']),
+                'tts_server' => @file_get_contents(TTS_API . '/health', false, $context) !== false,
                 'python' => file_exists(PYTHON_PATH)
             ]
         ]);
@@ -492,7 +1308,7 @@ switch ($action) {
         echo json_encode([
             'success' => false,
             'error' => '유효하지 않은 액션',
-            'available_actions' => ['chat', 'detect_pose', 'generate_image', 'pose_image', 'tts', 'health']
+            'available_actions' => ['chat', 'chat_speech', 'detect_pose', 'pose_stream', 'generate_image', 'enqueue_image', 'job_status', 'job_events', 'job_fallback', 'pose_image', 'tts', 'tts_stream', 'health']
         ]);
         break;
 }
@@ -7,11 +7,26 @@
 
 const API_URL = '/ai_test_sec/api/ai_service.php';
 
+// 촬영 버튼을 누르면 이만큼 연속 촬영하고 포즈 품질이 가장 높은 프레임을 사용
+const CAPTURE_BURST_FRAMES = 5;
+
+// 포즈 기반 생성 방식: false면 pose_pipeline (감지와 SD 요청 준비를 겹쳐 한 번에 처리),
+// true면 포즈 감지 후 생성을 작업 큐에 등록 (진행률/미리보기, 중복 요청 방지, 요청 묶음)
+const POSE_IMAGE_ASYNC = false;
+
+// 이미지 생성 작업을 기다리는 최대 시간 (SSE + 폴링 합계)
+const JOB_TIMEOUT_MS = 10 * 60 * 1000;
+
 class AIKiosk {
     constructor() {
         this.videoStream = null;
         this.currentTab = 'chat';
         this.capturedImage = null;
+        this.capturedImageUrl = null;
+
+        // 이미지 생성 중복 요청 방지 (서버는 client_id로 처리 중인 같은 요청을 기존 작업으로 돌려줌)
+        this.clientId = this.getClientId();
+        this.isGenerating = false;
 
         // 음성 인식 관련
         this.recognition = null;
@@ -19,6 +34,10 @@ class AIKiosk {
         this.synthesis = window.speechSynthesis;
         this.isSpeaking = false;
 
+        // 챗봇 답변 문장별 음성 (순서대로 재생)
+        this.speechQueue = [];
+        this.currentSpeech = null;
+
         this.init();
     }
 
@@ -89,12 +108,17 @@ class AIKiosk {
             const statusDiv = document.getElementById('service-status');
             if (data.success) {
                 const services = data.services;
+                // SD 백엔드가 여러 대면 살아 있는 수 표시
+                const sdBackends = Object.values(services.sd_backends || {});
+                const sdCount = sdBackends.length > 1
+                    ? ` (${sdBackends.filter(ok => ok).length}/${sdBackends.length})`
+                    : '';
                 statusDiv.innerHTML = `
                     <div class="status-item ${services.ollama ? 'ok' : 'error'}">
                         Ollama: ${services.ollama ? '✓' : '✗'}
                     </div>
                     <div class="status-item ${services.stable_diffusion ? 'ok' : 'error'}">
-                        SD WebUI: ${services.stable_diffusion ? '✓' : '✗'}
+                        SD WebUI: ${services.stable_diffusion ? '✓' : '✗'}${sdCount}
                     </div>
                     <div class="status-item ${services.python ? 'ok' : 'error'}">
                         Python: ${services.python ? '✓' : '✗'}
@@ -119,6 +143,15 @@ class AIKiosk {
         this.addChatMessage('user', message);
         input.value = '';
 
+        // 음성 출력이 켜져 있으면 답변을 생성하는 동안 완성된 문장부터 읽어줌
+        if (this.isSpeaking && window.EventSource) {
+            this.streamChatSpeech(message);
+        } else {
+            this.requestChat(message);
+        }
+    }
+
+    async requestChat(message) {
         this.showLoading('chat-messages', '답변 생성 중...');
 
         try {
@@ -148,6 +181,99 @@ class AIKiosk {
         }
     }
 
+    streamChatSpeech(message) {
+        this.showLoading('chat-messages', '답변 생성 중...');
+        this.stopSpeech();
+
+        const source = new EventSource(
+            `${API_URL}?action=chat_speech&message=${encodeURIComponent(message)}`
+        );
+        const messagesDiv = document.getElementById('chat-messages');
+        let bubble = null;
+
+        source.addEventListener('text', (event) => {
+            const data = JSON.parse(event.data);
+            if (!bubble) {
+                this.hideLoading('chat-messages');
+                bubble = this.addChatMessage('bot', '');
+            }
+            bubble.textContent += data.delta;
+            messagesDiv.scrollTop = messagesDiv.scrollHeight;
+        });
+
+        source.addEventListener('sentence', (event) => {
+            this.enqueueSpeech(JSON.parse(event.data));
+        });
+
+        source.addEventListener('done', (event) => {
+            source.close();
+            if (!bubble) {
+                const data = JSON.parse(event.data);
+                this.hideLoading('chat-messages');
+                this.addChatMessage('bot', data.message);
+            }
+        });
+
+        source.addEventListener('error', (event) => {
+            source.close();
+            if (event.data) {
+                // 서버가 보낸 오류 이벤트
+                const data = JSON.parse(event.data);
+                this.hideLoading('chat-messages');
+                this.addChatMessage('bot', `오류: ${data.error}`);
+            } else if (!bubble) {
+                // 연결 실패: 기존 방식 (전체 답변 후 음성)
+                console.warn('챗봇 음성 스트리밍 실패, 기존 방식 사용');
+                this.hideLoading('chat-messages');
+                this.requestChat(message);
+            }
+        });
+    }
+
+    enqueueSpeech(sentence) {
+        if (!this.isSpeaking) return;
+        this.speechQueue.push(sentence);
+        if (!this.currentSpeech) {
+            this.playNextSpeech();
+        }
+    }
+
+    playNextSpeech() {
+        const sentence = this.speechQueue.shift();
+        this.currentSpeech = null;
+        if (!sentence || !this.isSpeaking) return;
+
+        if (!sentence.audio_url) {
+            console.warn('문장 음성 생성 실패:', sentence.error);
+            this.playNextSpeech();
+            return;
+        }
+
+        const audio = new Audio(sentence.audio_url);
+        this.currentSpeech = audio;
+        audio.onended = () => this.playNextSpeech();
+        audio.onerror = (event) => {
+            console.error('음성 재생 오류:', event);
+            this.playNextSpeech();
+        };
+        audio.play().catch((error) => {
+            if (error.name === 'NotAllowedError') {
+                console.error('음성 재생 차단:', error);
+                this.stopSpeech();
+                return;
+            }
+            this.playNextSpeech();
+        });
+    }
+
+    stopSpeech() {
+        this.speechQueue = [];
+        if (this.currentSpeech) {
+            this.currentSpeech.pause();
+            this.currentSpeech = null;
+        }
+    }
+
     addChatMessage(role, message) {
         const messagesDiv = document.getElementById('chat-messages');
         const messageDiv = document.createElement('div');
@@ -155,6 +281,7 @@ class AIKiosk {
         messageDiv.textContent = message;
         messagesDiv.appendChild(messageDiv);
         messagesDiv.scrollTop = messagesDiv.scrollHeight;
+        return messageDiv;
     }
 
     // === 음성 인식/합성 기능 ===
@@ -248,6 +375,7 @@ class AIKiosk {
         if (this.synthesis.speaking) {
             this.synthesis.cancel();
         }
+        this.stopSpeech();
 
         // 음성 출력 활성화 상태 토글
         this.isSpeaking = !this.isSpeaking;
@@ -265,6 +393,43 @@ class AIKiosk {
         // 음성 출력이 비활성화되어 있으면 실행하지 않음
         if (!this.isSpeaking) return;
 
+        const streamUrl = `${API_URL}?action=tts_stream&text=${encodeURIComponent(text)}`;
+        // 아주 긴 답변은 URL 길이 제한에 걸리므로 파일 방식 사용
+        if (streamUrl.length > 6000) {
+            return this.speakTextFile(text);
+        }
+
+        // 스트리밍 재생: 음성 조각이 도착하는 대로 재생 시작 (전체 합성을 기다리지 않음)
+        const audio = new Audio(streamUrl);
+        let fellBack = false;
+        const fallback = (reason) => {
+            if (fellBack) return;
+            fellBack = true;
+            console.warn('TTS 스트리밍 실패, 파일 방식 사용:', reason);
+            this.speakTextFile(text);
+        };
+
+        audio.onplay = () => {
+            console.log('음성 출력 시작 (스트리밍):', text);
+        };
+        audio.onended = () => {
+            console.log('음성 출력 완료');
+        };
+        audio.onerror = (event) => fallback(event);
+
+        try {
+            await audio.play();
+        } catch (error) {
+            // 자동 재생 차단 등은 onerror가 오지 않으므로 여기서 처리
+            if (error.name === 'NotAllowedError') {
+                console.error('음성 재생 차단:', error);
+                return;
+            }
+            fallback(error);
+        }
+    }
+
+    async speakTextFile(text) {
         try {
             // 로컬 TTS API 호출
             const formData = new FormData();
@@ -380,7 +545,7 @@ class AIKiosk {
         }
     }
 
-    captureImage() {
+    grabFrame() {
         const video = document.getElementById('camera-preview');
         const canvas = document.getElementById('camera-canvas');
         const ctx = canvas.getContext('2d');
@@ -389,17 +554,134 @@ class AIKiosk {
         canvas.height = video.videoHeight;
         ctx.drawImage(video, 0, 0);
 
-        this.capturedImage = canvas.toDataURL('image/jpeg', 0.9);
+        // JPEG 바이너리(Blob)로 캡처 - base64 data URL 변환 없이 multipart로 전송
+        return new Promise(resolve => canvas.toBlob(resolve, 'image/jpeg', 0.9));
+    }
 
-        // 캡처된 이미지 표시
-        const capturedDiv = document.getElementById('captured-image');
-        capturedDiv.innerHTML = `<img src="${this.capturedImage}" alt="Captured" style="max-width: 100%;">`;
+    async poseStreamRequest(fields, image = null) {
+        const formData = new FormData();
+        formData.append('action', 'pose_stream');
+        Object.entries(fields).forEach(([key, value]) => formData.append(key, value));
+        if (image) {
+            formData.append('image', image, 'frame.jpg');
+        }
 
-        this.showMessage('camera-status', '이미지 캡처 완료', 'success');
+        const response = await fetch(API_URL, {
+            method: 'POST',
+            body: formData
+        });
+        return response.json();
+    }
+
+    async captureImage() {
+        const captureButton = document.getElementById('camera-capture');
+        captureButton.disabled = true;
+
+        let sessionId = null;
+        try {
+            // 포즈 감지 데몬 스트림 세션으로 연속 촬영한 프레임의 품질 점수를 받음
+            // (데몬을 쓸 수 없으면 한 장만 촬영)
+            try {
+                const opened = await this.poseStreamRequest({ command: 'open' });
+                sessionId = opened.success ? opened.session_id : null;
+            } catch (error) {
+                sessionId = null;
+            }
+
+            const frameCount = sessionId ? CAPTURE_BURST_FRAMES : 1;
+            // 서버가 돌려준 frame_index → 프레임 (촬영에 실패한 프레임이 있어도 번호가 어긋나지 않음)
+            const frames = new Map();
+            let firstFrame = null;
+            if (sessionId) {
+                this.showMessage('camera-status', '연속 촬영 중...', 'info');
+            }
+
+            for (let i = 0; i < frameCount; i++) {
+                const blob = await this.grabFrame();
+                if (!blob) {
+                    continue;
+                }
+                firstFrame = firstFrame || blob;
+
+                if (sessionId) {
+                    // 응답을 기다리는 시간이 촬영 간격 (스켈레톤 없이 품질 점수만)
+                    try {
+                        const response = await this.poseStreamRequest(
+                            { command: 'frame', session_id: sessionId, render: 'none' }, blob
+                        );
+                        if (response.frame_index) {
+                            frames.set(response.frame_index, blob);
+                        }
+                    } catch (error) {
+                        // 세션을 더 쓸 수 없으므로 여기까지 촬영한 프레임 중 첫 장 사용
+                        this.closePoseStream(sessionId);
+                        sessionId = null;
+                        break;
+                    }
+                }
+            }
+
+            if (!firstFrame) {
+                this.showMessage('camera-status', '이미지 캡처 실패', 'error');
+                return;
+            }
+
+            let captured = firstFrame;
+            let message = '이미지 캡처 완료';
+            if (sessionId) {
+                const result = await this.poseStreamRequest({ command: 'best', session_id: sessionId });
+                if (result.success && frames.has(result.frame_index)) {
+                    captured = frames.get(result.frame_index);
+                    message = `이미지 캡처 완료 (${frames.size}장 중 포즈 품질 ${result.overall_score}점)`;
+                }
+            }
+
+            this.setCapturedImage(captured);
+            this.showMessage('camera-status', message, 'success');
+        } catch (error) {
+            this.showMessage('camera-status', `캡처 오류: ${error.message}`, 'error');
+        } finally {
+            if (sessionId) {
+                this.closePoseStream(sessionId);
+            }
+            captureButton.disabled = !this.videoStream;
+        }
+    }
+
+    closePoseStream(sessionId) {
+        this.poseStreamRequest({ command: 'close', session_id: sessionId }).catch(() => {});
+    }
+
+    setCapturedImage(blob) {
+        this.capturedImage = blob;
+
+        // 캡처된 이미지 표시 (이전 미리보기 URL 해제)
+        if (this.capturedImageUrl) {
+            URL.revokeObjectURL(this.capturedImageUrl);
+        }
+        this.capturedImageUrl = URL.createObjectURL(blob);
+
+        const capturedDiv = document.getElementById('captured-image');
+        capturedDiv.innerHTML = `<img src="${this.capturedImageUrl}" alt="Captured" style="max-width: 100%;">`;
     }
 
     // === 이미지 생성 기능 ===
 
+    getClientId() {
+        let clientId = sessionStorage.getItem('kiosk-client-id');
+        if (!clientId) {
+            clientId = `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`;
+            sessionStorage.setItem('kiosk-client-id', clientId);
+        }
+        return clientId;
+    }
+
+    setGenerating(generating) {
+        this.isGenerating = generating;
+        document.getElementById('generate-simple').disabled = generating;
+        document.getElementById('generate-pose').disabled = generating;
+    }
+
     async generateSimpleImage() {
         const prompt = document.getElementById('prompt-input').value.trim();
 
@@ -408,20 +690,33 @@ class AIKiosk {
             return;
         }
 
-        this.showLoading('generation-result', '이미지 생성 중... (약 10-30초 소요)');
+        if (this.isGenerating) {
+            this.showMessage('generation-status', '이미지를 생성하는 중입니다', 'info');
+            return;
+        }
+
+        this.setGenerating(true);
+        this.showLoading('generation-result', '이미지 생성 요청 중...');
 
         try {
             const formData = new FormData();
-            formData.append('action', 'generate_image');
+            formData.append('action', 'enqueue_image');
             formData.append('prompt', prompt);
             formData.append('mode', 'simple');
+            formData.append('client_id', this.clientId);
 
             const response = await fetch(API_URL, {
                 method: 'POST',
                 body: formData
             });
 
-            const data = await response.json();
+            let data = await response.json();
+
+            if (data.success && data.job_id) {
+                // 생성은 작업 큐 워커가 처리하므로 완료될 때까지 상태 확인
+                // (워커가 없으면 서버가 바로 생성해 job_id 없이 image_url을 돌려줌)
+                data = await this.waitForJob(data.job_id, 'generation-result');
+            }
 
             this.hideLoading('generation-result');
 
@@ -436,6 +731,8 @@ class AIKiosk {
         } catch (error) {
             this.hideLoading('generation-result');
             this.showMessage('generation-status', `오류: ${error.message}`, 'error');
+        } finally {
+            this.setGenerating(false);
         }
     }
 
@@ -452,13 +749,26 @@ class AIKiosk {
             return;
         }
 
-        this.showLoading('generation-result', '포즈 감지 및 이미지 생성 중... (약 20-40초 소요)');
+        if (this.isGenerating) {
+            this.showMessage('generation-status', '이미지를 생성하는 중입니다', 'info');
+            return;
+        }
+
+        this.setGenerating(true);
+        this.showLoading('generation-result', '포즈 감지 중...');
 
         try {
             const formData = new FormData();
             formData.append('action', 'pose_image');
             formData.append('prompt', prompt);
-            formData.append('image', this.capturedImage);
+            formData.append('image', this.capturedImage, 'capture.jpg');
+            if (POSE_IMAGE_ASYNC) {
+                formData.append('async', '1');
+                formData.append('client_id', this.clientId);
+            } else {
+                this.hideLoading('generation-result');
+                this.showLoading('generation-result', '포즈 감지 및 이미지 생성 중...');
+            }
 
             const response = await fetch(API_URL, {
                 method: 'POST',
@@ -481,6 +791,15 @@ class AIKiosk {
                 return;
             }
 
+            if (data.success && data.job_id) {
+                // 포즈 감지는 끝났고 이미지 생성은 작업 큐에서 진행
+                const skeletonUrl = data.skeleton_url;
+                this.showLoading('generation-result', '이미지 생성 대기 중...');
+                data = await this.waitForJob(data.job_id, 'generation-result');
+                data.skeleton_url = skeletonUrl;
+                this.hideLoading('generation-result');
+            }
+
             if (data.success) {
                 document.getElementById('generation-result').innerHTML = `
                     <div class="result-grid">
@@ -508,7 +827,131 @@ class AIKiosk {
             this.hideLoading('generation-result');
             console.error('Full error:', error);
             this.showMessage('generation-status', `오류: ${error.message}`, 'error');
+        } finally {
+            this.setGenerating(false);
+        }
+    }
+
+    /**
+     * 이미지 생성 작업이 끝날 때까지 진행 상황 표시
+     * job_events(SSE)로 진행률/남은 시간/미리보기를 받고, EventSource가 없거나 연결이 끊기면 상태 폴링
+     * @returns {Promise<Object>} 완료 시 {success: true, image_url}, 실패 시 {success: false, error}
+     */
+    waitForJob(jobId, loadingElementId, intervalMs = 1000) {
+        const deadline = Date.now() + JOB_TIMEOUT_MS;
+        if (typeof EventSource === 'undefined') {
+            return this.pollJob(jobId, loadingElementId, intervalMs, deadline);
+        }
+
+        return new Promise((resolve) => {
+            const source = new EventSource(`${API_URL}?action=job_events&job_id=${encodeURIComponent(jobId)}`);
+            let finished = false;
+            const finish = (result) => {
+                finished = true;
+                source.close();
+                resolve(result);
+            };
+
+            source.addEventListener('progress', (e) => {
+                const data = JSON.parse(e.data);
+                if (data.status === 'queued' && data.worker_alive === false) {
+                    // 처리할 워커가 없음: 바로 생성으로 대체
+                    source.close();
+                    finished = true;
+                    this.fallbackJob(jobId, loadingElementId, intervalMs, deadline).then(resolve);
+                    return;
+                }
+                this.showJobProgress(loadingElementId, data);
+            });
+            source.addEventListener('done', (e) => finish(JSON.parse(e.data)));
+            source.addEventListener('failed', (e) => {
+                const data = JSON.parse(e.data);
+                finish({ success: false, error: data.error || '이미지 생성 실패' });
+            });
+            // 서버가 보낸 error 이벤트 (작업 없음 등)와 연결 오류 모두 여기로 옴
+            source.addEventListener('error', (e) => {
+                if (finished) return;
+                if (e.data) {
+                    const data = JSON.parse(e.data);
+                    finish({ success: false, error: data.error || '이미지 생성 실패' });
+                    return;
+                }
+                // 연결이 끊긴 경우 (watch 시간 초과, 프록시 등): 폴링으로 이어서 확인
+                source.close();
+                finished = true;
+                this.pollJob(jobId, loadingElementId, intervalMs, deadline).then(resolve);
+            });
+        });
+    }
+
+    async fallbackJob(jobId, loadingElementId, intervalMs, deadline) {
+        this.hideLoading(loadingElementId);
+        this.showLoading(loadingElementId, '이미지 생성 중...');
+
+        const formData = new FormData();
+        formData.append('action', 'job_fallback');
+        formData.append('job_id', jobId);
+        const response = await fetch(API_URL, { method: 'POST', body: formData });
+        const data = await response.json();
+
+        if (data.success && data.job_id) {
+            // 그 사이 워커가 작업을 가져감: 계속 결과 확인
+            if (data.status === 'done') {
+                return data;
+            }
+            if (data.status === 'failed') {
+                return { success: false, error: data.error || '이미지 생성 실패' };
+            }
+            return this.pollJob(jobId, loadingElementId, intervalMs, deadline);
+        }
+        return data;
+    }
+
+    showJobProgress(loadingElementId, data) {
+        let message;
+        if (data.status === 'queued') {
+            message = `이미지 생성 대기 중... (대기 순서: ${data.position})`;
+        } else if (data.progress) {
+            message = `이미지 생성 중... ${Math.round(data.progress * 100)}%`;
+            if (data.eta) {
+                message += ` (약 ${Math.ceil(data.eta)}초 남음)`;
+            }
+        } else {
+            message = '이미지 생성 중...';
+        }
+
+        this.hideLoading(loadingElementId);
+        this.showLoading(loadingElementId, message);
+
+        if (data.preview_url) {
+            const preview = document.createElement('img');
+            preview.src = data.preview_url;
+            preview.alt = 'Preview';
+            preview.style.maxWidth = '100%';
+            document.getElementById(`${loadingElementId}-loading`).appendChild(preview);
+        }
+    }
+
+    async pollJob(jobId, loadingElementId, intervalMs = 1000, deadline = Date.now() + JOB_TIMEOUT_MS) {
+        while (Date.now() < deadline) {
+            await new Promise(resolve => setTimeout(resolve, intervalMs));
+
+            const response = await fetch(`${API_URL}?action=job_status&job_id=${encodeURIComponent(jobId)}`);
+            const data = await response.json();
+
+            if (!data.success || data.status === 'failed') {
+                return { success: false, error: data.error || '이미지 생성 실패' };
+            }
+            if (data.status === 'done') {
+                return data;
+            }
+            if (data.status === 'queued' && data.worker_alive === false) {
+                return this.fallbackJob(jobId, loadingElementId, intervalMs, deadline);
+            }
+
+            this.showJobProgress(loadingElementId, data);
         }
+        return { success: false, error: '이미지 생성 시간이 초과되었습니다' };
     }
 
     // === 유틸리티 ===
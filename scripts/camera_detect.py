@@ -11,14 +11,21 @@ import base64
 from io import BytesIO
 
 class PoseDetector:
-    def __init__(self):
+    def __init__(self, static_image_mode=True, min_tracking_confidence=0.5):
+        """
+        Args:
+            static_image_mode: True면 매 프레임 전체 감지,
+                False면 연속 프레임에서 이전 결과를 기준으로 추적 (라이브 프리뷰용)
+            min_tracking_confidence: 추적 신뢰도 임계값 (static_image_mode=False일 때만 사용)
+        """
         self.mp_pose = mp.solutions.pose
         self.mp_drawing = mp.solutions.drawing_utils
         self.pose = self.mp_pose.Pose(
-            static_image_mode=True,
+            static_image_mode=static_image_mode,
             model_complexity=1,
             enable_segmentation=False,
-            min_detection_confidence=0.5
+            min_detection_confidence=0.5,
+            min_tracking_confidence=min_tracking_confidence
         )
 
     def process_image(self, image_path, output_path):
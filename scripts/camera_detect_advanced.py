@@ -9,48 +9,792 @@
 import cv2
 import mediapipe as mp
 import numpy as np
+import os
 import sys
 import json
 import base64
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
 from typing import List, Dict, Optional, Tuple
 
+from skeleton_renderer import SkeletonRenderer
+from openpose_format import to_openpose_keypoints, to_openpose_json, render_openpose
+from landmark_filter import LandmarkSmoother, BurstSelector, SMOOTH_MIN_CUTOFF, SMOOTH_BETA
+
+
+# 설정별 MediaPipe 그래프 캐시 (프로세스 전체 공유)
+# 키: (종류, static_image_mode, model_complexity, 감지 신뢰도, 추적 신뢰도)
+_GRAPH_CACHE: Dict[Tuple, object] = {}
+_GRAPH_CACHE_LOCK = threading.Lock()
+
+
+def _graph_key(kind: str, static_image_mode: bool, model_complexity: int,
+               min_detection_confidence: float, min_tracking_confidence: float) -> Tuple:
+    # 정지 이미지 모드에서는 추적 신뢰도를 쓰지 않으므로 키에서 제외 (중복 로드 방지)
+    tracking = None if static_image_mode else round(float(min_tracking_confidence), 3)
+    return (kind, static_image_mode, int(model_complexity),
+            round(float(min_detection_confidence), 3), tracking)
+
+
+def get_holistic(model_complexity=1, min_detection_confidence=0.5,
+                 min_tracking_confidence=0.5, static_image_mode=True):
+    """
+    설정별 Holistic 그래프 반환 (최초 요청 시 생성 후 캐시)
+    """
+    key = _graph_key("holistic", static_image_mode, model_complexity,
+                     min_detection_confidence, min_tracking_confidence)
+    with _GRAPH_CACHE_LOCK:
+        graph = _GRAPH_CACHE.get(key)
+        if graph is None:
+            # 0/2 모델은 처음 쓸 때 내려받으며 mediapipe가 stdout에 진행 메시지를 출력 (CLI는 stdout이 JSON 전용)
+            with redirect_stdout(sys.stderr):
+                graph = mp.solutions.holistic.Holistic(
+                    static_image_mode=static_image_mode,
+                    model_complexity=model_complexity,
+                    enable_segmentation=False,
+                    refine_face_landmarks=True,
+                    min_detection_confidence=min_detection_confidence,
+                    min_tracking_confidence=min_tracking_confidence
+                )
+            _GRAPH_CACHE[key] = graph
+    return graph
+
+
+# 여러 인물 크롭 처리용 스레드별 그래프 (그래프는 스레드 안전하지 않으므로 워커마다 하나씩)
+_THREAD_GRAPHS = threading.local()
+_THREAD_GRAPH_LIST: List[object] = []
+
+
+def get_thread_holistic(model_complexity=1, min_detection_confidence=0.5):
+    """현재 스레드 전용 정지 이미지 Holistic 그래프 (최초 요청 시 생성)"""
+    graphs = getattr(_THREAD_GRAPHS, "graphs", None)
+    if graphs is None:
+        graphs = _THREAD_GRAPHS.graphs = {}
+    key = _graph_key("holistic", True, model_complexity, min_detection_confidence, 0.5)
+    graph = graphs.get(key)
+    if graph is None:
+        with redirect_stdout(sys.stderr):
+            graph = mp.solutions.holistic.Holistic(
+                static_image_mode=True,
+                model_complexity=model_complexity,
+                enable_segmentation=False,
+                refine_face_landmarks=True,
+                min_detection_confidence=min_detection_confidence
+            )
+        graphs[key] = graph
+        with _GRAPH_CACHE_LOCK:
+            _THREAD_GRAPH_LIST.append(graph)
+    return graph
+
+
+def get_pose_graph(model_complexity=1, min_detection_confidence=0.5,
+                   min_tracking_confidence=0.5, static_image_mode=True):
+    """
+    설정별 Pose 그래프 반환 (포즈만 필요한 경우, 최초 요청 시 생성 후 캐시)
+    """
+    key = _graph_key("pose", static_image_mode, model_complexity,
+                     min_detection_confidence, min_tracking_confidence)
+    with _GRAPH_CACHE_LOCK:
+        graph = _GRAPH_CACHE.get(key)
+        if graph is None:
+            with redirect_stdout(sys.stderr):
+                graph = mp.solutions.pose.Pose(
+                    static_image_mode=static_image_mode,
+                    model_complexity=model_complexity,
+                    enable_segmentation=False,
+                    min_detection_confidence=min_detection_confidence,
+                    min_tracking_confidence=min_tracking_confidence
+                )
+            _GRAPH_CACHE[key] = graph
+    return graph
+
+
+_RENDERER: Optional[SkeletonRenderer] = None
+
+
+def get_renderer() -> SkeletonRenderer:
+    """공유 스켈레톤 렌더러 (연결 인덱스 배열은 한 번만 계산)"""
+    global _RENDERER
+    if _RENDERER is None:
+        _RENDERER = SkeletonRenderer()
+    return _RENDERER
+
+
+def loaded_graphs() -> List[Tuple]:
+    """현재 로드된 그래프 설정 목록"""
+    with _GRAPH_CACHE_LOCK:
+        return list(_GRAPH_CACHE.keys())
+
+
+def close_graphs():
+    """캐시된 모든 그래프 해제 (인물별 워커 풀과 스레드별 그래프 포함)"""
+    global _PERSON_POOL
+    with _PERSON_POOL_LOCK:
+        if _PERSON_POOL is not None:
+            _PERSON_POOL.shutdown(wait=True)
+            _PERSON_POOL = None
+    with _GRAPH_CACHE_LOCK:
+        for graph in _GRAPH_CACHE.values():
+            graph.close()
+        _GRAPH_CACHE.clear()
+        for graph in _THREAD_GRAPH_LIST:
+            graph.close()
+        _THREAD_GRAPH_LIST.clear()
+
+
+# 인물별 Holistic 워커 풀 (여러 사람 감지 시 크롭을 병렬 처리)
+PERSON_WORKERS = min(4, os.cpu_count() or 1)
+_PERSON_POOL: Optional[ThreadPoolExecutor] = None
+_PERSON_POOL_LOCK = threading.Lock()
+
+
+def get_person_pool() -> ThreadPoolExecutor:
+    global _PERSON_POOL
+    with _PERSON_POOL_LOCK:
+        if _PERSON_POOL is None:
+            _PERSON_POOL = ThreadPoolExecutor(max_workers=PERSON_WORKERS, thread_name_prefix="pose-person")
+        return _PERSON_POOL
+
+
+def decode_image_bytes(image_data: bytes) -> Optional[np.ndarray]:
+    """인코딩된 이미지 바이트(JPEG/PNG 등)를 BGR 이미지로 디코딩 (복사 없이 버퍼 참조)"""
+    if not image_data:
+        return None
+    nparr = np.frombuffer(image_data, np.uint8)
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+
+def decode_frame_base64(frame_base64: str) -> Optional[np.ndarray]:
+    """base64 (data URL 허용) 프레임을 BGR 이미지로 디코딩"""
+    return decode_image_bytes(base64.b64decode(
+        frame_base64.split(',')[1] if ',' in frame_base64 else frame_base64
+    ))
+
+
+# 랜드마크 배열 열 (N, 5) float32
+LANDMARK_X = 0
+LANDMARK_Y = 1
+LANDMARK_Z = 2
+LANDMARK_VISIBILITY = 3
+LANDMARK_PRESENCE = 4
+
+# Holistic 결과 속성 → 랜드마크 종류
+LANDMARK_PARTS = {
+    "pose": "pose_landmarks",
+    "left_hand": "left_hand_landmarks",
+    "right_hand": "right_hand_landmarks",
+    "face": "face_landmarks",
+}
+
+
+def landmarks_to_array(landmarks) -> Optional[np.ndarray]:
+    """
+    MediaPipe 랜드마크 리스트를 (N, 5) float32 배열로 변환
+    열: x, y, z, visibility, presence (손/얼굴은 visibility, presence가 0)
+    """
+    if landmarks is None:
+        return None
+    points = landmarks.landmark
+    array = np.empty((len(points), 5), dtype=np.float32)
+    array[:] = [(p.x, p.y, p.z, p.visibility, p.presence) for p in points]
+    return array
+
+
+def extract_landmark_arrays(results) -> Dict[str, Optional[np.ndarray]]:
+    """
+    Holistic 결과를 종류별 랜드마크 배열로 한 번만 변환
+    (품질 점수, 필터링, 직렬화 등 이후 단계는 모두 이 배열을 공유)
+    """
+    return {
+        part: landmarks_to_array(getattr(results, attr, None))
+        for part, attr in LANDMARK_PARTS.items()
+    }
+
+
+def visible_mask(landmarks: np.ndarray, threshold=0.5) -> np.ndarray:
+    """가시성 임계값을 넘는 랜드마크 마스크"""
+    return landmarks[:, LANDMARK_VISIBILITY] > threshold
+
+
+def landmarks_to_list(landmarks: Optional[np.ndarray], decimals=4) -> Optional[List[List[float]]]:
+    """JSON 직렬화용 (소수점 자리수 제한으로 응답 크기 축소)"""
+    if landmarks is None:
+        return None
+    # float32 그대로 반올림하면 tolist()에서 자릿수가 다시 늘어나므로 float64로 반올림
+    return np.round(landmarks.astype(np.float64), decimals).tolist()
+
+
+def crop_to_frame(landmarks: Dict[str, Optional[np.ndarray]], box: Tuple[int, int, int, int],
+                  width: int, height: int) -> Dict[str, Optional[np.ndarray]]:
+    """
+    크롭 기준 정규화 좌표를 전체 프레임 기준으로 변환 (제자리 수정)
+
+    Args:
+        landmarks: extract_landmark_arrays() 결과 (크롭 기준)
+        box: 크롭 영역 (x, y, w, h) 전체 프레임 픽셀
+        width, height: 전체 프레임 크기
+    """
+    x, y, w, h = box
+    scale = np.array([w / width, h / height, w / width], dtype=np.float32)
+    offset = np.array([x / width, y / height, 0.0], dtype=np.float32)
+    for array in landmarks.values():
+        if array is not None:
+            array[:, :3] *= scale
+            array[:, :3] += offset
+    return landmarks
+
+
+# 추론 작업 해상도 (긴 변, 0이면 원본): 모델 입력은 256 내외이므로 4K/1080p 원본은 줄여서 처리
+WORKING_MAX_SIDE = 960
+# 다음 프레임 ROI: 포즈 박스를 이 비율만큼 확장
+POSE_BOX_MARGIN = 0.15
+
+
+def pose_box(pose: np.ndarray, width: int, height: int,
+             margin=POSE_BOX_MARGIN) -> Optional[List[int]]:
+    """
+    포즈 랜드마크를 감싸는 박스 (x, y, w, h) 전체 프레임 픽셀, 여유분 포함
+
+    가려진 관절도 포함 (보이는 점만 쓰면 팔/다리가 빠진 박스가 프레임마다 줄어듦),
+    프레임 밖으로 추정된 점은 프레임 경계로 자름
+    """
+    points = np.clip(pose[:, :2], 0.0, 1.0)
+    x0, y0 = points.min(axis=0)
+    x1, y1 = points.max(axis=0)
+    mx = (x1 - x0) * margin
+    my = (y1 - y0) * margin
+    left = max(0, int((x0 - mx) * width))
+    top = max(0, int((y0 - my) * height))
+    right = min(width, int(np.ceil((x1 + mx) * width)))
+    bottom = min(height, int(np.ceil((y1 + my) * height)))
+    if right - left < 2 or bottom - top < 2:
+        return None
+    return [left, top, right - left, bottom - top]
+
+
+LANDMARK_COLUMNS = ["x", "y", "z", "visibility", "presence"]
+
+
+def pack_landmarks(landmarks: Dict[str, Optional[np.ndarray]]) -> Tuple[bytes, Dict]:
+    """
+    랜드마크 배열을 하나의 바이너리 블롭으로 연결
+
+    Returns:
+        (블롭, 레이아웃)
+        블롭: float32 리틀 엔디언, 종류 순서대로 (N, 5) 행 연결
+        레이아웃: {"dtype": "float32", "columns": [...], "parts": {종류: 행 수 (미감지 0)}}
+    """
+    arrays = [array for array in landmarks.values() if array is not None]
+    blob = np.concatenate(arrays).astype("<f4", copy=False).tobytes() if arrays else b""
+    layout = {
+        "dtype": "float32",
+        "columns": LANDMARK_COLUMNS,
+        "parts": {part: 0 if array is None else len(array) for part, array in landmarks.items()}
+    }
+    return blob, layout
+
+
+# 인물 박스 감지 (HOG): 이 너비로 줄여서 감지하므로 비용이 입력 해상도와 무관
+PERSON_DETECT_WIDTH = 640
+PERSON_MIN_SCORE = 0.3
+PERSON_NMS_THRESHOLD = 0.45
+# 박스 확장 비율 (HOG 박스는 몸에 딱 맞아 손/머리가 잘리므로)
+PERSON_BOX_MARGIN = (0.15, 0.1)
+# 크롭을 이 크기 이하로 줄여 Holistic 실행 (모델 입력은 어차피 256 내외)
+PERSON_CROP_MAX_SIDE = 512
+MAX_PEOPLE = 6
+
+
+class PersonDetector:
+    """
+    가벼운 인물 박스 감지기 (OpenCV HOG + 기본 보행자 SVM, 추가 모델 불필요)
+    전신이 보이는 사람에 적합하며, 상반신 클로즈업은 감지하지 못할 수 있음
+    """
+
+    def __init__(self, detect_width=PERSON_DETECT_WIDTH, min_score=PERSON_MIN_SCORE,
+                 nms_threshold=PERSON_NMS_THRESHOLD):
+        self.detect_width = detect_width
+        self.min_score = min_score
+        self.nms_threshold = nms_threshold
+        self.hog = cv2.HOGDescriptor()
+        self.hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+
+    def detect(self, image: np.ndarray, max_people=MAX_PEOPLE) -> List[Tuple[Tuple[int, int, int, int], float]]:
+        """
+        Returns:
+            [((x, y, w, h) 전체 프레임 픽셀, 점수)], 큰 박스(가까운 사람) 순
+        """
+        h, w = image.shape[:2]
+        scale = min(1.0, self.detect_width / float(w))
+        small = image if scale == 1.0 else cv2.resize(
+            image, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA
+        )
+
+        rects, weights = self.hog.detectMultiScale(small, winStride=(8, 8), padding=(8, 8), scale=1.05)
+        if len(rects) == 0:
+            return []
+
+        boxes = [[int(v) for v in rect] for rect in rects]
+        scores = [float(score) for score in np.ravel(weights)]
+        keep = cv2.dnn.NMSBoxes(boxes, scores, self.min_score, self.nms_threshold)
+
+        people = []
+        mx, my = PERSON_BOX_MARGIN
+        for index in np.ravel(keep) if len(keep) else []:
+            bx, by, bw, bh = (v / scale for v in boxes[index])
+            x0 = max(0, int(bx - bw * mx))
+            y0 = max(0, int(by - bh * my))
+            x1 = min(w, int(bx + bw * (1 + mx)))
+            y1 = min(h, int(by + bh * (1 + my)))
+            people.append(((x0, y0, x1 - x0, y1 - y0), scores[index]))
+
+        people.sort(key=lambda item: item[0][2] * item[0][3], reverse=True)
+        return people[:max_people]
+
+
+_PERSON_DETECTOR: Optional[PersonDetector] = None
+
+
+def get_person_detector() -> PersonDetector:
+    global _PERSON_DETECTOR
+    if _PERSON_DETECTOR is None:
+        _PERSON_DETECTOR = PersonDetector()
+    return _PERSON_DETECTOR
+
+
+# 모션 게이트: 축소 흑백 프레임의 평균 밝기 차이 (0-255)
+GATE_SIZE = (64, 48)
+# 사람이 있을 때 이 값 미만이면 이전 랜드마크 재사용
+MOTION_THRESHOLD = 1.5
+# 빈 장면일 때 이 값 미만이면 추론 생략 (사람이 들어오면 차이가 크므로 더 높게)
+EMPTY_THRESHOLD = 3.0
+# 연속 재사용/생략 최대 프레임 수 (느린 변화가 쌓여도 주기적으로 다시 추론)
+GATE_MAX_SKIP = 30
+
+GATE_COUNTERS = ("frames", "inferred", "reused", "skipped_empty")
+
+
+class MotionGate:
+    """
+    프레임 차이 게이트 (Holistic 추론 앞단)
+    마지막으로 추론한 프레임과 비교해 움직임이 없으면 추론하지 않음
+    - 사람이 있던 장면: 이전 랜드마크 재사용 ("reuse")
+    - 빈 장면: 추론 생략 ("empty")
+    임계값이 0이면 해당 경우는 항상 추론
+    """
+
+    def __init__(self, motion_threshold=MOTION_THRESHOLD, empty_threshold=EMPTY_THRESHOLD,
+                 max_skip=GATE_MAX_SKIP):
+        self.motion_threshold = float(motion_threshold)
+        self.empty_threshold = float(empty_threshold)
+        self.max_skip = int(max_skip)
+        # 비교용 버퍼는 세션 동안 재사용
+        self._small = np.empty((GATE_SIZE[1], GATE_SIZE[0], 3), dtype=np.uint8)
+        self._gray = np.empty((GATE_SIZE[1], GATE_SIZE[0]), dtype=np.uint8)
+        self._reference = np.empty_like(self._gray)
+        self._diff = np.empty_like(self._gray)
+        self._has_reference = False
+        self._skipped = 0
+        self.stats = {key: 0 for key in GATE_COUNTERS}
+
+    def check(self, image: np.ndarray, person_present: Optional[bool]) -> str:
+        """
+        Args:
+            image: 현재 프레임 (BGR)
+            person_present: 마지막 추론 결과 (None이면 아직 추론 전)
+
+        Returns:
+            "infer", "reuse" 또는 "empty"
+        """
+        self.stats["frames"] += 1
+        cv2.resize(image, GATE_SIZE, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+
+        threshold = self.motion_threshold if person_present else self.empty_threshold
+        if (self._has_reference and person_present is not None and threshold > 0
+                and self._skipped < self.max_skip):
+            cv2.absdiff(self._gray, self._reference, dst=self._diff)
+            if cv2.mean(self._diff)[0] < threshold:
+                self._skipped += 1
+                if person_present:
+                    self.stats["reused"] += 1
+                    return "reuse"
+                self.stats["skipped_empty"] += 1
+                return "empty"
+
+        # 추론할 프레임이 새 기준 (조금씩 변하는 장면도 기준과의 차이로 누적됨)
+        self._reference, self._gray = self._gray, self._reference
+        self._has_reference = True
+        self._skipped = 0
+        self.stats["inferred"] += 1
+        return "infer"
+
+
+# model_complexity="auto": 가벼운 모델부터 실행하고 품질이 낮을 때만 다음 단계로
+MODEL_COMPLEXITY_AUTO = "auto"
+CASCADE_LEVELS = (0, 1, 2)
+# 이 품질 점수(0-100) 이상이면 더 무거운 모델을 실행하지 않음 ("good" 등급)
+CASCADE_QUALITY = 60.0
+# auto일 때 단계를 나눌 수 없는 경로(스트리밍 추적, 여러 사람 크롭)가 쓰는 모델
+CASCADE_FIXED_LEVEL = 1
+
+
+def parse_model_complexity(value):
+    """
+    model_complexity 검증 (CLI, 데몬, 배치, 파이프라인 공용)
+
+    Returns:
+        0, 1, 2 또는 "auto"
+
+    Raises:
+        ValueError: 지원하지 않는 값 (데몬은 400, CLI는 {"success": false, "error"}로 응답)
+    """
+    if value == MODEL_COMPLEXITY_AUTO:
+        return MODEL_COMPLEXITY_AUTO
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value not in CASCADE_LEVELS:
+        raise ValueError(f"model_complexity는 0, 1, 2 또는 auto여야 합니다: {value!r}")
+    return int(value)
+
+
+def parse_cascade_quality(value) -> float:
+    """cascade_quality 검증 (0-100 품질 점수)"""
+    try:
+        quality = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"cascade_quality는 0-100 사이 숫자여야 합니다: {value!r}")
+    if not 0.0 <= quality <= 100.0:
+        raise ValueError(f"cascade_quality는 0-100 사이 숫자여야 합니다: {value!r}")
+    return quality
+
+# 그래프를 만들 수 없었던 단계 (mediapipe 패키지에는 1(full) 모델만 포함되고
+# 0(lite), 2(heavy)는 처음 쓸 때 내려받으므로 오프라인이면 실패, 매 요청 재시도하지 않음)
+# 실패 시각(time.monotonic())을 기록하고 LEVEL_RETRY_INTERVAL초가 지나면 다시 시도 (일시적 오프라인 대비)
+# 요청 스레드/인물별 스레드 풀이 함께 쓰므로 _GRAPH_CACHE_LOCK으로 보호
+_UNAVAILABLE_LEVELS: Dict[int, float] = {}
+LEVEL_RETRY_INTERVAL = 300.0
+
+
+class PoseStream:
+    """
+    카메라 세션별 스트리밍 상태
+    tracking 모드(static_image_mode=False) Holistic을 세션 동안 유지하여
+    이전 프레임의 랜드마크로부터 추적 (매 프레임 전체 감지 생략)
+    """
+
+    def __init__(self, session_id: str, model_complexity=1,
+                 min_detection_confidence=0.5, min_tracking_confidence=0.5,
+                 gate: Optional[MotionGate] = None, smoother: Optional[LandmarkSmoother] = None):
+        self.session_id = session_id
+        self.holistic = mp.solutions.holistic.Holistic(
+            static_image_mode=False,
+            model_complexity=model_complexity,
+            enable_segmentation=False,
+            refine_face_landmarks=True,
+            min_detection_confidence=min_detection_confidence,
+            min_tracking_confidence=min_tracking_confidence
+        )
+        # 같은 세션의 프레임은 순서대로 처리되어야 함
+        self.lock = threading.Lock()
+        self.frame_count = 0
+        self.last_used = time.monotonic()
+        # 움직임이 없으면 마지막 추론 결과 재사용
+        self.gate = gate or MotionGate()
+        self.landmarks: Optional[Dict[str, Optional[np.ndarray]]] = None
+        self.person_present: Optional[bool] = None
+        # 감지 직후 좌표 떨림 제거 (None이면 필터 없음)
+        self.smoother = smoother
+        # 캡처용 최근 프레임 품질
+        self.burst = BurstSelector()
+
+    def close(self):
+        self.holistic.close()
+
 
 class AdvancedPoseDetector:
-    def __init__(self, model_complexity=1, min_detection_confidence=0.5, min_tracking_confidence=0.5):
+    def __init__(self, model_complexity=1, min_detection_confidence=0.5, min_tracking_confidence=0.5,
+                 working_size=WORKING_MAX_SIDE, cascade_quality=CASCADE_QUALITY):
         """
         고도화된 포즈 감지기 초기화
+        그래프는 처음 사용할 때 생성되며 같은 설정의 감지기끼리 공유됨
 
         Args:
-            model_complexity: 0 (빠름), 1 (균형), 2 (정확)
+            model_complexity: 0 (빠름), 1 (균형), 2 (정확) 또는
+                "auto" (단일 인물 감지를 0부터 실행하고 품질이 cascade_quality 미만일 때만 1, 2로 재시도)
             min_detection_confidence: 감지 신뢰도 임계값 (0.0-1.0)
             min_tracking_confidence: 추적 신뢰도 임계값 (0.0-1.0)
+            working_size: 추론 작업 해상도 (긴 변 픽셀, 0이면 원본 해상도)
+            cascade_quality: auto 모드에서 다음 모델로 넘어가지 않을 품질 점수 (0-100)
+
+        Raises:
+            ValueError: 지원하지 않는 model_complexity 또는 cascade_quality
         """
-        # Holistic: 포즈 + 손 + 얼굴 통합 감지
+        model_complexity = parse_model_complexity(model_complexity)
+        # auto: 단일 인물은 CASCADE_LEVELS 순서로, 나머지 경로는 CASCADE_FIXED_LEVEL 고정
+        self.cascade = CASCADE_LEVELS if model_complexity == MODEL_COMPLEXITY_AUTO else None
+        self.model_complexity = CASCADE_FIXED_LEVEL if self.cascade else model_complexity
+        self.cascade_quality = parse_cascade_quality(cascade_quality)
+        self.min_detection_confidence = min_detection_confidence
+        self.min_tracking_confidence = min_tracking_confidence
+        self.working_size = working_size
+
         self.mp_holistic = mp.solutions.holistic
         self.mp_drawing = mp.solutions.drawing_utils
         self.mp_drawing_styles = mp.solutions.drawing_styles
+        self.mp_pose = mp.solutions.pose
+        self.renderer = get_renderer()
+
+        # 스트리밍 세션 (session_id -> PoseStream)
+        self._streams: Dict[str, PoseStream] = {}
+        self._streams_lock = threading.Lock()
+        # 닫힌 세션까지 포함한 모션 게이트 누적 카운터
+        self._gate_totals = {key: 0 for key in GATE_COUNTERS}
+
+    @property
+    def holistic(self):
+        """Holistic: 포즈 + 손 + 얼굴 통합 감지 (지연 생성)"""
+        return get_holistic(
+            self.model_complexity,
+            self.min_detection_confidence,
+            self.min_tracking_confidence
+        )
+
+    @property
+    def pose_detector(self):
+        """포즈 전용 감지기 (지연 생성, 현재 내부 경로에서는 사용하지 않음)"""
+        return get_pose_graph(
+            self.model_complexity,
+            self.min_detection_confidence,
+            self.min_tracking_confidence
+        )
 
-        self.holistic = self.mp_holistic.Holistic(
-            static_image_mode=True,
+    def configured(self, model_complexity=None, cascade_quality=None) -> "AdvancedPoseDetector":
+        """
+        다른 model_complexity (또는 "auto")를 쓰는 감지기 반환
+        그래프 캐시를 공유하므로 생성 비용이 거의 없음
+        """
+        current = MODEL_COMPLEXITY_AUTO if self.cascade else self.model_complexity
+        model_complexity = current if model_complexity is None else parse_model_complexity(model_complexity)
+        cascade_quality = (self.cascade_quality if cascade_quality is None
+                           else parse_cascade_quality(cascade_quality))
+        if model_complexity == current and cascade_quality == self.cascade_quality:
+            return self
+        return AdvancedPoseDetector(
             model_complexity=model_complexity,
-            enable_segmentation=False,
-            refine_face_landmarks=True,
-            min_detection_confidence=min_detection_confidence,
-            min_tracking_confidence=min_tracking_confidence
+            min_detection_confidence=self.min_detection_confidence,
+            min_tracking_confidence=self.min_tracking_confidence,
+            working_size=self.working_size,
+            cascade_quality=cascade_quality
         )
 
-        # 여러 사람 감지용 (포즈만)
-        self.mp_pose = mp.solutions.pose
-        self.pose_detector = self.mp_pose.Pose(
-            static_image_mode=True,
+    def warmup(self, holistic=True, pose=False) -> Dict:
+        """
+        그래프를 미리 생성하고 빈 프레임으로 한 번 실행 (첫 요청 지연 제거)
+
+        Args:
+            holistic: Holistic 그래프 준비
+            pose: 포즈 전용 그래프 준비
+        """
+        dummy = np.zeros((64, 64, 3), dtype=np.uint8)
+        if holistic:
+            self.holistic.process(dummy)
+            if self.cascade:
+                # 대부분의 요청이 끝나는 첫 단계 모델
+                graph = self._cascade_holistic(self.cascade[0])
+                if graph is not None:
+                    graph.process(dummy)
+        if pose:
+            self.pose_detector.process(dummy)
+        return {"success": True, "graphs": [list(key) for key in loaded_graphs()]}
+
+    def open_stream(self, session_id: Optional[str] = None, model_complexity=None,
+                    motion_threshold=None, empty_threshold=None,
+                    smoothing=True, min_cutoff=None, beta=None) -> str:
+        """
+        스트리밍 세션 시작 (라이브 프리뷰용)
+
+        Args:
+            session_id: 세션 ID (없으면 생성)
+            model_complexity: 세션 모델 복잡도 0, 1, 2 (없으면 감지기 설정,
+                "auto"는 단계를 나눌 수 없으므로 CASCADE_FIXED_LEVEL)
+            motion_threshold: 이전 랜드마크 재사용 임계값 (MotionGate, 0이면 항상 추론)
+            empty_threshold: 빈 장면 추론 생략 임계값 (MotionGate, 0이면 항상 추론)
+            smoothing: 랜드마크 One-Euro 필터 사용 (LandmarkSmoother)
+            min_cutoff, beta: One-Euro 필터 설정 (없으면 landmark_filter 기본값)
+
+        Returns:
+            세션 ID
+
+        Raises:
+            ValueError: 지원하지 않는 model_complexity
+        """
+        if model_complexity is None:
+            model_complexity = self.model_complexity
+        elif parse_model_complexity(model_complexity) == MODEL_COMPLEXITY_AUTO:
+            model_complexity = CASCADE_FIXED_LEVEL
+        else:
+            model_complexity = int(model_complexity)
+
+        session_id = session_id or uuid.uuid4().hex
+        stream = PoseStream(
+            session_id,
             model_complexity=model_complexity,
-            enable_segmentation=False,
-            min_detection_confidence=min_detection_confidence
+            min_detection_confidence=self.min_detection_confidence,
+            min_tracking_confidence=self.min_tracking_confidence,
+            gate=MotionGate(
+                MOTION_THRESHOLD if motion_threshold is None else motion_threshold,
+                EMPTY_THRESHOLD if empty_threshold is None else empty_threshold
+            ),
+            smoother=LandmarkSmoother(
+                SMOOTH_MIN_CUTOFF if min_cutoff is None else min_cutoff,
+                SMOOTH_BETA if beta is None else beta
+            ) if smoothing else None
         )
+        with self._streams_lock:
+            previous = self._streams.pop(session_id, None)
+            self._streams[session_id] = stream
+        if previous:
+            self._retire_stream(previous)
+        return session_id
+
+    def push_frame(self, session_id: str, image: np.ndarray, output_path: Optional[str] = None,
+                   draw_hands=True, draw_face=True, colorful=False,
+                   skeleton_encoding="base64", skeleton_format="mediapipe",
+                   render="both", landmarks_format=None, output_size=None) -> Dict:
+        """
+        스트리밍 세션에 프레임 전달 (이전 프레임 기준 추적)
+        추적 모드 Holistic은 이전 프레임 좌표로 자체 ROI를 잡으므로 작업 해상도 축소만 하고 잘라내지 않음
+        (프레임마다 크롭 영역이 바뀌면 추적 좌표계가 어긋남)
+        감지한 랜드마크는 그리기 전에 세션 필터로 평활화
+
+        Args:
+            session_id: open_stream()이 반환한 세션 ID
+            image: 입력 프레임 (BGR)
+            output_path: 스켈레톤 저장 경로 (없으면 응답으로만 반환)
+            skeleton_encoding: "base64" 또는 "bytes" (process_single_person 참고)
+            skeleton_format, render, landmarks_format, output_size: process_single_person 참고
+        """
+        with self._streams_lock:
+            stream = self._streams.get(session_id)
+        if stream is None:
+            return {"success": False, "error": "스트림 세션을 찾을 수 없습니다"}
+
+        with stream.lock:
+            stream.frame_count += 1
+            now = stream.last_used = time.monotonic()
+            try:
+                gate = stream.gate.check(image, stream.person_present)
+                if gate == "infer":
+                    stream.landmarks = self._detect_landmarks(image, stream.holistic)
+                    stream.person_present = stream.landmarks is not None
+                    if stream.smoother is not None:
+                        if stream.landmarks is None:
+                            stream.smoother.reset()
+                        else:
+                            stream.smoother.apply(stream.landmarks, now)
+
+                if stream.landmarks is None:
+                    result = {"success": False, "error": "포즈를 감지할 수 없습니다"}
+                else:
+                    result = self._person_result(
+                        stream.landmarks, image.shape[1], image.shape[0], output_path,
+                        draw_hands=draw_hands,
+                        draw_face=draw_face,
+                        colorful=colorful,
+                        skeleton_encoding=skeleton_encoding,
+                        skeleton_format=skeleton_format,
+                        render=render,
+                        landmarks_format=landmarks_format,
+                        output_size=output_size
+                    )
+                    if gate == "infer":
+                        # 재사용 프레임은 이전 추론 점수라 실제 프레임 품질과 다를 수 있으므로 후보에서 제외
+                        stream.burst.record(stream.frame_count, result["pose_quality"]["overall_score"], now)
+            except Exception as e:
+                gate = "infer"
+                result = {"success": False, "error": str(e)}
+
+        result["session_id"] = session_id
+        result["gate"] = gate
+        result["frame_index"] = stream.frame_count
+        return result
+
+    def best_stream_frame(self, session_id: str, max_age: Optional[float] = None) -> Dict:
+        """
+        세션의 최근 프레임 중 포즈 품질이 가장 높은 프레임 (연속 촬영 후 캡처할 프레임 선택)
+
+        Args:
+            session_id: 세션 ID
+            max_age: 이 시간(초)보다 오래된 프레임 제외 (없으면 최근 BURST_SIZE 프레임 전체)
+
+        Returns:
+            {"success", "frame_index" (push_frame 응답의 frame_index), "overall_score"}
+        """
+        with self._streams_lock:
+            stream = self._streams.get(session_id)
+        if stream is None:
+            return {"success": False, "error": "스트림 세션을 찾을 수 없습니다"}
+
+        with stream.lock:
+            best = stream.burst.best(time.monotonic(), max_age)
+        if best is None:
+            return {"success": False, "error": "포즈가 감지된 프레임이 없습니다"}
+        frame_index, score = best
+        return {
+            "success": True,
+            "session_id": session_id,
+            "frame_index": frame_index,
+            "overall_score": round(score, 2)
+        }
+
+    def close_stream(self, session_id: str) -> bool:
+        """스트리밍 세션 종료"""
+        with self._streams_lock:
+            stream = self._streams.pop(session_id, None)
+        if stream is None:
+            return False
+        self._retire_stream(stream)
+        return True
+
+    def _retire_stream(self, stream: PoseStream):
+        with stream.lock:
+            stream.close()
+            with self._streams_lock:
+                for key in GATE_COUNTERS:
+                    self._gate_totals[key] += stream.gate.stats[key]
+
+    def gate_stats(self) -> Dict:
+        """모션 게이트 카운터 (전체 누적 + 열린 세션별)"""
+        with self._streams_lock:
+            streams = list(self._streams.values())
+            totals = dict(self._gate_totals)
+        sessions = {}
+        for stream in streams:
+            stats = dict(stream.gate.stats)
+            sessions[stream.session_id] = stats
+            for key in GATE_COUNTERS:
+                totals[key] += stats[key]
+        frames = totals["frames"]
+        totals["skip_ratio"] = round((frames - totals["inferred"]) / frames, 3) if frames else 0.0
+        return {"totals": totals, "sessions": sessions}
+
+    def close_idle_streams(self, max_idle_seconds=60.0) -> int:
+        """일정 시간 프레임이 없던 세션 정리 (카메라 탭을 닫지 않고 떠난 경우)"""
+        now = time.monotonic()
+        with self._streams_lock:
+            idle = [sid for sid, stream in self._streams.items()
+                    if now - stream.last_used > max_idle_seconds]
+        return sum(1 for sid in idle if self.close_stream(sid))
 
     def calculate_pose_quality(self, landmarks, landmark_type="pose") -> Dict:
         """
-        포즈 품질 점수 계산
+        포즈 품질 점수 계산 (벡터화)
+
+        Args:
+            landmarks: (N, 5) 랜드마크 배열 또는 MediaPipe 랜드마크 리스트
+            landmark_type: "pose", "left_hand", "right_hand", "face"
 
         Returns:
             dict: {
@@ -61,7 +805,10 @@ class AdvancedPoseDetector:
                 "quality_level": str  # "excellent", "good", "fair", "poor"
             }
         """
-        if not landmarks:
+        if landmarks is not None and not isinstance(landmarks, np.ndarray):
+            landmarks = landmarks_to_array(landmarks)
+
+        if landmarks is None or len(landmarks) == 0:
             return {
                 "overall_score": 0,
                 "visibility_score": 0,
@@ -70,26 +817,14 @@ class AdvancedPoseDetector:
                 "quality_level": "none"
             }
 
-        visible_count = 0
-        present_count = 0
-        total_visibility = 0
-        total_presence = 0
-        total_landmarks = len(landmarks.landmark)
-
-        for landmark in landmarks.landmark:
-            if hasattr(landmark, 'visibility'):
-                total_visibility += landmark.visibility
-                if landmark.visibility > 0.5:
-                    visible_count += 1
-
-            if hasattr(landmark, 'presence'):
-                total_presence += landmark.presence
-                if landmark.presence > 0.5:
-                    present_count += 1
+        total_landmarks = len(landmarks)
+        visibility = landmarks[:, LANDMARK_VISIBILITY]
+        presence = landmarks[:, LANDMARK_PRESENCE]
 
-        visibility_score = (total_visibility / total_landmarks) * 100 if total_landmarks > 0 else 0
-        presence_score = (total_presence / total_landmarks) * 100 if total_landmarks > 0 else 0
-        coverage = (visible_count / total_landmarks) * 100 if total_landmarks > 0 else 0
+        visible_count = int(np.count_nonzero(visibility > 0.5))
+        visibility_score = float(visibility.mean()) * 100
+        presence_score = float(presence.mean()) * 100
+        coverage = (visible_count / total_landmarks) * 100
 
         # 전체 점수 (가중 평균)
         overall_score = (visibility_score * 0.5 + presence_score * 0.3 + coverage * 0.2)
@@ -122,7 +857,7 @@ class AdvancedPoseDetector:
 
         Args:
             image: 그릴 이미지
-            results: Holistic 결과
+            results: Holistic 결과 또는 extract_landmark_arrays() 결과
             draw_pose: 포즈 그리기 여부
             draw_hands: 손 그리기 여부
             draw_face: 얼굴 그리기 여부
@@ -131,194 +866,421 @@ class AdvancedPoseDetector:
         Returns:
             스켈레톤이 그려진 이미지
         """
-        if colorful:
-            # OpenPose 스타일 컬러 스켈레톤
-            if draw_pose and results.pose_landmarks:
-                self.mp_drawing.draw_landmarks(
-                    image,
-                    results.pose_landmarks,
-                    self.mp_holistic.POSE_CONNECTIONS,
-                    landmark_drawing_spec=self.mp_drawing_styles.get_default_pose_landmarks_style()
-                )
-
-            if draw_hands:
-                # 왼손 (빨간색)
-                if results.left_hand_landmarks:
-                    self.mp_drawing.draw_landmarks(
-                        image,
-                        results.left_hand_landmarks,
-                        self.mp_holistic.HAND_CONNECTIONS,
-                        landmark_drawing_spec=mp.solutions.drawing_utils.DrawingSpec(
-                            color=(255, 0, 0), thickness=2, circle_radius=2
-                        ),
-                        connection_drawing_spec=mp.solutions.drawing_utils.DrawingSpec(
-                            color=(255, 100, 100), thickness=2
-                        )
-                    )
+        landmarks = results if isinstance(results, dict) else extract_landmark_arrays(results)
+        return self.renderer.draw(
+            image, landmarks,
+            draw_pose=draw_pose,
+            draw_hands=draw_hands,
+            draw_face=draw_face,
+            colorful=colorful
+        )
 
-                # 오른손 (초록색)
-                if results.right_hand_landmarks:
-                    self.mp_drawing.draw_landmarks(
-                        image,
-                        results.right_hand_landmarks,
-                        self.mp_holistic.HAND_CONNECTIONS,
-                        landmark_drawing_spec=mp.solutions.drawing_utils.DrawingSpec(
-                            color=(0, 255, 0), thickness=2, circle_radius=2
-                        ),
-                        connection_drawing_spec=mp.solutions.drawing_utils.DrawingSpec(
-                            color=(100, 255, 100), thickness=2
-                        )
-                    )
+    def _infer(self, image: np.ndarray, holistic, roi: Optional[List[int]],
+               working_size: int) -> Optional[Dict[str, Optional[np.ndarray]]]:
+        """
+        ROI 크롭 + 작업 해상도 축소 후 Holistic 실행
+        색 변환/추론은 축소된 영상에만 적용, 좌표는 전체 프레임 기준으로 변환해 반환
+        """
+        height, width = image.shape[:2]
+        box = (0, 0, width, height)
+        if roi is not None:
+            x, y, w, h = roi
+            x, y = max(0, int(x)), max(0, int(y))
+            w, h = min(width - x, int(w)), min(height - y, int(h))
+            if w > 1 and h > 1:
+                box = (x, y, w, h)
 
-            if draw_face and results.face_landmarks:
-                # 얼굴 (파란색)
-                self.mp_drawing.draw_landmarks(
-                    image,
-                    results.face_landmarks,
-                    self.mp_holistic.FACEMESH_CONTOURS,
-                    landmark_drawing_spec=None,
-                    connection_drawing_spec=mp.solutions.drawing_utils.DrawingSpec(
-                        color=(80, 110, 255), thickness=1
-                    )
-                )
-        else:
-            # ControlNet용 흰색 스켈레톤
-            white_spec_landmark = mp.solutions.drawing_utils.DrawingSpec(
-                color=(255, 255, 255), thickness=3, circle_radius=3
-            )
-            white_spec_connection = mp.solutions.drawing_utils.DrawingSpec(
-                color=(255, 255, 255), thickness=2
+        x, y, w, h = box
+        view = image[y:y + h, x:x + w]
+        if working_size and max(w, h) > working_size:
+            scale = working_size / float(max(w, h))
+            view = cv2.resize(
+                view, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA
             )
 
-            if draw_pose and results.pose_landmarks:
-                self.mp_drawing.draw_landmarks(
-                    image, results.pose_landmarks,
-                    self.mp_holistic.POSE_CONNECTIONS,
-                    landmark_drawing_spec=white_spec_landmark,
-                    connection_drawing_spec=white_spec_connection
-                )
+        results = holistic.process(cv2.cvtColor(view, cv2.COLOR_BGR2RGB))
+        if not results.pose_landmarks:
+            return None
 
-            if draw_hands:
-                if results.left_hand_landmarks:
-                    self.mp_drawing.draw_landmarks(
-                        image, results.left_hand_landmarks,
-                        self.mp_holistic.HAND_CONNECTIONS,
-                        landmark_drawing_spec=white_spec_landmark,
-                        connection_drawing_spec=white_spec_connection
-                    )
+        landmarks = extract_landmark_arrays(results)
+        if box != (0, 0, width, height):
+            crop_to_frame(landmarks, box, width, height)
+        return landmarks
 
-                if results.right_hand_landmarks:
-                    self.mp_drawing.draw_landmarks(
-                        image, results.right_hand_landmarks,
-                        self.mp_holistic.HAND_CONNECTIONS,
-                        landmark_drawing_spec=white_spec_landmark,
-                        connection_drawing_spec=white_spec_connection
-                    )
+    def _detect_landmarks(self, image: np.ndarray, holistic=None, working_size=None,
+                          roi=None) -> Optional[Dict[str, Optional[np.ndarray]]]:
+        """Holistic 감지 (랜드마크 배열 변환은 한 번만, ROI에서 못 찾으면 전체 프레임 재시도)"""
+        holistic = holistic or self.holistic
+        if working_size is None:
+            working_size = self.working_size
 
-            if draw_face and results.face_landmarks:
-                # 얼굴은 테두리만 (전체는 너무 복잡)
-                self.mp_drawing.draw_landmarks(
-                    image, results.face_landmarks,
-                    self.mp_holistic.FACEMESH_CONTOURS,
-                    landmark_drawing_spec=None,
-                    connection_drawing_spec=mp.solutions.drawing_utils.DrawingSpec(
-                        color=(255, 255, 255), thickness=1
-                    )
-                )
+        landmarks = self._infer(image, holistic, roi, working_size)
+        if landmarks is None and roi is not None:
+            # 사람이 ROI 밖으로 움직임: 전체 프레임에서 다시 찾기
+            landmarks = self._infer(image, holistic, None, working_size)
+        return landmarks
 
-        return image
+    def _cascade_holistic(self, level: int):
+        """
+        단계별 그래프 (모델을 준비할 수 없으면 None, 해당 단계는 건너뜀)
+        실패한 단계는 LEVEL_RETRY_INTERVAL초 동안 건너뛰고 그 뒤에 다시 시도
+        """
+        with _GRAPH_CACHE_LOCK:
+            failed_at = _UNAVAILABLE_LEVELS.get(level)
+            if failed_at is not None and time.monotonic() - failed_at < LEVEL_RETRY_INTERVAL:
+                return None
+        # get_holistic이 같은 잠금을 잡으므로 잠금 밖에서 호출
+        try:
+            holistic = get_holistic(level, self.min_detection_confidence, self.min_tracking_confidence)
+        except Exception as e:
+            with _GRAPH_CACHE_LOCK:
+                _UNAVAILABLE_LEVELS[level] = time.monotonic()
+            sys.stderr.write(f"[pose] model_complexity={level} 모델을 사용할 수 없어 "
+                             f"{LEVEL_RETRY_INTERVAL:.0f}초 동안 건너뜁니다: {e}\n")
+            return None
+        with _GRAPH_CACHE_LOCK:
+            _UNAVAILABLE_LEVELS.pop(level, None)
+        return holistic
 
-    def process_single_person(self, image: np.ndarray, output_path: str,
-                             draw_hands=True, draw_face=True, colorful=False) -> Dict:
+    def _detect_cascade(self, image: np.ndarray, working_size=None, roi=None):
+        """
+        model_complexity="auto": 가벼운 모델부터 감지하고 품질이 cascade_quality 이상이면 중단
+        (포즈를 못 찾은 경우도 다음 모델로 재시도)
+
+        Returns:
+            (랜드마크, 포즈 품질, 사용한 model_complexity), 모두 실패하면 랜드마크는 None
+        """
+        best = (None, None, self.cascade[-1])
+        for level in self.cascade:
+            holistic = self._cascade_holistic(level)
+            if holistic is None:
+                continue
+            landmarks = self._detect_landmarks(image, holistic, working_size, roi)
+            if landmarks is None:
+                continue
+            quality = self.calculate_pose_quality(landmarks["pose"], "pose")
+            if best[1] is None or quality["overall_score"] > best[1]["overall_score"]:
+                best = (landmarks, quality, level)
+            if quality["overall_score"] >= self.cascade_quality:
+                break
+        return best
+
+    def process_single_person(self, image: np.ndarray, output_path: Optional[str],
+                             draw_hands=True, draw_face=True, colorful=False,
+                             holistic=None, skeleton_encoding="base64",
+                             skeleton_format="mediapipe", render="both",
+                             landmarks_format=None, working_size=None,
+                             roi=None, output_size=None, min_quality=0.0) -> Dict:
         """
         단일 인물 감지 (포즈 + 손 + 얼굴)
 
         Args:
             image: 입력 이미지 (BGR)
-            output_path: 저장 경로
+            output_path: 저장 경로 (None이면 파일 저장 생략)
             draw_hands: 손 그리기 여부
             draw_face: 얼굴 그리기 여부
             colorful: 컬러풀한 스켈레톤
+            holistic: 사용할 Holistic 그래프 (없으면 정지 이미지용 공유 그래프)
+            skeleton_encoding: "base64" (skeleton_base64 문자열) 또는
+                "bytes" (skeleton_png 원본 PNG 바이트, 바이너리 응답용)
+            skeleton_format: "mediapipe" (기본 스켈레톤),
+                "openpose" (ControlNet OpenPose 컬러 맵 + COCO-18 JSON) 또는
+                "openpose_body25" (컬러 맵 + BODY_25 JSON)
+            render: 스켈레톤 이미지 출력
+                "none" (그리기/인코딩 생략), "file" (output_path에만 저장),
+                "base64" (응답에만 포함, skeleton_encoding 형식), "both" (저장 + 응답)
+            landmarks_format: 정규화 랜드마크 출력
+                None (render가 "none"이면 "json", 아니면 생략), "none" (항상 생략, 품질 점수만 필요할 때),
+                "json" (landmarks), "binary" (pack_landmarks 블롭:
+                skeleton_encoding이 "bytes"면 landmarks_blob, 아니면 landmarks_base64)
+            working_size: 추론 작업 해상도 (긴 변, None이면 감지기 설정, 0이면 원본)
+            roi: 이 영역 (x, y, w, h)만 잘라서 추론 (이전 프레임 pose_box, 실패하면 전체 프레임 재시도)
+            output_size: 스켈레톤 이미지 크기 (w, h), None이면 입력 이미지 크기
+            min_quality: 최소 품질 점수 (0-100), 미만이면 렌더링/인코딩 없이 실패 처리
 
         Returns:
-            결과 딕셔너리
+            결과 딕셔너리 (pose_box: 다음 프레임 ROI로 쓸 포즈 박스,
+            model_complexity: 실제로 사용한 모델)
         """
         try:
-            # RGB로 변환
-            image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-
-            # Holistic 감지
-            results = self.holistic.process(image_rgb)
+            pose_quality = None
+            if holistic is None and self.cascade:
+                landmarks, pose_quality, level = self._detect_cascade(image, working_size, roi)
+            else:
+                landmarks = self._detect_landmarks(image, holistic, working_size, roi)
+                level = self.model_complexity
 
             # 포즈 감지 확인
-            if not results.pose_landmarks:
+            if landmarks is None:
                 return {"success": False, "error": "포즈를 감지할 수 없습니다"}
 
-            # 품질 점수 계산
-            pose_quality = self.calculate_pose_quality(results.pose_landmarks, "pose")
+            result = self._person_result(
+                landmarks, image.shape[1], image.shape[0], output_path,
+                draw_hands=draw_hands,
+                draw_face=draw_face,
+                colorful=colorful,
+                skeleton_encoding=skeleton_encoding,
+                skeleton_format=skeleton_format,
+                render=render,
+                landmarks_format=landmarks_format,
+                output_size=output_size,
+                min_quality=min_quality,
+                pose_quality=pose_quality
+            )
+            result["model_complexity"] = level
+            return result
 
-            # 검은 배경에 스켈레톤 그리기
-            h, w = image.shape[:2]
-            skeleton_image = np.zeros((h, w, 3), dtype=np.uint8)
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def _person_result(self, landmarks: Dict[str, Optional[np.ndarray]], width: int, height: int,
+                       output_path: Optional[str], draw_hands=True, draw_face=True, colorful=False,
+                       skeleton_encoding="base64", skeleton_format="mediapipe", render="both",
+                       landmarks_format=None, output_size=None, min_quality=0.0,
+                       pose_quality: Optional[Dict] = None) -> Dict:
+        """
+        전체 프레임 기준 랜드마크로 결과 구성 (품질, 랜드마크 직렬화, 스켈레톤 렌더링)
+        인자는 process_single_person 참고 (width, height: 입력 프레임 크기,
+        pose_quality: 이미 계산한 품질 점수)
+        """
+        # 품질 점수 계산
+        if pose_quality is None:
+            pose_quality = self.calculate_pose_quality(landmarks["pose"], "pose")
+        if pose_quality["overall_score"] < min_quality:
+            # 버릴 결과이므로 직렬화/렌더링 생략
+            return self.quality_failure(pose_quality)
 
-            # 스켈레톤 그리기
-            skeleton_image = self.draw_advanced_skeleton(
-                skeleton_image, results,
+        result = {
+            "success": True,
+            "skeleton_path": None,
+            "pose_quality": pose_quality,
+            "detected_features": {
+                part: array is not None for part, array in landmarks.items()
+            },
+            "pose_box": pose_box(landmarks["pose"], width, height),
+            "message": f"포즈 감지 성공 (품질: {pose_quality['quality_level']})"
+        }
+
+        if landmarks_format is None and render == "none":
+            landmarks_format = "json"
+        if landmarks_format == "json":
+            result["landmarks"] = {
+                part: landmarks_to_list(array) for part, array in landmarks.items()
+            }
+        elif landmarks_format == "binary":
+            blob, result["landmarks_layout"] = pack_landmarks(landmarks)
+            if skeleton_encoding == "bytes":
+                result["landmarks_blob"] = blob
+            else:
+                result["landmarks_base64"] = base64.b64encode(blob).decode('utf-8')
+
+        # 이미지 작업은 요청된 경우에만 (캔버스, 그리기, PNG 인코딩)
+        save_file = render in ("file", "both") and bool(output_path)
+        inline_image = render in ("base64", "both")
+        if not (save_file or inline_image):
+            return result
+
+        # 검은 배경에 스켈레톤 그리기 (해상도별 캔버스 재사용, 바로 인코딩)
+        # 랜드마크는 정규화 좌표이므로 요청한 출력 크기에 바로 그림
+        w, h = (int(output_size[0]), int(output_size[1])) if output_size else (width, height)
+        if skeleton_format in ("openpose", "openpose_body25"):
+            # ControlNet 맵은 항상 COCO-18 기준, JSON만 요청한 레이아웃으로
+            keypoints = to_openpose_keypoints(landmarks, "COCO18")
+            skeleton_image = render_openpose(
+                keypoints, h, w,
+                draw_hands=draw_hands,
+                draw_face=draw_face,
+                canvas=self.renderer.canvas(h, w)
+            )
+            if skeleton_format == "openpose_body25":
+                keypoints = to_openpose_keypoints(landmarks, "BODY_25")
+            result["openpose"] = to_openpose_json(keypoints, w, h)
+        else:
+            skeleton_image = self.renderer.render(
+                landmarks, h, w,
                 draw_pose=True,
                 draw_hands=draw_hands,
                 draw_face=draw_face,
                 colorful=colorful
             )
 
-            # 저장
-            cv2.imwrite(output_path, skeleton_image)
+        return self._encode_skeleton(
+            result, skeleton_image, output_path, save_file, inline_image, skeleton_encoding
+        )
 
-            # Base64 인코딩
-            _, buffer = cv2.imencode('.png', skeleton_image)
-            skeleton_base64 = base64.b64encode(buffer).decode('utf-8')
+    @staticmethod
+    def _encode_skeleton(result: Dict, skeleton_image: np.ndarray, output_path: Optional[str],
+                         save_file: bool, inline_image: bool, skeleton_encoding: str) -> Dict:
+        """스켈레톤 PNG 저장/응답 (인코딩은 한 번만, 파일 저장과 응답이 같은 버퍼를 사용)"""
+        encoded, buffer = cv2.imencode('.png', skeleton_image)
+        if not encoded:
+            return {"success": False, "error": "스켈레톤 이미지 인코딩 실패"}
 
-            return {
-                "success": True,
-                "skeleton_path": output_path,
-                "skeleton_base64": skeleton_base64,
-                "pose_quality": pose_quality,
-                "detected_features": {
-                    "pose": True,
-                    "left_hand": results.left_hand_landmarks is not None,
-                    "right_hand": results.right_hand_landmarks is not None,
-                    "face": results.face_landmarks is not None
-                },
-                "message": f"포즈 감지 성공 (품질: {pose_quality['quality_level']})"
-            }
+        # 저장
+        if save_file:
+            with open(output_path, 'wb') as f:
+                f.write(buffer)
+            result["skeleton_path"] = output_path
 
-        except Exception as e:
-            return {"success": False, "error": str(e)}
+        if inline_image:
+            if skeleton_encoding == "bytes":
+                result["skeleton_png"] = buffer.tobytes()
+            else:
+                result["skeleton_base64"] = base64.b64encode(buffer).decode('utf-8')
+
+        return result
+
+    def _detect_person_crop(self, image: np.ndarray, box: Tuple[int, int, int, int]):
+        """인물 크롭 하나에 Holistic 실행 (워커 스레드에서 스레드별 그래프 사용, 크롭 기준 좌표)"""
+        x, y, w, h = box
+        crop = image[y:y + h, x:x + w]
+        scale = min(1.0, PERSON_CROP_MAX_SIDE / float(max(w, h)))
+        if scale < 1.0:
+            crop = cv2.resize(
+                crop, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA
+            )
+        results = get_thread_holistic(self.model_complexity, self.min_detection_confidence).process(
+            cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
+        )
+        if not results.pose_landmarks:
+            return None
+        return extract_landmark_arrays(results)
 
-    def detect_multiple_people(self, image: np.ndarray) -> List[Dict]:
+    def detect_multiple_people(self, image: np.ndarray, max_people=MAX_PEOPLE) -> List[Dict]:
         """
-        여러 사람 감지 (간단한 구현)
-        주의: MediaPipe는 기본적으로 단일 인물용이므로,
-        이미지를 분할하거나 다른 방법이 필요할 수 있음
+        여러 사람 감지 (2단계)
+        1. 전체 프레임을 줄여서 인물 박스 감지 (PersonDetector)
+        2. 박스별 크롭에 Holistic을 워커 풀에서 병렬 실행 후 전체 프레임 좌표로 변환
+        비용은 프레임 크기가 아니라 사람 수에 비례 (크롭은 PERSON_CROP_MAX_SIDE 이하로 축소)
+
+        전신 박스가 하나도 없으면 (상반신 클로즈업 등) 전체 프레임을 한 사람으로 처리
 
-        현재는 전체 이미지에서 가장 명확한 포즈 하나를 반환
+        Returns:
+            [{"person_id", "box": [x, y, w, h], "detection_score", "landmarks", "quality"}]
+            (큰 박스 순, 포즈가 감지되지 않은 박스는 제외)
         """
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        results = self.holistic.process(image_rgb)
+        height, width = image.shape[:2]
+        boxes = get_person_detector().detect(image, max_people)
+        if not boxes:
+            boxes = [((0, 0, width, height), None)]
+
+        pool = get_person_pool()
+        futures = [pool.submit(self._detect_person_crop, image, box) for box, _ in boxes]
 
         people = []
-        if results.pose_landmarks:
-            quality = self.calculate_pose_quality(results.pose_landmarks, "pose")
+        for (box, score), future in zip(boxes, futures):
+            landmarks = future.result()
+            if landmarks is None:
+                continue
+            crop_to_frame(landmarks, box, width, height)
             people.append({
-                "person_id": 0,
-                "pose_landmarks": results.pose_landmarks,
-                "quality": quality
+                "person_id": len(people),
+                "box": list(box),
+                "detection_score": None if score is None else round(score, 3),
+                "landmarks": landmarks,
+                "quality": self.calculate_pose_quality(landmarks["pose"], "pose")
             })
 
         return people
 
+    def process_multiple_people(self, image: np.ndarray, output_path: Optional[str],
+                                draw_hands=True, draw_face=True, colorful=False,
+                                skeleton_encoding="base64", skeleton_format="mediapipe",
+                                render="both", landmarks_format=None, output_size=None,
+                                min_quality=0.0) -> Dict:
+        """
+        여러 인물 감지 후 한 캔버스에 모든 스켈레톤 렌더링
+        인자는 process_single_person과 같음 (binary 랜드마크는 사람별 landmarks_base64,
+        크롭 해상도는 PERSON_CROP_MAX_SIDE)
+
+        pose_quality/detected_features는 품질이 가장 높은 사람 기준 (min_quality 필터도 동일)
+        """
+        try:
+            people = self.detect_multiple_people(image)
+            if not people:
+                return {"success": False, "error": "포즈를 감지할 수 없습니다"}
+
+            best = max(people, key=lambda person: person["quality"]["overall_score"])
+            if best["quality"]["overall_score"] < min_quality:
+                return self.quality_failure(best["quality"])
+            result = {
+                "success": True,
+                "skeleton_path": None,
+                "person_count": len(people),
+                "people": [],
+                "pose_quality": best["quality"],
+                "detected_features": {
+                    part: array is not None for part, array in best["landmarks"].items()
+                },
+                "message": f"{len(people)}명 포즈 감지 성공"
+            }
+
+            if landmarks_format is None and render == "none":
+                landmarks_format = "json"
+            for person in people:
+                entry = {
+                    "person_id": person["person_id"],
+                    "box": person["box"],
+                    "detection_score": person["detection_score"],
+                    "pose_quality": person["quality"],
+                    "detected_features": {
+                        part: array is not None for part, array in person["landmarks"].items()
+                    }
+                }
+                if landmarks_format == "json":
+                    entry["landmarks"] = {
+                        part: landmarks_to_list(array) for part, array in person["landmarks"].items()
+                    }
+                elif landmarks_format == "binary":
+                    blob, entry["landmarks_layout"] = pack_landmarks(person["landmarks"])
+                    entry["landmarks_base64"] = base64.b64encode(blob).decode('utf-8')
+                result["people"].append(entry)
+
+            save_file = render in ("file", "both") and bool(output_path)
+            inline_image = render in ("base64", "both")
+            if not (save_file or inline_image):
+                return result
+
+            h, w = image.shape[:2]
+            if output_size:
+                w, h = int(output_size[0]), int(output_size[1])
+            canvas = self.renderer.canvas(h, w)
+            if skeleton_format in ("openpose", "openpose_body25"):
+                layout = "BODY_25" if skeleton_format == "openpose_body25" else "COCO18"
+                openpose = None
+                for person in people:
+                    keypoints = to_openpose_keypoints(person["landmarks"], "COCO18")
+                    render_openpose(keypoints, h, w, draw_hands=draw_hands, draw_face=draw_face, canvas=canvas)
+                    if layout != "COCO18":
+                        keypoints = to_openpose_keypoints(person["landmarks"], layout)
+                    person_json = to_openpose_json(keypoints, w, h)
+                    if openpose is None:
+                        openpose = person_json
+                    else:
+                        openpose["people"].extend(person_json["people"])
+                result["openpose"] = openpose
+            else:
+                for person in people:
+                    self.renderer.draw(
+                        canvas, person["landmarks"],
+                        draw_pose=True,
+                        draw_hands=draw_hands,
+                        draw_face=draw_face,
+                        colorful=colorful
+                    )
+
+            return self._encode_skeleton(
+                result, canvas, output_path, save_file, inline_image, skeleton_encoding
+            )
+
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
     def process_image(self, image_path: str, output_path: str,
                      draw_hands=True, draw_face=True,
-                     colorful=False, min_quality=0.0) -> Dict:
+                     colorful=False, min_quality=0.0, skeleton_format="mediapipe",
+                     render="both", landmarks_format=None, multi_person=False,
+                     working_size=None, output_size=None) -> Dict:
         """
         이미지 파일 처리
 
@@ -329,46 +1291,108 @@ class AdvancedPoseDetector:
             draw_face: 얼굴 그리기
             colorful: 컬러풀한 스켈레톤
             min_quality: 최소 품질 점수 (0-100)
+            skeleton_format, render, landmarks_format, working_size, output_size:
+                process_single_person 참고
+            multi_person: 여러 사람 감지 (process_multiple_people)
         """
         try:
             image = cv2.imread(image_path)
             if image is None:
                 return {"success": False, "error": "이미지를 읽을 수 없습니다"}
 
-            result = self.process_single_person(
+            options = {}
+            if not multi_person:
+                options["working_size"] = working_size
+            process = self.process_multiple_people if multi_person else self.process_single_person
+            result = process(
                 image, output_path,
                 draw_hands=draw_hands,
                 draw_face=draw_face,
-                colorful=colorful
+                colorful=colorful,
+                skeleton_format=skeleton_format,
+                render=render,
+                landmarks_format=landmarks_format,
+                output_size=output_size,
+                min_quality=min_quality,
+                **options
             )
 
-            # 품질 필터링
-            if result.get("success") and result.get("pose_quality"):
-                if result["pose_quality"]["overall_score"] < min_quality:
-                    return {
-                        "success": False,
-                        "error": f"포즈 품질이 낮습니다 (점수: {result['pose_quality']['overall_score']:.1f})",
-                        "pose_quality": result["pose_quality"]
-                    }
+            return result
+
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def process_image_bytes(self, image_data: bytes, output_path: Optional[str],
+                            draw_hands=True, draw_face=True, colorful=False,
+                            min_quality=0.0, skeleton_encoding="base64",
+                            skeleton_format="mediapipe", render="both",
+                            landmarks_format=None, multi_person=False,
+                            working_size=None, output_size=None) -> Dict:
+        """
+        인코딩된 이미지 바이트 처리 (임시 파일/base64 없이 바이너리 전송용)
+
+        Args:
+            image_data: JPEG/PNG 등 인코딩된 이미지 바이트
+            output_path: 출력 이미지 경로 (None이면 파일 저장 생략)
+            min_quality: 최소 품질 점수 (0-100)
+            skeleton_encoding: "base64" 또는 "bytes" (process_single_person 참고)
+            skeleton_format, render, landmarks_format, working_size, output_size:
+                process_single_person 참고
+            multi_person: 여러 사람 감지 (process_multiple_people)
+        """
+        try:
+            image = decode_image_bytes(image_data)
+            if image is None:
+                return {"success": False, "error": "이미지를 디코딩할 수 없습니다"}
+
+            options = {}
+            if not multi_person:
+                options["working_size"] = working_size
+            process = self.process_multiple_people if multi_person else self.process_single_person
+            result = process(
+                image, output_path,
+                draw_hands=draw_hands,
+                draw_face=draw_face,
+                colorful=colorful,
+                skeleton_encoding=skeleton_encoding,
+                skeleton_format=skeleton_format,
+                render=render,
+                landmarks_format=landmarks_format,
+                output_size=output_size,
+                min_quality=min_quality,
+                **options
+            )
 
             return result
 
         except Exception as e:
             return {"success": False, "error": str(e)}
 
+    def filter_quality(self, result: Dict, min_quality: float) -> Dict:
+        """품질 필터링: min_quality 미만이면 실패 처리 (이미 만든 결과용, 처리 함수는 min_quality 인자 사용)"""
+        if result.get("success") and result.get("pose_quality"):
+            if result["pose_quality"]["overall_score"] < min_quality:
+                return self.quality_failure(result["pose_quality"])
+        return result
+
+    @staticmethod
+    def quality_failure(pose_quality: Dict) -> Dict:
+        return {
+            "success": False,
+            "error": f"포즈 품질이 낮습니다 (점수: {pose_quality['overall_score']:.1f})",
+            "pose_quality": pose_quality
+        }
+
     def process_webcam_frame(self, frame_base64: str, output_path: str,
                            draw_hands=True, draw_face=True,
-                           colorful=False) -> Dict:
+                           colorful=False, skeleton_format="mediapipe",
+                           render="both", landmarks_format=None,
+                           working_size=None, output_size=None) -> Dict:
         """
         웹캠 프레임 처리 (base64)
         """
         try:
-            # Base64 디코딩
-            image_data = base64.b64decode(
-                frame_base64.split(',')[1] if ',' in frame_base64 else frame_base64
-            )
-            nparr = np.frombuffer(image_data, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            image = decode_frame_base64(frame_base64)
 
             if image is None:
                 return {"success": False, "error": "프레임을 디코딩할 수 없습니다"}
@@ -377,18 +1401,97 @@ class AdvancedPoseDetector:
                 image, output_path,
                 draw_hands=draw_hands,
                 draw_face=draw_face,
-                colorful=colorful
+                colorful=colorful,
+                skeleton_format=skeleton_format,
+                render=render,
+                landmarks_format=landmarks_format,
+                working_size=working_size,
+                output_size=output_size
             )
 
         except Exception as e:
             return {"success": False, "error": str(e)}
 
-    def __del__(self):
-        """리소스 정리"""
-        if hasattr(self, 'holistic'):
-            self.holistic.close()
-        if hasattr(self, 'pose_detector'):
-            self.pose_detector.close()
+
+DEFAULT_OPTIONS = {
+    "draw_hands": True,
+    "draw_face": True,
+    "colorful": False,
+    "min_quality": 0.0,
+    "skeleton_format": "mediapipe",  # mediapipe, openpose 또는 openpose_body25
+    "render": "both",  # none, file, base64 또는 both
+    "landmarks_format": None,  # None, json 또는 binary
+    "multi_person": False,  # 여러 사람 감지 (file, bytes 모드)
+    "working_size": None,  # 추론 작업 해상도 (긴 변, None이면 WORKING_MAX_SIDE, 0이면 원본)
+    "output_size": None  # 스켈레톤 이미지 크기 [w, h] (None이면 입력 크기)
+}
+# model_complexity (0, 1, 2 또는 "auto"), cascade_quality는 지정한 경우에만 감지기 설정을 바꿈
+
+
+def handle_request(detector: AdvancedPoseDetector, mode: str, input_data,
+                   output_path: Optional[str], options: Optional[Dict] = None,
+                   skeleton_encoding="base64") -> Dict:
+    """
+    CLI/데몬 공용 요청 처리
+
+    Args:
+        detector: 미리 로드된 감지기
+        mode: file, webcam 또는 bytes
+        input_data: 이미지 경로, base64 프레임 또는 인코딩된 이미지 바이트
+        output_path: 스켈레톤 저장 경로
+        options: 그리기/품질 옵션 (DEFAULT_OPTIONS 참고, model_complexity 지정 가능)
+        skeleton_encoding: bytes 모드의 스켈레톤 응답 형식 ("base64" 또는 "bytes")
+    """
+    merged = dict(DEFAULT_OPTIONS)
+    if options:
+        merged.update(options)
+
+    # 요청별 모델 복잡도 (그래프는 설정별로 캐시되어 재사용, "auto"는 단계별 실행)
+    detector = detector.configured(merged.get("model_complexity"), merged.get("cascade_quality"))
+
+    if mode == "file":
+        return detector.process_image(
+            input_data, output_path,
+            draw_hands=merged.get("draw_hands", True),
+            draw_face=merged.get("draw_face", True),
+            colorful=merged.get("colorful", False),
+            min_quality=merged.get("min_quality", 0.0),
+            skeleton_format=merged.get("skeleton_format", "mediapipe"),
+            render=merged.get("render", "both"),
+            landmarks_format=merged.get("landmarks_format"),
+            multi_person=merged.get("multi_person", False),
+            working_size=merged.get("working_size"),
+            output_size=merged.get("output_size")
+        )
+    elif mode == "webcam":
+        return detector.process_webcam_frame(
+            input_data, output_path,
+            draw_hands=merged.get("draw_hands", True),
+            draw_face=merged.get("draw_face", True),
+            colorful=merged.get("colorful", False),
+            skeleton_format=merged.get("skeleton_format", "mediapipe"),
+            render=merged.get("render", "both"),
+            landmarks_format=merged.get("landmarks_format"),
+            working_size=merged.get("working_size"),
+            output_size=merged.get("output_size")
+        )
+    elif mode == "bytes":
+        return detector.process_image_bytes(
+            input_data, output_path,
+            draw_hands=merged.get("draw_hands", True),
+            draw_face=merged.get("draw_face", True),
+            colorful=merged.get("colorful", False),
+            min_quality=merged.get("min_quality", 0.0),
+            skeleton_encoding=skeleton_encoding,
+            skeleton_format=merged.get("skeleton_format", "mediapipe"),
+            render=merged.get("render", "both"),
+            landmarks_format=merged.get("landmarks_format"),
+            multi_person=merged.get("multi_person", False),
+            working_size=merged.get("working_size"),
+            output_size=merged.get("output_size")
+        )
+
+    return {"success": False, "error": "유효하지 않은 모드"}
 
 
 def main():
@@ -396,8 +1499,19 @@ def main():
     CLI 인터페이스
     사용법: python camera_detect_advanced.py <mode> <input> <output> [options]
 
-    mode: file 또는 webcam
-    options (JSON): {"draw_hands": true, "draw_face": true, "colorful": false}
+    mode: file, webcam 또는 batch
+    options (JSON): {"draw_hands": true, "draw_face": true, "colorful": false,
+                     "skeleton_format": "mediapipe", "render": "both",
+                     "landmarks_format": null, "multi_person": false,
+                     "model_complexity": "auto", "cascade_quality": 60.0}
+    랜드마크만 필요하면 {"render": "none"} (output은 무시되며 "-"로 지정 가능)
+    여러 사람: {"multi_person": true} → people (사람별 box, pose_quality), person_count
+
+    batch 모드: input은 디렉토리, glob 패턴 또는 .jsonl 매니페스트, output은 저장 디렉토리
+    options에 "workers", "decode_threads", "chunk_size" 지정 가능 (pose_batch.py 참고)
+
+    매 실행마다 모델을 새로 로드하므로, 반복 호출에는
+    pose_server.py 데몬 + pose_client.py 사용을 권장
     """
     if len(sys.argv) < 4:
         print(json.dumps({
@@ -411,42 +1525,30 @@ def main():
     output_path = sys.argv[3]
 
     # 옵션 파싱
-    options = {
-        "draw_hands": True,
-        "draw_face": True,
-        "colorful": False,
-        "min_quality": 0.0
-    }
-
+    options = {}
     if len(sys.argv) >= 5:
         try:
-            user_options = json.loads(sys.argv[4])
-            options.update(user_options)
+            options = json.loads(sys.argv[4])
         except:
             pass
 
+    if mode == "batch":
+        # 결과는 이미지마다 한 줄씩 출력되고, 마지막 줄은 요약
+        from pose_batch import run_batch
+        summary = run_batch(input_data, output_path, options)
+        print(json.dumps(summary, ensure_ascii=True))
+        return
+
     detector = AdvancedPoseDetector(
-        model_complexity=1,
+        model_complexity=MODEL_COMPLEXITY_AUTO,
         min_detection_confidence=0.5
     )
 
-    if mode == "file":
-        result = detector.process_image(
-            input_data, output_path,
-            draw_hands=options.get("draw_hands", True),
-            draw_face=options.get("draw_face", True),
-            colorful=options.get("colorful", False),
-            min_quality=options.get("min_quality", 0.0)
-        )
-    elif mode == "webcam":
-        result = detector.process_webcam_frame(
-            input_data, output_path,
-            draw_hands=options.get("draw_hands", True),
-            draw_face=options.get("draw_face", True),
-            colorful=options.get("colorful", False)
-        )
-    else:
-        result = {"success": False, "error": "유효하지 않은 모드"}
+    try:
+        result = handle_request(detector, mode, input_data, output_path, options)
+    except ValueError as e:
+        # 잘못된 옵션 (예: 지원하지 않는 model_complexity)
+        result = {"success": False, "error": str(e)}
 
     print(json.dumps(result, ensure_ascii=True))
 
@@ -0,0 +1,236 @@
+"""
+챗봇 답변 → 음성 파이프라인
+- Ollama 스트리밍 응답을 받는 대로 문장 단위로 나누고,
+  모델이 다음 문장을 생성하는 동안 앞 문장을 TTS로 합성
+- 답변 전체 + 음성 전체를 기다리지 않고 첫 문장이 합성되면 바로 재생 가능
+
+이벤트 (JSON 한 줄씩):
+    {"type": "text", "delta": "..."}                                    답변 조각
+    {"type": "sentence", "index": 0, "text": "...", "audio_url": "..."}  문장 음성 (순서대로)
+    {"type": "done", "success": true, "message": "전체 답변", "sentences": 3}
+    {"type": "error", "success": false, "error": "..."}
+
+사용법: python chat_speech.py <message> [model] [--no-cache]
+(tts_server.py가 실행 중이면 POST /chat으로 같은 이벤트를 스트리밍, 음성 모델을 다시 로드하지 않음)
+"""
+import sys
+import json
+import queue
+import re
+import threading
+import time
+import uuid
+from typing import Dict, Iterator, List, Optional
+
+import requests
+
+from tts_service import TTSService, audio_url
+
+
+DEFAULT_OLLAMA_URL = "http://localhost:11434"
+DEFAULT_MODEL = "phi3:mini"
+OLLAMA_TIMEOUT = 60
+
+# 문장 끝: 마침표/물음표/느낌표 뒤 공백 (스트림 끝의 "3." 같은 조각은 다음 조각을 기다림),
+# 전각 문장부호, 줄바꿈
+SENTENCE_BOUNDARY = re.compile(r'[.!?…]+["\'”’)\]]*\s+|[。！？]+|\n+')
+# 이보다 짧은 문장은 다음 문장과 합쳐 합성 ("네." 같은 조각마다 TTS 호출하지 않도록)
+MIN_SENTENCE_CHARS = 10
+# 문장 끝 없이 이만큼 쌓이면 쉼표/공백에서 끊음 (첫 음성이 너무 늦어지지 않도록)
+MAX_SENTENCE_CHARS = 200
+
+# 음성으로 읽지 않을 마크다운 기호
+MARKDOWN_CHARS = re.compile(r'[*_#`>|~]+')
+
+
+class SentenceSplitter:
+    """
+    스트리밍 텍스트를 문장 단위로 나눔
+
+    사용법:
+        splitter = SentenceSplitter()
+        for delta in stream:
+            for sentence in splitter.feed(delta): ...
+        tail = splitter.flush()
+    """
+
+    def __init__(self, min_chars=MIN_SENTENCE_CHARS, max_chars=MAX_SENTENCE_CHARS):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        """조각을 추가하고 완성된 문장 목록 반환"""
+        self.buffer += text
+        sentences = []
+        start = 0
+        for match in SENTENCE_BOUNDARY.finditer(self.buffer):
+            sentence = self.buffer[start:match.end()].strip()
+            if len(sentence) < self.min_chars:
+                # 짧은 문장은 버퍼에 남겨 다음 문장과 합침
+                continue
+            sentences.append(sentence)
+            start = match.end()
+        self.buffer = self.buffer[start:]
+
+        if len(self.buffer) > self.max_chars:
+            cut = max(self.buffer.rfind(", ", 0, self.max_chars), self.buffer.rfind(" ", 0, self.max_chars))
+            if cut > 0:
+                sentences.append(self.buffer[:cut + 1].strip())
+                self.buffer = self.buffer[cut + 1:]
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        """스트림이 끝났을 때 남은 문장"""
+        tail = self.buffer.strip()
+        self.buffer = ""
+        return tail or None
+
+
+def speakable(sentence: str) -> Optional[str]:
+    """마크다운 기호를 뺀 읽을 문장 (읽을 글자가 없으면 None)"""
+    text = MARKDOWN_CHARS.sub("", sentence).strip()
+    if not re.search(r'\w', text):
+        return None
+    return text
+
+
+class ChatSpeech:
+    """
+    Ollama 스트리밍 + 문장별 TTS (tts_server.py의 /chat, CLI 공용)
+    """
+
+    def __init__(self, tts=None, ollama_url: Optional[str] = None):
+        """
+        Args:
+            tts: TTSService (없으면 생성, tts_server는 자신의 서비스를 넘겨 음성 모델 공유)
+            ollama_url: Ollama 주소 (없으면 config.json의 ollama_url 또는 localhost:11434)
+        """
+        self.tts = tts or TTSService()
+        self.ollama_url = (ollama_url or self.tts.config.get('ollama_url') or DEFAULT_OLLAMA_URL).rstrip("/")
+        self.session = requests.Session()
+
+    def stream_reply(self, message: str, model: str, cancel: threading.Event) -> Iterator[str]:
+        """Ollama /api/generate 스트리밍 응답 조각"""
+        response = self.session.post(
+            f"{self.ollama_url}/api/generate",
+            json={"model": model, "prompt": message, "stream": True},
+            stream=True,
+            timeout=OLLAMA_TIMEOUT
+        )
+        with response:
+            if response.status_code != 200:
+                raise RuntimeError(f"Ollama API 오류 (HTTP {response.status_code})")
+            for line in response.iter_lines():
+                if cancel.is_set():
+                    return
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise RuntimeError(chunk["error"])
+                if chunk.get("response"):
+                    yield chunk["response"]
+                if chunk.get("done"):
+                    return
+
+    def run(self, message: str, model: str = DEFAULT_MODEL, no_cache=False) -> Iterator[Dict]:
+        """
+        답변 조각과 문장 음성 이벤트를 생기는 대로 반환하는 제너레이터
+        (제너레이터를 닫으면 Ollama 요청과 남은 합성을 중단)
+        """
+        chat_id = f"{int(time.time())}_{uuid.uuid4().hex[:6]}"
+        events = queue.Queue()
+        sentences = queue.Queue()
+        cancel = threading.Event()
+        reply = []
+        failure = {}
+
+        def produce():
+            splitter = SentenceSplitter()
+            try:
+                for delta in self.stream_reply(message, model, cancel):
+                    reply.append(delta)
+                    events.put({"type": "text", "delta": delta})
+                    for sentence in splitter.feed(delta):
+                        sentences.put(sentence)
+                tail = splitter.flush()
+                if tail:
+                    sentences.put(tail)
+            except requests.exceptions.RequestException as e:
+                failure["error"] = f"Ollama 연결 실패: {str(e)}"
+            except Exception as e:
+                failure["error"] = f"Ollama 응답 오류: {str(e)}"
+            finally:
+                sentences.put(None)
+
+        def speak():
+            index = 0
+            while True:
+                sentence = sentences.get()
+                if sentence is None or cancel.is_set():
+                    break
+                text = speakable(sentence)
+                if text is None:
+                    continue
+                success, result, audio_path = self.tts.synthesize(
+                    text, f"chat_{chat_id}_{index:02d}.mp3", no_cache
+                )
+                event = {"type": "sentence", "index": index, "text": sentence}
+                if success:
+                    event["audio_url"] = audio_url(audio_path)
+                else:
+                    # 음성만 실패한 문장은 텍스트로만 표시하고 계속 진행
+                    event["error"] = result
+                events.put(event)
+                index += 1
+            events.put({"type": "_finished", "sentences": index})
+
+        producer = threading.Thread(target=produce, name="chat-ollama", daemon=True)
+        speaker = threading.Thread(target=speak, name="chat-tts", daemon=True)
+        producer.start()
+        speaker.start()
+
+        try:
+            while True:
+                event = events.get()
+                if event["type"] == "_finished":
+                    break
+                yield event
+
+            if failure:
+                yield {"type": "error", "success": False, "error": failure["error"]}
+            else:
+                yield {
+                    "type": "done",
+                    "success": True,
+                    "message": "".join(reply),
+                    "sentences": event["sentences"]
+                }
+        finally:
+            cancel.set()
+
+
+def main():
+    no_cache = "--no-cache" in sys.argv
+    if no_cache:
+        sys.argv.remove("--no-cache")
+
+    if len(sys.argv) < 2:
+        print(json.dumps({
+            "type": "error",
+            "success": False,
+            "error": "사용법: python chat_speech.py <message> [model] [--no-cache]"
+        }, ensure_ascii=True))
+        sys.exit(1)
+
+    message = sys.argv[1]
+    model = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_MODEL
+
+    # PHP가 한 줄씩 중계하므로 이벤트마다 flush
+    for event in ChatSpeech().run(message, model, no_cache):
+        print(json.dumps(event, ensure_ascii=True), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+콘텐츠 주소 기반 디스크 캐시
+- 키: 요청 내용 전체(JSON + 바이트)의 SHA-256
+- 항목: 키당 파일 하나 이상 (<key>_<index><suffix>)
+- 용량 제한: 전체 크기가 max_bytes를 넘으면 오래 안 쓴 항목(mtime 기준 LRU)부터 삭제
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+from typing import List, Optional
+
+
+DEFAULT_CACHE_ROOT = Path(__file__).parent.parent / "outputs" / "cache"
+DEFAULT_MAX_BYTES = 500 * 1024 * 1024
+
+
+def make_key(*parts) -> str:
+    """
+    캐시 키 생성
+
+    Args:
+        parts: JSON 직렬화 가능한 값 또는 bytes (이미지 등 원본 데이터)
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, (bytes, bytearray, memoryview)):
+            digest.update(b"b")
+            digest.update(hashlib.sha256(part).digest())
+        else:
+            digest.update(b"j")
+            digest.update(json.dumps(part, sort_keys=True, ensure_ascii=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ContentCache:
+    """
+    디스크 캐시
+    여러 프로세스(워커, CLI)가 같은 디렉토리를 공유해도 되도록 파일은 임시 이름으로 쓴 뒤 교체
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._evict_lock = threading.Lock()
+
+    def paths(self, key: str, count=1, suffix=".png") -> List[Path]:
+        return [self.cache_dir / f"{key}_{i}{suffix}" for i in range(count)]
+
+    def get(self, key: str, count=1, suffix=".png") -> Optional[List[Path]]:
+        """캐시된 파일 경로 (하나라도 없으면 None), 사용 시각 갱신"""
+        paths = self.paths(key, count, suffix)
+        try:
+            for path in paths:
+                os.utime(path)
+        except OSError:
+            return None
+        return paths
+
+    def restore(self, key: str, output_paths: List[str], suffix=".png") -> bool:
+        """캐시된 파일을 output_paths로 복사 (없으면 False)"""
+        cached = self.get(key, len(output_paths), suffix)
+        if cached is None:
+            return False
+        try:
+            for source, output_path in zip(cached, output_paths):
+                shutil.copyfile(source, output_path)
+        except OSError:
+            # 복사 중 다른 프로세스가 삭제한 경우 등은 캐시 미스로 처리
+            return False
+        return True
+
+    def put(self, key: str, source_paths: List[str], suffix=".png") -> List[Path]:
+        """파일을 캐시에 저장 (원본은 그대로 둠)"""
+        paths = self.paths(key, len(source_paths), suffix)
+        for source, path in zip(source_paths, paths):
+            temp_path = path.with_name(f".{uuid.uuid4().hex}.tmp")
+            shutil.copyfile(source, temp_path)
+            os.replace(temp_path, path)
+        self.evict()
+        return paths
+
+    def put_bytes(self, key: str, data: bytes, suffix=".png") -> Path:
+        """바이트를 캐시에 저장 (항목 파일 하나)"""
+        path = self.paths(key, 1, suffix)[0]
+        temp_path = path.with_name(f".{uuid.uuid4().hex}.tmp")
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        self.evict()
+        return path
+
+    def evict(self) -> int:
+        """max_bytes를 넘으면 오래 안 쓴 파일부터 삭제, 삭제한 파일 수 반환"""
+        with self._evict_lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.cache_dir):
+                if not entry.is_file() or entry.name.startswith("."):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+            if total <= self.max_bytes:
+                return 0
+
+            removed = 0
+            for _, size, path in sorted(entries):
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+                if total <= self.max_bytes:
+                    break
+            return removed
@@ -0,0 +1,617 @@
+"""
+이미지 생성 작업 큐
+- SQLite 기반 (outputs/generation_queue.db), 웹 요청은 작업 ID만 받고 바로 반환
+- 워커 프로세스가 SD WebUI 연결을 전담하고 FIFO 순서로 처리 (동시 처리 수 설정 가능)
+- 같은 요청(모드, 프롬프트, 스켈레톤, 파라미터)이 대기 중이면 batch_size=N 호출 한 번으로 묶어 처리
+  (시드를 지정한 작업은 같은 시드 그대로 생성되도록 따로 처리)
+  (SD WebUI txt2img는 호출당 프롬프트 하나만 받으므로 프롬프트가 다른 요청은 묶을 수 없음)
+- 생성 중 진행률, 남은 시간, 중간 미리보기(outputs/previews)를 작업 행에 기록, watch로 변경 사항 스트리밍
+- client_id가 같은 키오스크가 처리 중인 요청을 다시 보내면 새 작업 대신 기존 작업을 반환
+- 워커는 workers 테이블에 주기적으로 heartbeat를 기록, 살아 있는 워커가 없으면 worker_alive: False
+  (PHP는 대기 작업을 취소하고 동기 생성으로 대체)
+
+사용법:
+    python generation_queue.py enqueue <simple|controlnet> <prompt> <output> [skeleton_path] [params_json] [client_id]
+    python generation_queue.py status <job_id>
+    python generation_queue.py watch <job_id> [timeout]
+    python generation_queue.py cancel <job_id>
+    python generation_queue.py workers
+    python generation_queue.py worker [concurrency|auto] [max_batch] [batch_window]
+"""
+import sys
+import base64
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+
+DEFAULT_DB_PATH = Path(__file__).parent.parent / "outputs" / "generation_queue.db"
+PREVIEW_DIR = Path(__file__).parent.parent / "outputs" / "previews"
+
+# 대기 중인 작업이 없을 때 큐 확인 간격 (초)
+POLL_INTERVAL = 0.5
+
+# 요청 묶음: 최대 이미지 수, 첫 작업을 가져온 뒤 같은 요청을 더 기다리는 시간 (초)
+DEFAULT_MAX_BATCH = 4
+DEFAULT_BATCH_WINDOW = 0.3
+
+# watch: 작업 행 확인 간격, 최대 대기 시간 (초)
+WATCH_INTERVAL = 0.5
+WATCH_TIMEOUT = 600
+
+# 워커 heartbeat 기록 간격, 이 시간(초) 동안 기록이 없으면 워커가 없는 것으로 판단
+WORKER_HEARTBEAT_INTERVAL = 2.0
+WORKER_TIMEOUT = 10.0
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+# 작업별로 SDImageGenerator에 전달할 수 있는 추가 파라미터
+JOB_PARAMS = ("negative_prompt", "steps", "seed", "no_cache")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    status TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    skeleton_path TEXT,
+    output_path TEXT NOT NULL,
+    params TEXT NOT NULL DEFAULT '{}',
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    client_id TEXT,
+    progress REAL,
+    eta REAL,
+    preview_path TEXT,
+    updated_at REAL,
+    skeleton_hash TEXT,
+    worker_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, seq);
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,
+    pid INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    heartbeat_at REAL NOT NULL
+);
+"""
+
+# 이전 버전 DB에 없는 열 (진행 상황, 중복 요청 확인)
+MIGRATIONS = {
+    "client_id": "TEXT",
+    "progress": "REAL",
+    "eta": "REAL",
+    "preview_path": "TEXT",
+    "updated_at": "REAL",
+    "skeleton_hash": "TEXT",
+    "worker_id": "TEXT",
+}
+
+# watch에서 변경 여부를 판단하는 열
+WATCH_FIELDS = ("status", "position", "progress", "eta", "preview_path", "updated_at", "worker_alive")
+
+
+class GenerationQueue:
+    """
+    SQLite 작업 큐
+    PHP(enqueue/status CLI)와 워커가 같은 DB 파일을 공유하며, 연결은 스레드별로 생성
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = Path(db_path or DEFAULT_DB_PATH)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        self._migrate(conn)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # autocommit 모드, 여러 문장이 필요한 곳만 명시적 트랜잭션
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            # 워커가 쓰는 동안에도 상태 조회가 막히지 않도록
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection):
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+        for column, column_type in MIGRATIONS.items():
+            if column not in columns:
+                try:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+                except sqlite3.OperationalError:
+                    # 다른 프로세스가 먼저 추가한 경우
+                    pass
+
+    @staticmethod
+    def _skeleton_hash(skeleton_path: Optional[str]) -> Optional[str]:
+        """스켈레톤 이미지 내용 해시 (요청마다 파일 이름이 달라도 같은 포즈면 같은 값)"""
+        if not skeleton_path:
+            return None
+        try:
+            with open(skeleton_path, 'rb') as f:
+                return hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            return skeleton_path
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict:
+        job = dict(row)
+        job["job_id"] = job.pop("id")
+        job["params"] = json.loads(job["params"] or "{}")
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def enqueue(self, mode: str, prompt: str, output_path: str,
+                skeleton_path: Optional[str] = None, params: Optional[Dict] = None,
+                client_id: Optional[str] = None) -> Dict:
+        """
+        작업 추가
+
+        Args:
+            mode: simple 또는 controlnet
+            prompt: 프롬프트
+            output_path: 생성 이미지 저장 경로
+            skeleton_path: controlnet 모드의 스켈레톤 이미지 경로
+            params: 추가 파라미터 (JOB_PARAMS)
+            client_id: 요청한 키오스크 식별자. 같은 client_id의 같은 요청(모드, 프롬프트,
+                스켈레톤 내용, 파라미터) 작업이 대기 중이거나 실행 중이면 새로 추가하지 않고
+                그 작업을 반환 (duplicate: True)
+
+        Returns:
+            작업 딕셔너리 (job_id, status, position 포함)
+        """
+        job_id = uuid.uuid4().hex
+        params = {k: v for k, v in (params or {}).items() if k in JOB_PARAMS}
+        params_json = json.dumps(params, sort_keys=True)
+        skeleton_hash = self._skeleton_hash(skeleton_path)
+        conn = self._connect()
+        # 중복 확인과 추가 사이에 같은 요청이 끼어들지 않도록 쓰기 잠금
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            existing = None
+            if client_id:
+                existing = conn.execute(
+                    "SELECT id FROM jobs WHERE client_id = ? AND mode = ? AND prompt = ? "
+                    "AND skeleton_hash IS ? AND params = ? AND status IN (?, ?) ORDER BY seq LIMIT 1",
+                    (client_id, mode, prompt, skeleton_hash, params_json, STATUS_QUEUED, STATUS_RUNNING)
+                ).fetchone()
+            if existing is None:
+                conn.execute(
+                    "INSERT INTO jobs (id, status, mode, prompt, skeleton_path, skeleton_hash, output_path, "
+                    "params, created_at, client_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, STATUS_QUEUED, mode, prompt, skeleton_path, skeleton_hash, output_path,
+                     params_json, time.time(), client_id)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        if existing is not None:
+            job = self.get(existing["id"])
+            job["duplicate"] = True
+            return job
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """
+        작업 조회 (대기 중이면 position: 앞에 남은 작업 수 + 1)
+        대기/실행 중이면 worker_alive: 처리할 워커가 살아 있는지
+        """
+        conn = self._connect()
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+
+        job = self._to_dict(row)
+        if job["status"] == STATUS_QUEUED:
+            job["position"] = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND seq <= ?",
+                (STATUS_QUEUED, job["seq"])
+            ).fetchone()[0]
+        if job["status"] in (STATUS_QUEUED, STATUS_RUNNING):
+            job["worker_alive"] = self.worker_alive()
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        """대기 중인 작업을 failed로 (워커가 이미 가져간 작업은 취소하지 않고 False)"""
+        finished_at = time.time()
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ?, updated_at = ? "
+            "WHERE id = ? AND status = ?",
+            (STATUS_FAILED, "취소됨", finished_at, finished_at, job_id, STATUS_QUEUED)
+        )
+        return cursor.rowcount > 0
+
+    def heartbeat(self, worker_id: str):
+        """워커가 살아 있음을 기록 (처음 호출하면 워커 등록)"""
+        now = time.time()
+        self._connect().execute(
+            "INSERT INTO workers (id, pid, started_at, heartbeat_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at",
+            (worker_id, os.getpid(), now, now)
+        )
+
+    def remove_worker(self, worker_id: str):
+        self._connect().execute("DELETE FROM workers WHERE id = ?", (worker_id,))
+
+    def workers(self, max_age=WORKER_TIMEOUT) -> List[Dict]:
+        """max_age초 안에 heartbeat를 기록한 워커 목록"""
+        rows = self._connect().execute(
+            "SELECT * FROM workers WHERE heartbeat_at >= ? ORDER BY started_at",
+            (time.time() - max_age,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def worker_alive(self, max_age=WORKER_TIMEOUT) -> bool:
+        return self._connect().execute(
+            "SELECT 1 FROM workers WHERE heartbeat_at >= ? LIMIT 1",
+            (time.time() - max_age,)
+        ).fetchone() is not None
+
+    def _claim_rows(self, where: str, args: tuple, limit: int,
+                    worker_id: Optional[str] = None) -> List[Dict]:
+        """
+        조건에 맞는 대기 작업을 오래된 순으로 최대 limit개 running으로 바꾸고 반환
+        worker_id: 가져간 워커 (그 워커의 heartbeat가 끊기면 requeue_stale이 다시 대기열로)
+        """
+        conn = self._connect()
+        # BEGIN IMMEDIATE로 쓰기 잠금을 먼저 잡아 여러 워커가 같은 작업을 가져가지 않게 함
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                f"SELECT * FROM jobs WHERE status = ? AND {where} ORDER BY seq LIMIT ?",
+                (STATUS_QUEUED,) + args + (limit,)
+            ).fetchall()
+
+            started_at = time.time()
+            conn.executemany(
+                "UPDATE jobs SET status = ?, started_at = ?, worker_id = ? WHERE seq = ?",
+                [(STATUS_RUNNING, started_at, worker_id, row["seq"]) for row in rows]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        jobs = []
+        for row in rows:
+            job = self._to_dict(row)
+            job["status"] = STATUS_RUNNING
+            job["started_at"] = started_at
+            job["worker_id"] = worker_id
+            jobs.append(job)
+        return jobs
+
+    def claim(self, worker_id: Optional[str] = None) -> Optional[Dict]:
+        """가장 오래된 대기 작업을 running으로 바꾸고 반환 (없으면 None)"""
+        jobs = self._claim_rows("1", (), 1, worker_id)
+        return jobs[0] if jobs else None
+
+    def claim_compatible(self, job: Dict, limit: int, worker_id: Optional[str] = None) -> List[Dict]:
+        """
+        job과 같은 요청 (모드, 프롬프트, 스켈레톤, 파라미터)인 대기 작업을 최대 limit개 가져오기
+        시드를 지정한 작업은 묶지 않음 (batch_size=N이면 2번째 이미지부터 seed+1, seed+2...로 생성되므로)
+        """
+        if limit <= 0 or job["params"].get("seed", -1) != -1:
+            return []
+        return self._claim_rows(
+            "mode = ? AND prompt = ? AND skeleton_path IS ? AND params = ?",
+            (job["mode"], job["prompt"], job["skeleton_path"],
+             json.dumps(job["params"], sort_keys=True)),
+            limit, worker_id
+        )
+
+    def update_progress(self, job_ids: List[str], progress: float, eta: float,
+                        preview_path: Optional[str] = None):
+        """실행 중인 작업들의 진행 상황 기록 (preview_path가 None이면 이전 미리보기 유지)"""
+        placeholders = ", ".join("?" * len(job_ids))
+        self._connect().execute(
+            "UPDATE jobs SET progress = ?, eta = ?, preview_path = COALESCE(?, preview_path), "
+            f"updated_at = ? WHERE status = ? AND id IN ({placeholders})",
+            (progress, eta, preview_path, time.time(), STATUS_RUNNING, *job_ids)
+        )
+
+    def watch(self, job_id: str, interval=WATCH_INTERVAL, timeout=WATCH_TIMEOUT) -> Iterator[Dict]:
+        """
+        작업 상태가 바뀔 때마다 작업 딕셔너리를 반환 (처음 한 번은 항상)
+        done/failed가 되거나 작업이 없거나 timeout이 지나면 종료
+        """
+        deadline = time.time() + timeout
+        last = None
+        while True:
+            job = self.get(job_id)
+            if job is None:
+                return
+            current = tuple(job.get(field) for field in WATCH_FIELDS)
+            if current != last:
+                last = current
+                yield job
+            if job["status"] in (STATUS_DONE, STATUS_FAILED) or time.time() >= deadline:
+                return
+            time.sleep(interval)
+
+    def finish(self, job_id: str, result: Dict):
+        """작업 결과 기록 (result["success"]에 따라 done/failed)"""
+        if result.get("success"):
+            status, error = STATUS_DONE, None
+        else:
+            status, error = STATUS_FAILED, result.get("error", "알 수 없는 오류")
+
+        # 미리보기는 실행 중에만 의미가 있으므로 끝나면 비움 (파일은 워커가 삭제)
+        finished_at = time.time()
+        self._connect().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, updated_at = ?, "
+            "progress = CASE WHEN ? THEN 1.0 ELSE progress END, eta = NULL, preview_path = NULL "
+            "WHERE id = ?",
+            (status, json.dumps(result, ensure_ascii=True), error, finished_at, finished_at,
+             status == STATUS_DONE, job_id)
+        )
+
+    def requeue_stale(self, max_age=WORKER_TIMEOUT) -> int:
+        """
+        heartbeat가 끊긴 워커가 실행 중이던 작업을 다시 대기열로 (워커 비정상 종료 복구)
+        살아 있는 워커의 작업은 건드리지 않으므로 워커가 여러 개여도 안전
+        (worker_id가 없는 이전 버전 작업은 살아 있는 워커가 하나도 없을 때만)
+        """
+        stale_before = time.time() - max_age
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, worker_id = NULL, progress = NULL, "
+                "eta = NULL, preview_path = NULL WHERE status = ? AND ("
+                "(worker_id IS NULL AND NOT EXISTS (SELECT 1 FROM workers WHERE heartbeat_at >= ?)) "
+                "OR worker_id NOT IN (SELECT id FROM workers WHERE heartbeat_at >= ?))",
+                (STATUS_QUEUED, STATUS_RUNNING, stale_before, stale_before)
+            )
+            conn.execute("DELETE FROM workers WHERE heartbeat_at < ?", (stale_before,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return cursor.rowcount
+
+
+def run_job(generator, job: Dict, on_progress=None) -> Dict:
+    """작업 하나 실행 (SDImageGenerator 호출)"""
+    params = job["params"]
+    if job["mode"] == "controlnet" and job["skeleton_path"]:
+        return generator.generate_with_controlnet(
+            job["prompt"], job["skeleton_path"], job["output_path"], on_progress=on_progress, **params
+        )
+    return generator.generate_simple(job["prompt"], job["output_path"], on_progress=on_progress, **params)
+
+
+def run_jobs(generator, jobs: List[Dict], on_progress=None) -> List[Dict]:
+    """
+    같은 요청 묶음 실행 (claim_compatible 결과)
+    batch_size=N 호출 한 번으로 생성하고 작업마다 자기 이미지 결과를 돌려줌
+    """
+    if len(jobs) == 1:
+        return [run_job(generator, jobs[0], on_progress)]
+
+    first = jobs[0]
+    skeleton_path = first["skeleton_path"] if first["mode"] == "controlnet" else None
+    result = generator.generate_batch(
+        first["prompt"], [job["output_path"] for job in jobs],
+        skeleton_path=skeleton_path, on_progress=on_progress, **first["params"]
+    )
+    if not result.get("success"):
+        return [result] * len(jobs)
+
+    return [
+        {
+            "success": True,
+            "image_path": job["output_path"],
+            "batch_size": len(jobs),
+            "message": result.get("message", "이미지 생성 성공")
+        }
+        for job in jobs
+    ]
+
+
+def progress_recorder(queue: GenerationQueue, jobs: List[Dict]):
+    """
+    ProgressPoller 콜백: 묶음의 모든 작업 행에 진행 상황 기록
+    미리보기는 PREVIEW_DIR/<첫 작업 ID>.png 하나를 덮어씀 (묶음 전체가 공유)
+
+    Returns:
+        (callback, preview_path)
+    """
+    job_ids = [job["job_id"] for job in jobs]
+    preview_path = PREVIEW_DIR / f"{job_ids[0]}.png"
+
+    def callback(progress: Dict):
+        saved_path = None
+        preview = progress.get("preview")
+        if preview:
+            # 버전에 따라 data URL 접두어가 붙어 옴
+            if preview.startswith("data:"):
+                preview = preview.split(",", 1)[-1]
+            PREVIEW_DIR.mkdir(parents=True, exist_ok=True)
+            # 상태 조회 쪽에서 쓰는 중인 파일을 읽지 않도록 임시 파일로 쓴 뒤 교체
+            temp_path = preview_path.with_name(f".{preview_path.name}.tmp")
+            with open(temp_path, 'wb') as f:
+                f.write(base64.b64decode(preview))
+            os.replace(temp_path, preview_path)
+            saved_path = str(preview_path)
+        queue.update_progress(job_ids, progress["progress"], progress["eta"], saved_path)
+
+    return callback, preview_path
+
+
+def run_worker(queue: GenerationQueue, concurrency=None, poll_interval=POLL_INTERVAL,
+               stop_event: Optional[threading.Event] = None,
+               max_batch=DEFAULT_MAX_BATCH, batch_window=DEFAULT_BATCH_WINDOW):
+    """
+    워커 실행 (stop_event가 설정될 때까지)
+
+    Args:
+        queue: 작업 큐
+        concurrency: 동시에 처리할 작업 수 (None이면 SD 백엔드 풀의 max_inflight 합,
+            config.json sd_backends가 없으면 1)
+        poll_interval: 대기 작업이 없을 때 확인 간격 (초)
+        stop_event: 종료 신호
+        max_batch: 한 번의 txt2img 호출로 묶을 최대 작업 수 (1이면 묶지 않음)
+        batch_window: 첫 작업을 가져온 뒤 같은 요청이 더 들어오기를 기다리는 시간 (초)
+    """
+    # SD 관련 import는 워커에서만 (enqueue/status CLI는 가볍게 유지)
+    from image_generate import SDImageGenerator
+
+    generator = SDImageGenerator()
+    if concurrency is None:
+        # 백엔드가 늘어난 만큼 동시에 처리 (요청은 풀이 처리 중인 요청이 가장 적은 백엔드로 보냄)
+        concurrency = generator.pool.capacity
+    stop_event = stop_event or threading.Event()
+
+    # 종료된 워커의 작업만 복구 (다른 워커가 실행 중인 작업은 그대로), 복구 후 이 워커 등록
+    recovered = queue.requeue_stale()
+    if recovered:
+        sys.stderr.write(f"[generation_queue] 중단된 작업 {recovered}개를 다시 대기열에 추가\n")
+    worker_id = uuid.uuid4().hex
+    queue.heartbeat(worker_id)
+
+    def loop():
+        while not stop_event.is_set():
+            job = queue.claim(worker_id)
+            if job is None:
+                stop_event.wait(poll_interval)
+                continue
+
+            jobs = [job] + queue.claim_compatible(job, max_batch - 1, worker_id)
+            if len(jobs) < max_batch and batch_window > 0:
+                # 여러 키오스크가 같은 프리셋을 거의 동시에 요청하는 경우를 모음
+                stop_event.wait(batch_window)
+                jobs += queue.claim_compatible(job, max_batch - len(jobs), worker_id)
+
+            job_ids = ", ".join(j["job_id"] for j in jobs)
+            sys.stderr.write(f"[generation_queue] 작업 시작: {job_ids}\n")
+            on_progress, preview_path = progress_recorder(queue, jobs)
+            try:
+                results = run_jobs(generator, jobs, on_progress)
+            except Exception as e:
+                results = [{"success": False, "error": str(e)}] * len(jobs)
+            for j, result in zip(jobs, results):
+                queue.finish(j["job_id"], result)
+            try:
+                preview_path.unlink()
+            except OSError:
+                pass
+            sys.stderr.write(f"[generation_queue] 작업 종료: {job_ids} ({results[0].get('success')})\n")
+
+    threads = [
+        threading.Thread(target=loop, name=f"generation-worker-{i}", daemon=True)
+        for i in range(max(1, int(concurrency)))
+    ]
+    for thread in threads:
+        thread.start()
+
+    # 메인 스레드는 heartbeat 기록 (PHP/키오스크가 워커 유무를 판단)
+    try:
+        while any(thread.is_alive() for thread in threads):
+            queue.heartbeat(worker_id)
+            stop_event.wait(WORKER_HEARTBEAT_INTERVAL)
+    except KeyboardInterrupt:
+        stop_event.set()
+    finally:
+        queue.remove_worker(worker_id)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(json.dumps({
+            "success": False,
+            "error": "사용법: python generation_queue.py <enqueue|status|watch|cancel|workers|worker> ..."
+        }, ensure_ascii=True))
+        sys.exit(1)
+
+    command = sys.argv[1]
+    queue = GenerationQueue()
+
+    if command == "enqueue":
+        if len(sys.argv) < 5:
+            result = {
+                "success": False,
+                "error": "사용법: python generation_queue.py enqueue <mode> <prompt> <output> "
+                         "[skeleton_path] [params_json] [client_id]"
+            }
+        else:
+            params = {}
+            if len(sys.argv) >= 7:
+                try:
+                    params = json.loads(sys.argv[6])
+                except ValueError:
+                    pass
+            skeleton_path = sys.argv[5] if len(sys.argv) >= 6 and sys.argv[5] else None
+            client_id = sys.argv[7] if len(sys.argv) >= 8 and sys.argv[7] else None
+            job = queue.enqueue(sys.argv[2], sys.argv[3], sys.argv[4], skeleton_path, params, client_id)
+            result = {"success": True, **job}
+
+    elif command == "cancel":
+        if len(sys.argv) < 3:
+            result = {"success": False, "error": "사용법: python generation_queue.py cancel <job_id>"}
+        elif queue.cancel(sys.argv[2]):
+            result = {"success": True, "job_id": sys.argv[2]}
+        else:
+            result = {"success": False, "error": "대기 중인 작업이 아닙니다"}
+
+    elif command == "workers":
+        workers = queue.workers()
+        result = {"success": True, "alive": bool(workers), "workers": workers}
+
+    elif command == "status":
+        job = queue.get(sys.argv[2]) if len(sys.argv) >= 3 else None
+        if job is None:
+            result = {"success": False, "error": "작업을 찾을 수 없습니다"}
+        else:
+            result = {"success": True, **job}
+
+    elif command == "watch":
+        # 변경될 때마다 JSON 한 줄씩 출력 (PHP SSE 중계용, 줄마다 flush)
+        if len(sys.argv) < 3:
+            result = {"success": False, "error": "사용법: python generation_queue.py watch <job_id> [timeout]"}
+        else:
+            timeout = float(sys.argv[3]) if len(sys.argv) >= 4 else WATCH_TIMEOUT
+            found = False
+            for job in queue.watch(sys.argv[2], timeout=timeout):
+                found = True
+                print(json.dumps({"success": True, **job}, ensure_ascii=True), flush=True)
+            if found:
+                return
+            result = {"success": False, "error": "작업을 찾을 수 없습니다"}
+
+    elif command == "worker":
+        concurrency = int(sys.argv[2]) if len(sys.argv) >= 3 and sys.argv[2] != "auto" else None
+        max_batch = int(sys.argv[3]) if len(sys.argv) >= 4 else DEFAULT_MAX_BATCH
+        batch_window = float(sys.argv[4]) if len(sys.argv) >= 5 else DEFAULT_BATCH_WINDOW
+        sys.stderr.write(f"[generation_queue] 워커 시작 (동시 처리: {concurrency or 'auto'}, 최대 묶음: {max_batch})\n")
+        run_worker(queue, concurrency, max_batch=max_batch, batch_window=batch_window)
+        return
+
+    else:
+        result = {"success": False, "error": "유효하지 않은 명령"}
+
+    print(json.dumps(result, ensure_ascii=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -8,135 +8,322 @@ import base64
 import sys
 from pathlib import Path
 
+from content_cache import ContentCache, make_key, DEFAULT_CACHE_ROOT
+from sd_backends import DEFAULT_BACKEND_URL, NoBackendAvailable, get_pool
+from sd_client import ProgressPoller, stream_images
+
+
+DEFAULT_NEGATIVE_PROMPT = "bad quality, blurry, distorted, ugly, low resolution"
+
+
+def batch_output_paths(output_path, count):
+    """
+    이미지 여러 장의 저장 경로
+    첫 번째는 output_path 그대로, 나머지는 output_1.png, output_2.png ...
+    """
+    path = Path(output_path)
+    return [str(output_path)] + [
+        str(path.with_name(f"{path.stem}_{i}{path.suffix}")) for i in range(1, count)
+    ]
+
+
+def remove_files(paths):
+    for path in paths:
+        try:
+            Path(path).unlink()
+        except OSError:
+            pass
+
 
 class SDImageGenerator:
-    def __init__(self, api_url="http://localhost:7861"):
-        self.api_url = api_url
-        self.txt2img_endpoint = f"{api_url}/sdapi/v1/txt2img"
-        self.controlnet_endpoint = f"{api_url}/controlnet/txt2img"
+    def __init__(self, api_url=None, controlnet_model=None, cache=None):
+        """
+        Args:
+            api_url: SD WebUI 주소 (None이면 config.json의 sd_backends 풀,
+                그것도 없으면 http://localhost:7861)
+            controlnet_model: ControlNet OpenPose 모델 이름
+                (예: "control_v11p_sd15_openpose [cab727d4]", None이면 config.json의
+                controlnet_model, 그것도 없으면 ControlNet 없이 프롬프트 힌트만 사용)
+            cache: 결과 캐시 (None이면 outputs/cache/images, False면 사용 안 함)
+        """
+        config = self._load_config()
+        backends = [api_url] if api_url else (config.get('sd_backends') or [DEFAULT_BACKEND_URL])
+        # 같은 구성의 생성기끼리 백엔드 풀(동시 요청 수 집계)과 keep-alive 연결 풀 공유
+        self.pool = get_pool(backends)
+        self.controlnet_model = controlnet_model or config.get('controlnet_model')
+
+        if cache is None:
+            max_mb = config.get('image_cache_max_mb', 500)
+            cache = ContentCache(DEFAULT_CACHE_ROOT / "images", max_bytes=int(max_mb * 1024 * 1024))
+        self.cache = cache or None
+
+    @staticmethod
+    def _load_config():
+        config_file = Path(__file__).parent.parent / "config.json"
+        if config_file.exists():
+            try:
+                with open(config_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {}
 
     def encode_image_to_base64(self, image_path):
         """이미지를 base64로 인코딩"""
         with open(image_path, 'rb') as f:
             return base64.b64encode(f.read()).decode('utf-8')
 
-    def generate_with_controlnet(self, prompt, skeleton_path, output_path, negative_prompt="", steps=4):
+    def build_payload(self, prompt, negative_prompt="", steps=4, skeleton_path=None,
+                      batch_size=1, n_iter=1, width=512, height=512,
+                      cfg_scale=2.0, sampler_name="Euler", seed=-1):
         """
-        ControlNet OpenPose를 사용하여 이미지 생성
+        txt2img 요청 본문 생성
+
+        Args:
+            skeleton_path: ControlNet OpenPose 맵 (None이면 텍스트만으로 생성)
+            batch_size: 한 번에 함께 생성할 이미지 수 (같은 프롬프트, 시드만 다름)
+            n_iter: batch_size 묶음을 반복할 횟수 (총 이미지 수 = batch_size * n_iter)
+            seed: 시드 (-1이면 SD WebUI가 무작위로 선택)
         """
+        payload = {
+            "prompt": prompt,
+            "negative_prompt": negative_prompt or DEFAULT_NEGATIVE_PROMPT,
+            "steps": steps,
+            "cfg_scale": cfg_scale,
+            "width": width,
+            "height": height,
+            "sampler_name": sampler_name,  # More compatible sampler
+            "batch_size": batch_size,
+            "n_iter": n_iter,
+            "seed": seed
+        }
+
+        if skeleton_path is None:
+            return payload
+
+        return self.attach_skeleton(payload, self.encode_image_to_base64(skeleton_path))
+
+    def attach_skeleton(self, payload, skeleton_base64):
+        """
+        요청 본문에 ControlNet OpenPose 맵 추가 (파일 없이 메모리의 스켈레톤을 바로 쓰는 경우)
+
+        Args:
+            payload: build_payload(skeleton_path=None) 결과 (직접 수정됨)
+            skeleton_base64: OpenPose 컬러 맵 PNG의 base64 문자열
+        """
+        if self.controlnet_model:
+            payload["alwayson_scripts"] = {
+                "controlnet": {
+                    "args": [{
+                        "enabled": True,
+                        "module": "none",
+                        "model": self.controlnet_model,
+                        "weight": 1.0,
+                        "image": skeleton_base64,
+                        "resize_mode": "Crop and Resize",
+                        "control_mode": "Balanced",
+                        "pixel_perfect": True
+                    }]
+                }
+            }
+        else:
+            # ControlNet 모델이 설정되지 않았으면 프롬프트 힌트만 사용
+            payload["prompt"] = payload["prompt"] + " (full body, standing pose)"
+
+        return payload
+
+    def warmup(self):
+        """
+        다음 txt2img가 갈 가능성이 높은 (처리 중인 요청이 가장 적은) 백엔드 연결을 미리 열어 둠
+        keep-alive 풀에 남아 txt2img가 재사용, 실패는 무시
+        """
+        backend = min(
+            (b for b in self.pool.backends if b.healthy),
+            key=lambda b: b.inflight / b.max_inflight,
+            default=None
+        )
+        if backend is None:
+            return
         try:
-            # 스켈레톤 이미지를 base64로 인코딩
-            skeleton_base64 = self.encode_image_to_base64(skeleton_path)
-
-            # ControlNet temporarily disabled - needs model installation
-            payload = {
-                "prompt": prompt + " (full body, standing pose)",  # Add pose hint to prompt
-                "negative_prompt": negative_prompt or "bad quality, blurry, distorted, ugly, low resolution",
-                "steps": steps,
-                "cfg_scale": 2.0,
-                "width": 512,
-                "height": 512,
-                "sampler_name": "Euler"  # More compatible sampler
+            backend.session.get(f"{backend.url}/sdapi/v1/progress",
+                                params={"skip_current_image": "true"}, timeout=2)
+        except requests.exceptions.RequestException:
+            pass
+
+    def txt2img(self, payload, output_paths, no_cache=False, on_progress=None):
+        """
+        txt2img 호출 후 생성된 이미지를 output_paths에 순서대로 저장
+
+        요청 본문 전체(프롬프트, 크기, 시드, ControlNet 스켈레톤 등)가 같으면 캐시된 이미지를 복사.
+        seed가 -1(무작위)인 요청은 매번 다른 이미지가 나와야 하므로 캐시를 조회/저장하지 않음
+
+        Args:
+            payload: build_payload() 결과
+            output_paths: 저장 경로 목록 (batch_size * n_iter개)
+            no_cache: 캐시 조회/저장 생략 (시드를 지정한 요청도 새로 생성)
+            on_progress: 생성 중 진행 상황 콜백 (sd_client.ProgressPoller 참고, 캐시 적중 시 호출 안 됨)
+
+        Returns:
+            결과 딕셔너리 (image_path: 첫 번째 이미지, image_paths: 전체, cached: 캐시 사용 여부)
+        """
+        use_cache = self.cache is not None and not no_cache and payload.get("seed", -1) != -1
+        cache_key = make_key(payload) if use_cache else None
+        if use_cache and self.cache.restore(cache_key, output_paths):
+            return {
+                "success": True,
+                "image_path": output_paths[0],
+                "image_paths": list(output_paths),
+                "cached": True,
+                "message": "이미지 생성 성공 (캐시)"
             }
 
-            # TODO: Re-enable ControlNet after installing control_v11p_sd15_openpose model
-            # "alwayson_scripts": {
-            #     "controlnet": {
-            #         "args": [{
-            #             "enabled": True,
-            #             "module": "none",
-            #             "model": "control_v11p_sd15_openpose [cab727d4]",
-            #             "weight": 1.0,
-            #             "input_image": skeleton_base64,
-            #             ...
-            #         }]
-            #     }
-            # }
-
-            # API 호출
-            response = requests.post(self.txt2img_endpoint, json=payload, timeout=300)
-            response.raise_for_status()
-
-            result = response.json()
-
-            if 'images' in result and len(result['images']) > 0:
-                # 첫 번째 이미지 저장
-                image_data = base64.b64decode(result['images'][0])
-                with open(output_path, 'wb') as f:
-                    f.write(image_data)
+        try:
+            image_count = self._post_txt2img(payload, output_paths, on_progress)
 
-                return {
-                    "success": True,
-                    "image_path": output_path,
-                    "message": "이미지 생성 성공"
-                }
-            else:
+            if image_count < len(output_paths):
+                remove_files(output_paths)
                 return {
                     "success": False,
                     "error": "이미지 생성 실패"
                 }
 
+            if use_cache:
+                try:
+                    self.cache.put(cache_key, output_paths)
+                except OSError:
+                    # 캐시 저장 실패는 생성 결과에 영향 없음
+                    pass
+
+            return {
+                "success": True,
+                "image_path": output_paths[0],
+                "image_paths": list(output_paths),
+                "cached": False,
+                "message": "이미지 생성 성공"
+            }
+
+        except NoBackendAvailable as e:
+            remove_files(output_paths)
+            return {
+                "success": False,
+                "error": f"API 요청 실패: {str(e)}"
+            }
         except requests.exceptions.RequestException as e:
+            # 스트리밍 중 끊기면 일부만 쓰인 파일이 남으므로 삭제
+            remove_files(output_paths)
             return {
                 "success": False,
                 "error": f"API 요청 실패: {str(e)}"
             }
         except Exception as e:
+            remove_files(output_paths)
             return {
                 "success": False,
                 "error": f"오류 발생: {str(e)}"
             }
 
-    def generate_simple(self, prompt, output_path, negative_prompt="", steps=4):
+    def _post_txt2img(self, payload, output_paths, on_progress=None):
         """
-        ControlNet 없이 단순 텍스트→이미지 생성
+        백엔드 풀에서 하나를 골라 txt2img 호출, 받은 이미지 수 반환
+        연결 자체가 안 되는 백엔드는 내려간 것으로 표시하고 다음 백엔드로 재시도
+        (생성이 시작된 뒤의 오류나 시간 초과는 재시도하지 않음)
         """
-        try:
-            payload = {
-                "prompt": prompt,
-                "negative_prompt": negative_prompt or "bad quality, blurry, distorted, ugly, low resolution",
-                "steps": steps,
-                "cfg_scale": 2.0,
-                "width": 512,
-                "height": 512,
-                "sampler_name": "Euler"  # More compatible sampler
-            }
+        tried = []
+        while True:
+            backend = self.pool.acquire(exclude=tried)
+            started = False
+            try:
+                poller = ProgressPoller(backend.session, backend.url, on_progress) if on_progress else None
+                if poller:
+                    poller.start()
+                try:
+                    # 응답 전체를 메모리에 올리지 않고 받는 대로 이미지 파일로 디코딩
+                    with backend.session.post(f"{backend.url}/sdapi/v1/txt2img", json=payload,
+                                              timeout=300, stream=True) as response:
+                        started = True
+                        response.raise_for_status()
+                        # ControlNet은 감지 맵을 images 끝에 덧붙일 수 있으므로 앞에서부터 필요한 만큼만 저장
+                        return stream_images(response, output_paths)
+                finally:
+                    if poller:
+                        poller.stop()
+            except requests.exceptions.ConnectionError as e:
+                # 응답을 받기 시작한 뒤 끊긴 경우는 요청이 이미 처리됐을 수 있으므로 재시도하지 않음
+                if started:
+                    raise
+                self.pool.mark_down(backend, str(e))
+                tried.append(backend)
+                if len(tried) >= len(self.pool.backends):
+                    raise
+            finally:
+                self.pool.release(backend)
 
-            response = requests.post(self.txt2img_endpoint, json=payload, timeout=300)
-            response.raise_for_status()
-
-            result = response.json()
+    def generate_with_controlnet(self, prompt, skeleton_path, output_path, negative_prompt="", steps=4,
+                                 batch_size=1, n_iter=1, seed=-1, no_cache=False, on_progress=None):
+        """
+        ControlNet OpenPose를 사용하여 이미지 생성
 
-            if 'images' in result and len(result['images']) > 0:
-                image_data = base64.b64decode(result['images'][0])
-                with open(output_path, 'wb') as f:
-                    f.write(image_data)
+        skeleton_path는 OpenPose 컬러 맵이어야 함
+        (camera_detect_advanced.py의 skeleton_format "openpose"),
+        이미 전처리된 맵이므로 ControlNet 전처리기(module)는 "none"
+        """
+        try:
+            payload = self.build_payload(
+                prompt, negative_prompt, steps, skeleton_path=skeleton_path,
+                batch_size=batch_size, n_iter=n_iter, seed=seed
+            )
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"오류 발생: {str(e)}"
+            }
+        return self.txt2img(payload, batch_output_paths(output_path, batch_size * n_iter), no_cache,
+                            on_progress)
 
-                return {
-                    "success": True,
-                    "image_path": output_path,
-                    "message": "이미지 생성 성공"
-                }
-            else:
-                return {
-                    "success": False,
-                    "error": "이미지 생성 실패"
-                }
+    def generate_simple(self, prompt, output_path, negative_prompt="", steps=4, batch_size=1, n_iter=1,
+                        seed=-1, no_cache=False, on_progress=None):
+        """
+        ControlNet 없이 단순 텍스트→이미지 생성
+        """
+        payload = self.build_payload(
+            prompt, negative_prompt, steps, batch_size=batch_size, n_iter=n_iter, seed=seed
+        )
+        return self.txt2img(payload, batch_output_paths(output_path, batch_size * n_iter), no_cache,
+                            on_progress)
 
+    def generate_batch(self, prompt, output_paths, skeleton_path=None, negative_prompt="", steps=4,
+                       seed=-1, no_cache=False, on_progress=None):
+        """
+        같은 요청 여러 개를 batch_size=N 호출 한 번으로 생성 (작업 큐의 요청 묶음용)
+        output_paths[i]에 i번째 이미지 저장
+        """
+        try:
+            payload = self.build_payload(
+                prompt, negative_prompt, steps, skeleton_path=skeleton_path,
+                batch_size=len(output_paths), seed=seed
+            )
         except Exception as e:
             return {
                 "success": False,
                 "error": f"오류 발생: {str(e)}"
             }
+        return self.txt2img(payload, output_paths, no_cache, on_progress)
 
 
 def main():
     """
     CLI 인터페이스
     사용법:
-        python image_generate.py simple <prompt> <output>
-        python image_generate.py controlnet <prompt> <skeleton_path> <output>
+        python image_generate.py simple <prompt> <output> [batch_size]
+        python image_generate.py controlnet <prompt> <skeleton_path> <output> [batch_size]
+
+    batch_size > 1이면 output_1.png, output_2.png ... 에 추가로 저장 (결과의 image_paths)
+    --no-cache: 캐시를 사용하지 않고 새로 생성
     """
+    no_cache = "--no-cache" in sys.argv
+    if no_cache:
+        sys.argv.remove("--no-cache")
+
     if len(sys.argv) < 4:
         print(json.dumps({
             "success": False,
@@ -150,7 +337,8 @@ def main():
     if mode == "simple":
         prompt = sys.argv[2]
         output_path = sys.argv[3]
-        result = generator.generate_simple(prompt, output_path)
+        batch_size = int(sys.argv[4]) if len(sys.argv) >= 5 else 1
+        result = generator.generate_simple(prompt, output_path, batch_size=batch_size, no_cache=no_cache)
 
     elif mode == "controlnet":
         if len(sys.argv) < 5:
@@ -163,7 +351,10 @@ def main():
         prompt = sys.argv[2]
         skeleton_path = sys.argv[3]
         output_path = sys.argv[4]
-        result = generator.generate_with_controlnet(prompt, skeleton_path, output_path)
+        batch_size = int(sys.argv[5]) if len(sys.argv) >= 6 else 1
+        result = generator.generate_with_controlnet(
+            prompt, skeleton_path, output_path, batch_size=batch_size, no_cache=no_cache
+        )
 
     else:
         result = {"success": False, "error": "유효하지 않은 모드"}
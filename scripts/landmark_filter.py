@@ -0,0 +1,178 @@
+"""
+랜드마크 시간 필터 (스트리밍 세션용)
+- OneEuroFilter: (N, D) 배열 전체를 한 번에 처리하는 One-Euro 필터
+  (정지 상태의 떨림은 강하게, 빠른 움직임은 지연 없이 따라감)
+- LandmarkSmoother: 부위별(pose, 손, 얼굴) 필터 묶음, 좌표(x, y, z)만 필터링
+- BurstSelector: 최근 프레임 품질 기록, 캡처할 때 품질이 가장 높은 프레임 선택
+
+버퍼는 부위가 처음 나타날 때 한 번만 할당하고 프레임마다 제자리 연산(out=)만 사용
+
+참고: Casiez et al., "1€ Filter" (CHI 2012)
+"""
+import math
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+
+# 필터링할 열 (x, y, z), visibility/presence는 그대로 둠
+COORD_COLUMNS = 3
+
+# 기본값은 정규화 좌표(0-1) 기준
+SMOOTH_MIN_CUTOFF = 1.0  # 정지 상태 차단 주파수 (Hz), 낮을수록 떨림 감소
+SMOOTH_BETA = 10.0  # 속도 계수, 높을수록 빠른 움직임에 지연 감소
+SMOOTH_D_CUTOFF = 1.0  # 속도 추정 차단 주파수 (Hz)
+
+# 캡처 후보로 기억할 최근 프레임 수
+BURST_SIZE = 16
+
+
+def smoothing_factor(cutoff: float, dt: float) -> float:
+    """지수 평활 계수 alpha = 1 / (1 + tau / dt), tau = 1 / (2π·cutoff)"""
+    r = 2.0 * math.pi * cutoff * dt
+    return r / (r + 1.0)
+
+
+class OneEuroFilter:
+    """
+    (N, D) 배열 One-Euro 필터
+    원소마다 속도에 따라 차단 주파수가 달라지므로 손끝은 빠르게, 몸통은 부드럽게 따라감
+    """
+
+    def __init__(self, shape: Tuple[int, int], min_cutoff=SMOOTH_MIN_CUTOFF,
+                 beta=SMOOTH_BETA, d_cutoff=SMOOTH_D_CUTOFF):
+        self.shape = tuple(shape)
+        self.min_cutoff = float(min_cutoff)
+        self.beta = float(beta)
+        self.d_cutoff = float(d_cutoff)
+
+        self._value = np.zeros(self.shape, dtype=np.float32)  # 이전 필터 값
+        self._speed = np.zeros(self.shape, dtype=np.float32)  # 평활된 속도
+        self._delta = np.empty(self.shape, dtype=np.float32)
+        self._scratch = np.empty(self.shape, dtype=np.float32)
+        self._alpha = np.empty(self.shape, dtype=np.float32)
+        self.initialized = False
+
+    def reset(self):
+        """다음 값부터 새로 시작 (부위가 사라졌다 다시 나타난 경우 등)"""
+        self.initialized = False
+
+    def apply(self, values: np.ndarray, dt: float):
+        """
+        values를 필터링한 값으로 덮어씀
+
+        Args:
+            values: (N, D) 배열 또는 뷰 (예: landmarks[:, :3])
+            dt: 이전 값과의 시간 간격 (초)
+        """
+        if not self.initialized or dt <= 0:
+            np.copyto(self._value, values)
+            self._speed.fill(0.0)
+            self.initialized = True
+            return
+
+        # 변화량과 속도 (속도도 고정 차단 주파수로 평활): speed += a_d * (rate - speed)
+        np.subtract(values, self._value, out=self._delta)
+        np.multiply(self._delta, 1.0 / dt, out=self._scratch)
+        self._scratch -= self._speed
+        self._scratch *= smoothing_factor(self.d_cutoff, dt)
+        self._speed += self._scratch
+
+        # 원소별 차단 주파수 = min_cutoff + beta * |speed|
+        np.abs(self._speed, out=self._alpha)
+        self._alpha *= self.beta
+        self._alpha += self.min_cutoff
+
+        # alpha = r / (r + 1), r = 2π·cutoff·dt
+        self._alpha *= 2.0 * math.pi * dt
+        np.add(self._alpha, 1.0, out=self._scratch)
+        np.divide(self._alpha, self._scratch, out=self._alpha)
+
+        # value += alpha * (x - value)
+        self._delta *= self._alpha
+        self._value += self._delta
+        np.copyto(values, self._value)
+
+
+class LandmarkSmoother:
+    """
+    세션별 랜드마크 필터 (extract_landmark_arrays() 결과를 제자리에서 필터링)
+
+    사용법:
+        smoother = LandmarkSmoother()
+        smoother.apply(landmarks, time.monotonic())  # 감지 직후, 그리기 전
+    """
+
+    def __init__(self, min_cutoff=SMOOTH_MIN_CUTOFF, beta=SMOOTH_BETA, d_cutoff=SMOOTH_D_CUTOFF):
+        self.min_cutoff = float(min_cutoff)
+        self.beta = float(beta)
+        self.d_cutoff = float(d_cutoff)
+        self._filters: Dict[str, OneEuroFilter] = {}
+        self._last_time: Optional[float] = None
+
+    def reset(self):
+        for one_euro in self._filters.values():
+            one_euro.reset()
+        self._last_time = None
+
+    def apply(self, landmarks: Dict[str, Optional[np.ndarray]], timestamp: float):
+        """
+        Args:
+            landmarks: 부위별 (N, 5) 배열 (None인 부위는 필터 초기화)
+            timestamp: 프레임 시각 (초, 단조 증가)
+        """
+        dt = 0.0 if self._last_time is None else timestamp - self._last_time
+        self._last_time = timestamp
+
+        for part, array in landmarks.items():
+            one_euro = self._filters.get(part)
+            if array is None:
+                if one_euro is not None:
+                    one_euro.reset()
+                continue
+
+            coords = array[:, :COORD_COLUMNS]
+            if one_euro is None or one_euro.shape != coords.shape:
+                one_euro = self._filters[part] = OneEuroFilter(
+                    coords.shape, self.min_cutoff, self.beta, self.d_cutoff
+                )
+            one_euro.apply(coords, dt)
+        return landmarks
+
+
+class BurstSelector:
+    """
+    최근 프레임 품질 기록 (고정 크기 링 버퍼)
+    촬영 버튼을 누른 순간의 한 프레임 대신, 직전 몇 프레임 중 품질이 가장 높은 프레임을 캡처
+    """
+
+    def __init__(self, size=BURST_SIZE):
+        self.size = int(size)
+        self._frames = np.full(self.size, -1, dtype=np.int64)
+        self._scores = np.zeros(self.size, dtype=np.float64)
+        self._times = np.zeros(self.size, dtype=np.float64)
+        self._next = 0
+
+    def record(self, frame_index: int, score: float, timestamp: float):
+        slot = self._next % self.size
+        self._frames[slot] = frame_index
+        self._scores[slot] = score
+        self._times[slot] = timestamp
+        self._next += 1
+
+    def best(self, now: float, max_age: Optional[float] = None) -> Optional[Tuple[int, float]]:
+        """
+        (프레임 번호, 품질 점수), 기록이 없으면 None
+        max_age: 이 시간(초)보다 오래된 프레임 제외
+        """
+        valid = self._frames >= 0
+        if max_age is not None:
+            valid &= (now - self._times) <= max_age
+        if not valid.any():
+            return None
+        slot = int(np.argmax(np.where(valid, self._scores, -np.inf)))
+        return int(self._frames[slot]), float(self._scores[slot])
+
+    def clear(self):
+        self._frames.fill(-1)
+        self._next = 0
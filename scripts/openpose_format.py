@@ -0,0 +1,219 @@
+"""
+MediaPipe → OpenPose 변환
+- 포즈 33점 → COCO-18 / BODY_25, 손 21점 → OpenPose 손 21점, 얼굴 478점 → OpenPose 얼굴 70점
+- ControlNet OpenPose(control_v11p_sd15_openpose) 전처리기와 같은 컬러 림브 맵 렌더링
+  (SD 쪽에서 module "none"으로 바로 사용 가능)
+- OpenPose JSON 출력
+"""
+import colorsys
+import math
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+
+NECK = -1  # 양 어깨 중점
+MID_HIP = -2  # 양 엉덩이 중점
+
+# OpenPose 키포인트 순서별 MediaPipe 포즈 인덱스
+COCO18_FROM_MEDIAPIPE = [
+    0, NECK, 12, 14, 16, 11, 13, 15, 24, 26, 28, 23, 25, 27, 5, 2, 8, 7
+]
+# MediaPipe에는 새끼발가락이 없으므로 엄지발가락(foot_index)으로 대체
+BODY25_FROM_MEDIAPIPE = [
+    0, NECK, 12, 14, 16, 11, 13, 15, MID_HIP, 24, 26, 28, 23, 25, 27, 5, 2, 8, 7,
+    31, 31, 29, 32, 32, 30
+]
+POSE_LAYOUTS = {
+    "COCO18": COCO18_FROM_MEDIAPIPE,
+    "BODY_25": BODY25_FROM_MEDIAPIPE,
+}
+
+# OpenPose 얼굴 68점 (+ 동공 2점)에 대응하는 MediaPipe Face Mesh 인덱스
+FACE70_FROM_MEDIAPIPE = [
+    162, 234, 93, 58, 172, 136, 149, 148, 152, 377, 378, 365, 397, 288, 323, 454, 389,  # 턱선
+    71, 63, 105, 66, 107, 336, 296, 334, 293, 301,  # 눈썹
+    168, 197, 5, 4, 75, 97, 2, 326, 305,  # 코
+    33, 160, 158, 133, 153, 144, 362, 385, 387, 263, 373, 380,  # 눈
+    61, 39, 37, 0, 267, 269, 291, 405, 314, 17, 84, 181,  # 바깥 입술
+    78, 82, 13, 312, 308, 317, 14, 87,  # 안쪽 입술
+    468, 473  # 오른쪽/왼쪽 동공 (refine_face_landmarks=True일 때만 존재)
+]
+
+# ControlNet OpenPose 전처리기와 같은 림브 연결 (COCO-18, 1부터 시작) 및 색상 (RGB)
+LIMB_SEQUENCE = [
+    (2, 3), (2, 6), (3, 4), (4, 5), (6, 7), (7, 8), (2, 9), (9, 10), (10, 11),
+    (2, 12), (12, 13), (13, 14), (2, 1), (1, 15), (15, 17), (1, 16), (16, 18)
+]
+LIMB_COLORS = [
+    (255, 0, 0), (255, 85, 0), (255, 170, 0), (255, 255, 0), (170, 255, 0), (85, 255, 0),
+    (0, 255, 0), (0, 255, 85), (0, 255, 170), (0, 255, 255), (0, 170, 255), (0, 85, 255),
+    (0, 0, 255), (85, 0, 255), (170, 0, 255), (255, 0, 255), (255, 0, 170), (255, 0, 85)
+]
+HAND_EDGES = [
+    (0, 1), (1, 2), (2, 3), (3, 4), (0, 5), (5, 6), (6, 7), (7, 8), (0, 9), (9, 10),
+    (10, 11), (11, 12), (0, 13), (13, 14), (14, 15), (15, 16), (0, 17), (17, 18), (18, 19), (19, 20)
+]
+HAND_EDGE_COLORS = [
+    tuple(int(c * 255) for c in colorsys.hsv_to_rgb(i / float(len(HAND_EDGES)), 1.0, 1.0))
+    for i in range(len(HAND_EDGES))
+]
+
+STICK_WIDTH = 4
+VISIBILITY_THRESHOLD = 0.5
+EPS = 0.01
+
+
+def _bgr(color):
+    return (color[2], color[1], color[0])
+
+
+def _remap_pose(pose: np.ndarray, layout: str) -> np.ndarray:
+    """포즈 (33, 5) → (K, 3) 정규화 좌표 + 신뢰도 (감지 안 된 점은 0)"""
+    indices = POSE_LAYOUTS[layout]
+    xy = pose[:, :2]
+    confidence = pose[:, 3].copy()
+    in_frame = np.all((xy >= 0) & (xy <= 1), axis=1)
+    confidence[~in_frame | (confidence < VISIBILITY_THRESHOLD)] = 0
+
+    keypoints = np.zeros((len(indices), 3), dtype=np.float32)
+    for i, index in enumerate(indices):
+        if index >= 0:
+            keypoints[i, :2] = xy[index]
+            keypoints[i, 2] = confidence[index]
+        else:
+            a, b = (11, 12) if index == NECK else (23, 24)
+            keypoints[i, :2] = (xy[a] + xy[b]) / 2
+            keypoints[i, 2] = min(confidence[a], confidence[b])
+
+    keypoints[keypoints[:, 2] == 0, :2] = 0
+    return keypoints
+
+
+def _remap_points(points: Optional[np.ndarray], indices: Optional[List[int]], count: int) -> np.ndarray:
+    """손/얼굴 → (count, 3) (visibility가 없으므로 화면 안에 있으면 신뢰도 1)"""
+    keypoints = np.zeros((count, 3), dtype=np.float32)
+    if points is None:
+        return keypoints
+
+    if indices is not None:
+        available = [i for i, index in enumerate(indices) if index < len(points)]
+        keypoints[available, :2] = points[[indices[i] for i in available], :2]
+        keypoints[available, 2] = 1.0
+    else:
+        keypoints[:, :2] = points[:count, :2]
+        keypoints[:, 2] = 1.0
+
+    in_frame = np.all((keypoints[:, :2] >= 0) & (keypoints[:, :2] <= 1), axis=1)
+    keypoints[~in_frame] = 0
+    return keypoints
+
+
+def to_openpose_keypoints(landmarks: Dict[str, Optional[np.ndarray]], layout="COCO18") -> Dict[str, np.ndarray]:
+    """
+    MediaPipe 랜드마크 배열 → OpenPose 키포인트 (정규화 좌표)
+
+    Args:
+        landmarks: extract_landmark_arrays() 결과
+        layout: "COCO18" 또는 "BODY_25"
+
+    Returns:
+        {"pose": (18|25, 3), "left_hand": (21, 3), "right_hand": (21, 3), "face": (70, 3)}
+        각 행: x, y, confidence (감지 안 된 점은 0, 0, 0)
+    """
+    pose = landmarks.get("pose")
+    return {
+        "pose": (_remap_pose(pose, layout) if pose is not None
+                 else np.zeros((len(POSE_LAYOUTS[layout]), 3), dtype=np.float32)),
+        "left_hand": _remap_points(landmarks.get("left_hand"), None, 21),
+        "right_hand": _remap_points(landmarks.get("right_hand"), None, 21),
+        "face": _remap_points(landmarks.get("face"), FACE70_FROM_MEDIAPIPE, 70),
+    }
+
+
+def to_openpose_json(keypoints: Dict[str, np.ndarray], width: int, height: int) -> Dict:
+    """OpenPose JSON (픽셀 좌표, x/y/c 평탄화 배열)"""
+    scale = np.array([width, height, 1], dtype=np.float64)
+
+    def flatten(points):
+        return np.round(points * scale, 3).ravel().tolist()
+
+    return {
+        "version": 1.3,
+        "canvas_width": width,
+        "canvas_height": height,
+        "people": [{
+            "person_id": [-1],
+            "pose_keypoints_2d": flatten(keypoints["pose"]),
+            "hand_left_keypoints_2d": flatten(keypoints["left_hand"]),
+            "hand_right_keypoints_2d": flatten(keypoints["right_hand"]),
+            "face_keypoints_2d": flatten(keypoints["face"]),
+        }]
+    }
+
+
+def render_openpose(keypoints: Dict[str, np.ndarray], height: int, width: int,
+                    draw_hands=True, draw_face=True, canvas: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    ControlNet OpenPose 전처리기와 같은 컬러 맵 렌더링 (BGR)
+    포즈는 COCO-18 키포인트여야 함
+
+    Args:
+        keypoints: to_openpose_keypoints(layout="COCO18") 결과
+        canvas: 그릴 검은 캔버스 (없으면 생성)
+    """
+    if canvas is None:
+        canvas = np.zeros((height, width, 3), dtype=np.uint8)
+
+    pose = keypoints["pose"]
+    pixels = np.empty((len(pose), 2), dtype=np.float64)
+    pixels[:, 0] = pose[:, 0] * float(width)
+    pixels[:, 1] = pose[:, 1] * float(height)
+
+    # 림브: 타원 다각형, 색상 60%
+    for (start, end), color in zip(LIMB_SEQUENCE, LIMB_COLORS):
+        if pose[start - 1, 2] == 0 or pose[end - 1, 2] == 0:
+            continue
+        x1, y1 = pixels[start - 1]
+        x2, y2 = pixels[end - 1]
+        length = math.hypot(x1 - x2, y1 - y2)
+        angle = math.degrees(math.atan2(y1 - y2, x1 - x2))
+        polygon = cv2.ellipse2Poly(
+            (int((x1 + x2) / 2), int((y1 + y2) / 2)),
+            (int(length / 2), STICK_WIDTH), int(angle), 0, 360, 1
+        )
+        cv2.fillConvexPoly(canvas, polygon, _bgr([int(c * 0.6) for c in color]))
+
+    # 관절
+    for (x, y), confidence, color in zip(pixels, pose[:, 2], LIMB_COLORS):
+        if confidence > 0:
+            cv2.circle(canvas, (int(x), int(y)), 4, _bgr(color), thickness=-1)
+
+    if draw_hands:
+        for hand in (keypoints["left_hand"], keypoints["right_hand"]):
+            _draw_hand(canvas, hand, width, height)
+
+    if draw_face:
+        face = keypoints["face"]
+        for x, y in (face[face[:, 2] > 0, :2] * (width, height)).astype(int).tolist():
+            if x > EPS and y > EPS:
+                cv2.circle(canvas, (x, y), 3, (255, 255, 255), thickness=-1)
+
+    return canvas
+
+
+def _draw_hand(canvas: np.ndarray, hand: np.ndarray, width: int, height: int):
+    if not hand[:, 2].any():
+        return
+
+    points = (hand[:, :2] * (width, height)).astype(int)
+    present = (hand[:, 2] > 0) & np.all(points > EPS, axis=1)
+
+    for (start, end), color in zip(HAND_EDGES, HAND_EDGE_COLORS):
+        if present[start] and present[end]:
+            cv2.line(canvas, tuple(points[start].tolist()), tuple(points[end].tolist()),
+                     _bgr(color), thickness=2)
+
+    for x, y in points[present].tolist():
+        cv2.circle(canvas, (x, y), 4, _bgr((0, 0, 255)), thickness=-1)
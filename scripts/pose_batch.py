@@ -0,0 +1,217 @@
+"""
+포즈 감지 배치 처리
+- 디렉토리, glob 패턴 또는 JSONL 매니페스트의 이미지를 일괄 처리
+- 워커 프로세스마다 감지기를 한 번만 로드 (프로세스 풀)
+- 워커 내부에서 이미지 디코딩은 스레드 풀로 미리 수행 (감지와 겹침)
+- 결과는 한 줄에 JSON 하나씩 즉시 출력
+
+사용법: python camera_detect_advanced.py batch <dir|glob|manifest.jsonl> <output_dir> [options_json]
+"""
+import sys
+import json
+import glob
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import cv2
+import numpy as np
+
+from camera_detect_advanced import AdvancedPoseDetector, DEFAULT_OPTIONS, parse_model_complexity
+
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+DEFAULT_BATCH_OPTIONS = {
+    "workers": 2,  # 감지 프로세스 수
+    "decode_threads": 2,  # 워커당 디코딩 스레드 수
+    "chunk_size": 8,  # 워커에 한 번에 넘기는 이미지 수
+    "model_complexity": "auto"  # 0, 1, 2 또는 auto (가벼운 모델부터, 품질이 낮을 때만 다음 모델)
+}
+
+# 워커 프로세스 전역 상태 (_init_worker에서 설정)
+_detector: Optional[AdvancedPoseDetector] = None
+_decode_pool: Optional[ThreadPoolExecutor] = None
+
+
+def iter_batch_inputs(source: str, output_dir: str) -> Iterator[Dict]:
+    """
+    입력 목록 생성
+
+    Args:
+        source: 디렉토리, glob 패턴 또는 .jsonl 매니페스트
+            (매니페스트 각 줄: "경로" 또는 {"input": ..., "output": ..., "options": {...}})
+        output_dir: output이 지정되지 않은 항목의 스켈레톤 저장 디렉토리
+
+    Yields:
+        {"input": str, "output": str, "options": dict}
+    """
+    out_dir = Path(output_dir)
+
+    def default_output(input_path):
+        return str(out_dir / f"{Path(input_path).stem}_skeleton.png")
+
+    source_path = Path(source)
+
+    if source_path.is_file() and source_path.suffix.lower() == ".jsonl":
+        with open(source_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                entry = json.loads(line)
+                if isinstance(entry, str):
+                    entry = {"input": entry}
+                yield {
+                    "input": entry["input"],
+                    "output": entry.get("output") or default_output(entry["input"]),
+                    "options": entry.get("options") or {}
+                }
+        return
+
+    if source_path.is_dir():
+        paths = sorted(
+            str(p) for p in source_path.iterdir()
+            if p.is_file() and p.suffix.lower() in IMAGE_EXTENSIONS
+        )
+    else:
+        paths = sorted(glob.glob(source, recursive=True))
+
+    for path in paths:
+        yield {"input": path, "output": default_output(path), "options": {}}
+
+
+def _init_worker(model_complexity, decode_threads):
+    """워커 프로세스 초기화: 감지기 로드 + 디코딩 스레드 풀"""
+    global _detector, _decode_pool
+    _detector = AdvancedPoseDetector(model_complexity=model_complexity)
+    _detector.warmup()
+    _decode_pool = ThreadPoolExecutor(max_workers=decode_threads)
+
+
+def _read_image(path: str) -> Optional[np.ndarray]:
+    """디코딩 실패는 예외 대신 None (map 반복 중 예외가 나면 묶음의 나머지 결과가 사라짐)"""
+    try:
+        return cv2.imread(path)
+    except Exception:
+        return None
+
+
+def _process_chunk(items: List[Dict], options: Dict) -> List[Dict]:
+    """워커 프로세스: 이미지 묶음 처리 (디코딩은 스레드 풀에서 먼저 진행)"""
+    results = []
+    # map은 모든 디코딩을 즉시 제출하므로 감지하는 동안 다음 이미지가 디코딩됨
+    images = _decode_pool.map(_read_image, [item["input"] for item in items])
+
+    for item, image in zip(items, images):
+        merged = dict(DEFAULT_OPTIONS)
+        # 스켈레톤은 파일로 저장되므로 결과 줄에는 base64를 싣지 않음
+        merged["render"] = "file"
+        merged.update(options)
+        merged.update(item["options"])
+
+        if image is None:
+            result = {"success": False, "error": "이미지를 읽을 수 없습니다"}
+        else:
+            # 이미지 하나의 오류가 묶음 전체(와 배치)를 중단하지 않도록 항목별로 처리
+            try:
+                result = _detector.process_single_person(
+                    image, item["output"],
+                    draw_hands=merged.get("draw_hands", True),
+                    draw_face=merged.get("draw_face", True),
+                    colorful=merged.get("colorful", False),
+                    skeleton_format=merged.get("skeleton_format", "mediapipe"),
+                    render=merged.get("render", "file"),
+                    landmarks_format=merged.get("landmarks_format"),
+                    working_size=merged.get("working_size"),
+                    output_size=merged.get("output_size"),
+                    min_quality=merged.get("min_quality", 0.0)
+                )
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+
+        result["input"] = item["input"]
+        results.append(result)
+
+    return results
+
+
+def _chunks(items: Iterator[Dict], size: int) -> Iterator[List[Dict]]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_batch(source: str, output_dir: str, options: Optional[Dict] = None, out=None) -> Dict:
+    """
+    배치 실행 (결과를 한 줄에 JSON 하나씩 out에 출력)
+
+    Args:
+        source: 디렉토리, glob 패턴 또는 .jsonl 매니페스트
+        output_dir: 스켈레톤 저장 디렉토리
+        options: DEFAULT_BATCH_OPTIONS + 그리기/품질 옵션
+        out: 출력 스트림 (기본: stdout)
+
+    Returns:
+        요약 딕셔너리
+    """
+    out = out or sys.stdout
+    settings = dict(DEFAULT_BATCH_OPTIONS)
+    settings.update(options or {})
+    detect_options = {k: v for k, v in settings.items() if k not in DEFAULT_BATCH_OPTIONS}
+
+    # 워커 초기화 중에 실패하면 풀 전체가 깨지므로 먼저 검증
+    try:
+        parse_model_complexity(settings["model_complexity"])
+    except ValueError as e:
+        return {"success": False, "error": str(e)}
+
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+
+    workers = max(1, int(settings["workers"]))
+    chunk_size = max(1, int(settings["chunk_size"]))
+    total = succeeded = 0
+    start_time = time.monotonic()
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(settings["model_complexity"], max(1, int(settings["decode_threads"])))
+    ) as pool:
+        pending = set()
+        chunks = _chunks(iter_batch_inputs(source, output_dir), chunk_size)
+
+        def drain():
+            nonlocal pending, total, succeeded
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for result in future.result():
+                    total += 1
+                    succeeded += 1 if result.get("success") else 0
+                    out.write(json.dumps(result, ensure_ascii=True) + "\n")
+            out.flush()
+
+        for chunk in chunks:
+            pending.add(pool.submit(_process_chunk, chunk, detect_options))
+            # 대기 중인 묶음 수를 제한해 입력 목록 전체가 메모리에 올라가지 않게 함
+            if len(pending) >= workers * 2:
+                drain()
+
+        while pending:
+            drain()
+
+    return {
+        "success": True,
+        "summary": {
+            "total": total,
+            "succeeded": succeeded,
+            "failed": total - succeeded,
+            "elapsed_seconds": round(time.monotonic() - start_time, 2)
+        }
+    }
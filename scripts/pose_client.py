@@ -0,0 +1,108 @@
+"""
+포즈 감지 데몬(pose_server.py) 씬 클라이언트
+- 표준 라이브러리만 사용 (cv2/mediapipe import 없음)
+- 데몬이 실행 중이 아니면 camera_detect_advanced로 직접 처리
+
+사용법: python pose_client.py <mode> <input> <output> [options_json]
+"""
+import sys
+import json
+import os
+import urllib.request
+import urllib.error
+from pathlib import Path
+
+
+DEFAULT_SERVER_URL = "http://127.0.0.1:7870"
+
+
+def get_server_url():
+    """데몬 주소 (config.json → 환경 변수 → 기본값)"""
+    config_file = Path(__file__).parent.parent / "config.json"
+    if config_file.exists():
+        try:
+            with open(config_file, 'r', encoding='utf-8') as f:
+                url = json.load(f).get('pose_server_url')
+            if url:
+                return url.rstrip('/')
+        except (OSError, ValueError):
+            pass
+    return os.getenv('POSE_SERVER_URL', DEFAULT_SERVER_URL).rstrip('/')
+
+
+def request_detection(mode, input_data, output_path, options=None, timeout=60):
+    """
+    데몬에 감지 요청
+
+    Returns:
+        결과 딕셔너리, 데몬에 연결할 수 없으면 None
+    """
+    payload = json.dumps({
+        "mode": mode,
+        "input": input_data,
+        "output": output_path,
+        "options": options or {}
+    }).encode('utf-8')
+
+    request = urllib.request.Request(
+        get_server_url() + "/detect",
+        data=payload,
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
+
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read().decode('utf-8'))
+    except urllib.error.HTTPError as e:
+        try:
+            return json.loads(e.read().decode('utf-8'))
+        except ValueError:
+            return {"success": False, "error": f"포즈 서버 오류 (HTTP {e.code})"}
+    except (urllib.error.URLError, ConnectionError, TimeoutError):
+        return None
+
+
+def detect_locally(mode, input_data, output_path, options=None):
+    """데몬 없이 현재 프로세스에서 처리 (콜드 스타트)"""
+    from camera_detect_advanced import AdvancedPoseDetector, handle_request, MODEL_COMPLEXITY_AUTO
+
+    detector = AdvancedPoseDetector(
+        model_complexity=MODEL_COMPLEXITY_AUTO,
+        min_detection_confidence=0.5
+    )
+    try:
+        return handle_request(detector, mode, input_data, output_path, options)
+    except ValueError as e:
+        # 잘못된 옵션 (예: 지원하지 않는 model_complexity)
+        return {"success": False, "error": str(e)}
+
+
+def main():
+    if len(sys.argv) < 4:
+        print(json.dumps({
+            "success": False,
+            "error": "사용법: python pose_client.py <mode> <input> <output> [options_json]"
+        }, ensure_ascii=True))
+        sys.exit(1)
+
+    mode = sys.argv[1]
+    input_data = sys.argv[2]
+    output_path = sys.argv[3]
+
+    options = {}
+    if len(sys.argv) >= 5:
+        try:
+            options = json.loads(sys.argv[4])
+        except ValueError:
+            pass
+
+    result = request_detection(mode, input_data, output_path, options)
+    if result is None:
+        result = detect_locally(mode, input_data, output_path, options)
+
+    print(json.dumps(result, ensure_ascii=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+포즈 기반 이미지 생성 파이프라인 (pose_image 단일 진입점)
+- 포즈 감지 → OpenPose 컬러 맵 → ControlNet txt2img를 한 프로세스에서 처리
+- 스켈레톤은 메모리의 PNG 바이트를 그대로 요청에 사용 (파일은 결과 표시용으로만 저장, 다시 읽지 않음)
+- 감지가 도는 동안 다른 스레드에서 SD 요청 본문을 만들고 SD WebUI 연결을 미리 열어 둠
+  (SD WebUI API에는 프롬프트 인코딩만 따로 요청하는 엔드포인트가 없으므로 요청 준비까지만 겹침)
+
+사용법:
+    python pose_pipeline.py <image_path> <prompt> <skeleton_output> <image_output> [options_json]
+
+options (JSON): {"draw_hands": true, "draw_face": true, "min_quality": 30.0,
+                 "negative_prompt": "", "steps": 4, "seed": -1, "no_cache": false}
+"""
+import sys
+import json
+import base64
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+
+
+DEFAULT_OPTIONS = {
+    "draw_hands": True,
+    "draw_face": True,
+    "min_quality": 30.0,
+    "negative_prompt": "",
+    "steps": 4,
+    "seed": -1,
+    "no_cache": False
+}
+
+
+class PosePipeline:
+    """
+    감지기와 생성기를 한 번만 로드해 재사용 (pose_server.py의 /pipeline, CLI 공용)
+    """
+
+    def __init__(self, detector=None, generator=None, detector_lock: Optional[threading.Lock] = None):
+        """
+        Args:
+            detector: AdvancedPoseDetector (없으면 생성)
+            generator: SDImageGenerator (없으면 생성)
+            detector_lock: 감지 구간에만 잡을 잠금 (데몬에서 다른 감지 요청과 직렬화, 생성 중에는 풀림)
+        """
+        # 무거운 import는 실제로 쓸 때만
+        if detector is None:
+            from camera_detect_advanced import AdvancedPoseDetector, MODEL_COMPLEXITY_AUTO
+            detector = AdvancedPoseDetector(model_complexity=MODEL_COMPLEXITY_AUTO, min_detection_confidence=0.5)
+        if generator is None:
+            from image_generate import SDImageGenerator
+            generator = SDImageGenerator()
+
+        self.detector = detector
+        self.generator = generator
+        self.detector_lock = detector_lock or threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="pose-pipeline")
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    def _prepare_request(self, prompt, negative_prompt, steps, seed) -> Dict:
+        """스켈레톤을 뺀 txt2img 요청 본문 + SD 연결 준비 (감지와 동시에 실행)"""
+        payload = self.generator.build_payload(prompt, negative_prompt, steps, seed=seed)
+        self.generator.warmup()
+        return payload
+
+    def run(self, image_data: bytes, prompt: str, skeleton_output: str, image_output: str,
+            draw_hands=True, draw_face=True, min_quality=30.0,
+            negative_prompt="", steps=4, seed=-1, no_cache=False, on_progress=None) -> Dict:
+        """
+        포즈 감지 후 이미지 생성
+
+        Args:
+            image_data: JPEG/PNG 등 인코딩된 입력 이미지
+            prompt: 프롬프트
+            skeleton_output: 스켈레톤(OpenPose 컬러 맵) 저장 경로
+            image_output: 생성 이미지 저장 경로
+            min_quality: 최소 포즈 품질 (0-100)
+            on_progress: 생성 진행 상황 콜백 (SDImageGenerator.txt2img 참고)
+
+        Returns:
+            결과 딕셔너리 (skeleton_path, image_path, pose_quality, timings).
+            실패하면 만들어진 파일을 지우고 error 반환
+        """
+        started = time.perf_counter()
+        prepared = self._executor.submit(self._prepare_request, prompt, negative_prompt, steps, seed)
+
+        with self.detector_lock:
+            detection = self.detector.process_image_bytes(
+                image_data, skeleton_output,
+                draw_hands=draw_hands,
+                draw_face=draw_face,
+                min_quality=min_quality,
+                skeleton_encoding="bytes",
+                skeleton_format="openpose",
+                render="both"
+            )
+        detected = time.perf_counter()
+
+        try:
+            payload = prepared.result()
+        except Exception as e:
+            payload = None
+            prepare_error = str(e)
+
+        if not detection.get("success"):
+            _remove(skeleton_output)
+            return {
+                "success": False,
+                "error": f"포즈 감지 실패: {detection.get('error', '알 수 없는 오류')}",
+                "pose_quality": detection.get("pose_quality")
+            }
+        if payload is None:
+            _remove(skeleton_output)
+            return {"success": False, "error": f"오류 발생: {prepare_error}"}
+
+        skeleton_png = detection.pop("skeleton_png")
+        self.generator.attach_skeleton(payload, base64.b64encode(skeleton_png).decode("utf-8"))
+        generation = self.generator.txt2img(payload, [image_output], no_cache, on_progress)
+        finished = time.perf_counter()
+
+        if not generation.get("success"):
+            _remove(skeleton_output)
+            return {
+                "success": False,
+                "error": f"이미지 생성 실패: {generation.get('error', '알 수 없는 오류')}",
+                "pose_quality": detection["pose_quality"]
+            }
+
+        return {
+            "success": True,
+            "skeleton_path": skeleton_output,
+            "image_path": image_output,
+            "pose_quality": detection["pose_quality"],
+            "detected_features": detection["detected_features"],
+            "cached": generation.get("cached", False),
+            "timings": {
+                "detect": round(detected - started, 3),
+                "generate": round(finished - detected, 3),
+                "total": round(finished - started, 3)
+            },
+            "message": "포즈 기반 이미지 생성 완료"
+        }
+
+    def run_options(self, image_data: bytes, prompt: str, skeleton_output: str, image_output: str,
+                    options: Optional[Dict] = None, on_progress=None) -> Dict:
+        """options 딕셔너리 (DEFAULT_OPTIONS 참고)로 run 호출"""
+        merged = dict(DEFAULT_OPTIONS)
+        if options:
+            merged.update({k: v for k, v in options.items() if k in DEFAULT_OPTIONS})
+        return self.run(image_data, prompt, skeleton_output, image_output, on_progress=on_progress, **merged)
+
+
+def _remove(path):
+    try:
+        Path(path).unlink()
+    except OSError:
+        pass
+
+
+def main():
+    if len(sys.argv) < 5:
+        print(json.dumps({
+            "success": False,
+            "error": "사용법: python pose_pipeline.py <image_path> <prompt> <skeleton_output> <image_output> [options_json]"
+        }, ensure_ascii=True))
+        sys.exit(1)
+
+    image_path, prompt, skeleton_output, image_output = sys.argv[1:5]
+    options = {}
+    if len(sys.argv) >= 6:
+        try:
+            options = json.loads(sys.argv[5])
+        except ValueError:
+            pass
+
+    try:
+        with open(image_path, 'rb') as f:
+            image_data = f.read()
+    except OSError as e:
+        print(json.dumps({"success": False, "error": f"이미지를 읽을 수 없습니다: {str(e)}"}, ensure_ascii=True))
+        sys.exit(1)
+
+    pipeline = PosePipeline()
+    try:
+        result = pipeline.run_options(image_data, prompt, skeleton_output, image_output, options)
+    finally:
+        pipeline.close()
+
+    print(json.dumps(result, ensure_ascii=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""
+포즈 감지 데몬
+- AdvancedPoseDetector를 한 번만 로드하고 로컬 HTTP로 요청 처리
+- 요청마다 cv2/mediapipe import 및 그래프 생성 비용 제거
+- /pipeline: 포즈 감지 + ControlNet 이미지 생성 (pose_pipeline.py, 감지 중에만 감지 잠금 사용)
+
+사용법: python pose_server.py [port] [host]
+"""
+import sys
+import json
+import base64
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from camera_detect_advanced import (
+    AdvancedPoseDetector, handle_request, close_graphs, loaded_graphs,
+    decode_frame_base64, decode_image_bytes, MODEL_COMPLEXITY_AUTO
+)
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 7870
+
+# 이 시간 동안 프레임이 없는 스트리밍 세션은 정리
+STREAM_IDLE_SECONDS = 60.0
+
+# X-Pose-Result 헤더에 싣는 요약 필드 (랜드마크/openpose/people 같은 큰 값은 본문으로)
+RESULT_HEADER_FIELDS = {
+    "success", "error", "message", "skeleton_path", "pose_quality", "detected_features",
+    "pose_box", "model_complexity", "person_count", "session_id", "frame_index", "gate",
+    "landmarks_layout", "timings"
+}
+# 헤더 한 줄 크기 상한 (http.client 64KB, 프록시/curl은 더 작은 경우가 많음)
+RESULT_HEADER_MAX_BYTES = 8192
+
+
+class PoseServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, detector: AdvancedPoseDetector):
+        super().__init__(address, PoseRequestHandler)
+        self.detector = detector
+        # MediaPipe 그래프는 스레드 안전하지 않으므로 추론은 직렬화
+        self.detector_lock = threading.Lock()
+        self._pipeline = None
+        self._pipeline_lock = threading.Lock()
+
+    @property
+    def pipeline(self):
+        """포즈 기반 생성 파이프라인 (첫 /pipeline 요청 시 SD 클라이언트 로드)"""
+        with self._pipeline_lock:
+            if self._pipeline is None:
+                from pose_pipeline import PosePipeline
+                self._pipeline = PosePipeline(self.detector, detector_lock=self.detector_lock)
+            return self._pipeline
+
+
+class PoseRequestHandler(BaseHTTPRequestHandler):
+    server: PoseServer
+
+    def _send_json(self, result, status=200):
+        body = json.dumps(result, ensure_ascii=True).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_result(self, result):
+        """
+        바이너리 요청 응답
+        skeleton_png 또는 landmarks_blob 중 하나만 있고 나머지 결과가 요약 필드뿐이면
+        원본을 본문으로, 요약은 X-Pose-Result 헤더로 전달.
+        그 외 (둘 다 있음, JSON 랜드마크/openpose/people 포함, 헤더가 너무 큼)는 base64로 바꿔 JSON 응답
+        """
+        skeleton_png = result.pop("skeleton_png", None)
+        landmarks_blob = result.pop("landmarks_blob", None)
+
+        header = None
+        if skeleton_png is not None or landmarks_blob is not None:
+            if set(result) <= RESULT_HEADER_FIELDS:
+                header = json.dumps(result, ensure_ascii=True)
+            if header is None or len(header) > RESULT_HEADER_MAX_BYTES or (
+                    skeleton_png is not None and landmarks_blob is not None):
+                header = None
+                if skeleton_png is not None:
+                    result["skeleton_base64"] = base64.b64encode(skeleton_png).decode("utf-8")
+                if landmarks_blob is not None:
+                    result["landmarks_base64"] = base64.b64encode(landmarks_blob).decode("utf-8")
+                skeleton_png = landmarks_blob = None
+
+        if skeleton_png is not None:
+            body, content_type = skeleton_png, "image/png"
+        elif landmarks_blob is not None:
+            body, content_type = landmarks_blob, "application/octet-stream"
+        else:
+            self._send_json(result)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-Pose-Result", header)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        if length <= 0:
+            return b""
+        return self.rfile.read(length)
+
+    def _read_json(self):
+        body = self._read_body()
+        if not body:
+            return {}
+        return json.loads(body.decode("utf-8"))
+
+    def _skeleton_encoding(self):
+        # Accept: image/png (스켈레톤) 또는 application/octet-stream (랜드마크 블롭)이면
+        # base64 없이 원본 그대로 응답
+        accept = self.headers.get("Accept", "")
+        if "image/png" in accept or "application/octet-stream" in accept:
+            return "bytes"
+        return "base64"
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json({
+                "success": True,
+                "service": "pose",
+                "graphs": [list(key) for key in loaded_graphs()]
+            })
+        elif self.path == "/stats":
+            self._send_json({"success": True, "gate": self.server.detector.gate_stats()})
+        else:
+            self._send_json({"success": False, "error": "알 수 없는 경로"}, 404)
+
+    def do_POST(self):
+        parsed = urlparse(self.path)
+        binary_routes = {
+            "/detect/binary": self._handle_detect_binary,
+            "/stream/frame/binary": self._handle_stream_frame_binary,
+            "/pipeline": self._handle_pipeline,
+        }
+        binary_handler = binary_routes.get(parsed.path)
+        if binary_handler is not None:
+            # 본문은 인코딩된 이미지 원본, 옵션은 쿼리 문자열
+            params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+            try:
+                options = json.loads(params.get("options") or "{}")
+            except ValueError as e:
+                self._send_json({"success": False, "error": f"잘못된 옵션: {str(e)}"}, 400)
+                return
+            if not isinstance(options, dict):
+                self._send_json({"success": False, "error": "잘못된 옵션: JSON 객체여야 합니다"}, 400)
+                return
+            result = self._call_handler(binary_handler, params, options, self._read_body())
+            if result is not None:
+                self._send_result(result)
+            return
+
+        routes = {
+            "/detect": self._handle_detect,
+            "/stream/open": self._handle_stream_open,
+            "/stream/frame": self._handle_stream_frame,
+            "/stream/best": self._handle_stream_best,
+            "/stream/close": self._handle_stream_close,
+        }
+        handler = routes.get(parsed.path)
+        if handler is None:
+            self._send_json({"success": False, "error": "알 수 없는 경로"}, 404)
+            return
+
+        try:
+            request = self._read_json()
+        except ValueError as e:
+            self._send_json({"success": False, "error": f"잘못된 요청: {str(e)}"}, 400)
+            return
+        if not isinstance(request, dict) or not isinstance(request.get("options") or {}, dict):
+            self._send_json({"success": False, "error": "잘못된 요청: 요청과 options는 JSON 객체여야 합니다"}, 400)
+            return
+
+        result = self._call_handler(handler, request)
+        if result is not None:
+            self._send_json(result)
+
+    def _call_handler(self, handler, *args):
+        """
+        핸들러 실행 (JSON/바이너리 경로 공용), 예외는 오류 응답으로 보내고 None 반환
+        ValueError (예: 지원하지 않는 model_complexity)는 400, 그래프 생성 실패 등은 500
+        (연결을 끊지 않고 오류 응답)
+        """
+        try:
+            return handler(*args)
+        except ValueError as e:
+            self._send_json({"success": False, "error": f"잘못된 요청: {str(e)}"}, 400)
+        except Exception as e:
+            self._send_json({"success": False, "error": str(e)}, 500)
+        return None
+
+    def _handle_detect(self, request):
+        with self.server.detector_lock:
+            return handle_request(
+                self.server.detector,
+                request.get("mode", "file"),
+                request.get("input", ""),
+                request.get("output", ""),
+                request.get("options")
+            )
+
+    def _handle_detect_binary(self, params, options, image_data):
+        with self.server.detector_lock:
+            return handle_request(
+                self.server.detector,
+                "bytes",
+                image_data,
+                params.get("output") or None,
+                options,
+                skeleton_encoding=self._skeleton_encoding()
+            )
+
+    def _handle_pipeline(self, params, options, image_data):
+        # 쿼리: prompt, output (스켈레톤 경로), image_output (생성 이미지 경로), options
+        if not params.get("prompt") or not params.get("output") or not params.get("image_output"):
+            return {"success": False, "error": "prompt, output, image_output이 필요합니다"}
+        return self.server.pipeline.run_options(
+            image_data, params["prompt"], params["output"], params["image_output"], options
+        )
+
+    def _handle_stream_frame_binary(self, params, options, image_data):
+        image = decode_image_bytes(image_data)
+        if image is None:
+            return {"success": False, "error": "프레임을 디코딩할 수 없습니다"}
+
+        return self.server.detector.push_frame(
+            params.get("session_id", ""),
+            image,
+            params.get("output") or None,
+            draw_hands=options.get("draw_hands", True),
+            draw_face=options.get("draw_face", True),
+            colorful=options.get("colorful", False),
+            skeleton_encoding=self._skeleton_encoding(),
+            skeleton_format=options.get("skeleton_format", "mediapipe"),
+            render=options.get("render", "both"),
+            landmarks_format=options.get("landmarks_format"),
+            output_size=options.get("output_size")
+        )
+
+    def _handle_stream_open(self, request):
+        detector = self.server.detector
+        detector.close_idle_streams(STREAM_IDLE_SECONDS)
+
+        options = request.get("options") or {}
+        session_id = detector.open_stream(
+            request.get("session_id"),
+            model_complexity=options.get("model_complexity"),
+            motion_threshold=options.get("motion_threshold"),
+            empty_threshold=options.get("empty_threshold"),
+            smoothing=options.get("smoothing", True),
+            min_cutoff=options.get("min_cutoff"),
+            beta=options.get("beta")
+        )
+        return {"success": True, "session_id": session_id}
+
+    def _handle_stream_frame(self, request):
+        try:
+            image = decode_frame_base64(request.get("input", ""))
+        except ValueError as e:
+            return {"success": False, "error": str(e)}
+        if image is None:
+            return {"success": False, "error": "프레임을 디코딩할 수 없습니다"}
+
+        options = request.get("options") or {}
+        # 세션별 그래프와 잠금을 쓰므로 다른 세션/정지 이미지 요청과 병렬 처리됨
+        return self.server.detector.push_frame(
+            request.get("session_id", ""),
+            image,
+            request.get("output") or None,
+            draw_hands=options.get("draw_hands", True),
+            draw_face=options.get("draw_face", True),
+            colorful=options.get("colorful", False),
+            skeleton_format=options.get("skeleton_format", "mediapipe"),
+            render=options.get("render", "both"),
+            landmarks_format=options.get("landmarks_format"),
+            output_size=options.get("output_size")
+        )
+
+    def _handle_stream_best(self, request):
+        return self.server.detector.best_stream_frame(
+            request.get("session_id", ""),
+            max_age=request.get("max_age")
+        )
+
+    def _handle_stream_close(self, request):
+        if not self.server.detector.close_stream(request.get("session_id", "")):
+            return {"success": False, "error": "스트림 세션을 찾을 수 없습니다"}
+        return {"success": True}
+
+    def log_message(self, format, *args):
+        # stdout은 JSON 전용이므로 로그는 stderr로
+        sys.stderr.write("[pose_server] " + (format % args) + "\n")
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PORT
+    host = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_HOST
+
+    detector = AdvancedPoseDetector(
+        model_complexity=MODEL_COMPLEXITY_AUTO,
+        min_detection_confidence=0.5
+    )
+
+    # 첫 요청이 모델 로드 비용을 떠안지 않도록 미리 준비
+    detector.warmup()
+
+    server = PoseServer((host, port), detector)
+    sys.stderr.write(f"[pose_server] http://{host}:{port} 에서 대기 중\n")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if server._pipeline is not None:
+            server._pipeline.close()
+        close_graphs()
+
+
+if __name__ == "__main__":
+    main()
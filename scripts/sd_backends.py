@@ -0,0 +1,220 @@
+"""
+여러 SD WebUI 인스턴스 부하 분산
+- config.json의 sd_backends 목록 (없으면 http://localhost:7861 한 대)
+- 백엔드별 동시 요청 수 제한 (max_inflight), 처리 중인 요청이 가장 적은 백엔드로 라우팅
+- 연결 오류가 난 백엔드는 내려간 것으로 표시하고 다른 백엔드로 재시도,
+  백그라운드 상태 확인이 다시 응답하면 복귀
+
+config.json 예:
+    "sd_backends": [
+        {"url": "http://localhost:7861", "max_inflight": 1},
+        {"url": "http://192.168.0.12:7861", "max_inflight": 2}
+    ]
+(문자열만 쓰면 max_inflight 1)
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+import requests
+
+from sd_client import get_session
+
+
+DEFAULT_BACKEND_URL = "http://localhost:7861"
+
+# 상태 확인 간격 (초), 요청 제한 시간
+HEALTH_INTERVAL = 15.0
+HEALTH_TIMEOUT = 2.0
+
+
+class NoBackendAvailable(Exception):
+    """사용 가능한 SD 백엔드가 없음 (모두 내려갔거나 acquire 대기 시간 초과)"""
+
+
+class SDBackend:
+    def __init__(self, url: str, max_inflight=1):
+        self.url = url.rstrip("/")
+        self.max_inflight = max(1, int(max_inflight))
+        self.inflight = 0
+        # 처음에는 살아 있다고 가정 (일회성 CLI가 상태 확인을 기다리지 않도록)
+        self.healthy = True
+        self.last_error = None
+        self.last_checked = None
+
+    @property
+    def session(self) -> requests.Session:
+        return get_session(self.url)
+
+    def to_dict(self) -> Dict:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "inflight": self.inflight,
+            "max_inflight": self.max_inflight,
+            "last_error": self.last_error,
+        }
+
+
+class BackendPool:
+    """
+    SD 백엔드 풀 (프로세스 안의 모든 SDImageGenerator, 워커 스레드가 공유)
+
+    사용법:
+        with pool.lease() as backend:
+            backend.session.post(f"{backend.url}/sdapi/v1/txt2img", ...)
+    """
+
+    def __init__(self, backends: Iterable, health_interval=HEALTH_INTERVAL):
+        """
+        Args:
+            backends: URL 문자열 또는 {"url", "max_inflight"} 딕셔너리 목록
+            health_interval: 백그라운드 상태 확인 간격 (초, 0이면 확인 안 함)
+        """
+        self.backends: List[SDBackend] = []
+        for backend in backends:
+            if isinstance(backend, str):
+                self.backends.append(SDBackend(backend))
+            else:
+                self.backends.append(SDBackend(backend["url"], backend.get("max_inflight", 1)))
+        if not self.backends:
+            self.backends.append(SDBackend(DEFAULT_BACKEND_URL))
+
+        self.health_interval = health_interval
+        self._condition = threading.Condition()
+        self._health_thread: Optional[threading.Thread] = None
+
+    @property
+    def capacity(self) -> int:
+        """전체 동시 처리 가능 수 (max_inflight 합)"""
+        return sum(backend.max_inflight for backend in self.backends)
+
+    def acquire(self, exclude: Iterable[SDBackend] = (), timeout: Optional[float] = None) -> SDBackend:
+        """
+        처리 중인 요청 비율(inflight / max_inflight)이 가장 낮은 백엔드 하나를 잡음
+        모두 가득 차 있으면 release될 때까지 대기
+
+        Args:
+            exclude: 이번 요청에서 이미 실패한 백엔드
+            timeout: 최대 대기 시간 (None이면 무한)
+
+        Raises:
+            NoBackendAvailable: 살아 있는 백엔드가 없거나 대기 시간 초과
+        """
+        self._start_health_checks()
+        excluded = set(id(backend) for backend in exclude)
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        # 모두 내려가 있으면 다음 주기 상태 확인을 기다리지 않고 한 번 직접 확인
+        if not any(b.healthy for b in self.backends if id(b) not in excluded):
+            for backend in self.backends:
+                if id(backend) not in excluded:
+                    self.check(backend)
+
+        with self._condition:
+            while True:
+                candidates = [
+                    backend for backend in self.backends
+                    if backend.healthy and id(backend) not in excluded
+                ]
+                if not candidates:
+                    raise NoBackendAvailable("사용 가능한 SD 백엔드가 없습니다")
+
+                available = [b for b in candidates if b.inflight < b.max_inflight]
+                if available:
+                    backend = min(available, key=lambda b: b.inflight / b.max_inflight)
+                    backend.inflight += 1
+                    return backend
+
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise NoBackendAvailable("SD 백엔드 대기 시간 초과")
+                self._condition.wait(remaining)
+
+    def release(self, backend: SDBackend):
+        with self._condition:
+            backend.inflight = max(0, backend.inflight - 1)
+            self._condition.notify_all()
+
+    @contextmanager
+    def lease(self, exclude: Iterable[SDBackend] = (), timeout: Optional[float] = None):
+        backend = self.acquire(exclude, timeout)
+        try:
+            yield backend
+        finally:
+            self.release(backend)
+
+    def mark_down(self, backend: SDBackend, error: str):
+        """연결 오류가 난 백엔드를 라우팅에서 제외 (상태 확인이 성공하면 복귀)"""
+        with self._condition:
+            backend.healthy = False
+            backend.last_error = error
+            # 이 백엔드를 기다리던 요청이 다른 백엔드를 고르거나 실패하도록
+            self._condition.notify_all()
+
+    def check(self, backend: SDBackend) -> bool:
+        """백엔드 하나 상태 확인 (진행 상황 API는 생성 중에도 바로 응답함)"""
+        try:
+            response = backend.session.get(
+                f"{backend.url}/sdapi/v1/progress",
+                params={"skip_current_image": "true"},
+                timeout=HEALTH_TIMEOUT
+            )
+            response.raise_for_status()
+            healthy, error = True, None
+        except requests.exceptions.RequestException as e:
+            healthy, error = False, str(e)
+
+        with self._condition:
+            backend.healthy = healthy
+            backend.last_error = error
+            backend.last_checked = time.time()
+            if healthy:
+                self._condition.notify_all()
+        return healthy
+
+    def check_all(self) -> List[Dict]:
+        """모든 백엔드 상태 확인 후 상태 목록 반환"""
+        for backend in self.backends:
+            self.check(backend)
+        return self.status()
+
+    def status(self) -> List[Dict]:
+        with self._condition:
+            return [backend.to_dict() for backend in self.backends]
+
+    def _start_health_checks(self):
+        if self.health_interval <= 0 or self._health_thread is not None:
+            return
+        with self._condition:
+            if self._health_thread is not None:
+                return
+            self._health_thread = threading.Thread(
+                target=self._health_loop, name="sd-health", daemon=True
+            )
+            self._health_thread.start()
+
+    def _health_loop(self):
+        while True:
+            time.sleep(self.health_interval)
+            for backend in self.backends:
+                self.check(backend)
+
+
+_POOLS: Dict[tuple, BackendPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(backends: Iterable) -> BackendPool:
+    """같은 백엔드 구성은 프로세스 안에서 풀 하나를 공유 (inflight 집계가 생성기마다 나뉘지 않도록)"""
+    key = tuple(
+        (b, 1) if isinstance(b, str) else (b["url"], b.get("max_inflight", 1))
+        for b in backends
+    ) or ((DEFAULT_BACKEND_URL, 1),)
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = BackendPool([{"url": url, "max_inflight": n} for url, n in key])
+            _POOLS[key] = pool
+        return pool
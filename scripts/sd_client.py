@@ -0,0 +1,288 @@
+"""
+SD WebUI HTTP 클라이언트 공용 부분
+- 주소별 requests.Session 공유 (keep-alive 연결 풀, 장기 실행 워커에서 재사용)
+- txt2img 응답 스트리밍 파싱: images 배열의 base64를 받는 즉시 파일로 디코딩
+  (응답 전체, JSON 객체, 디코딩된 이미지를 메모리에 동시에 올리지 않음)
+- 생성 중 진행 상황 조회 (/sdapi/v1/progress: 진행률, 남은 시간, 중간 미리보기)
+"""
+import binascii
+import re
+import threading
+from typing import Callable, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# 연결 풀 크기 (워커 스레드 + 진행 상황 조회 등 동시 요청 수보다 크게)
+POOL_MAXSIZE = 8
+
+# 응답 읽기 단위
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# 진행 상황 조회 간격 (초)
+PROGRESS_INTERVAL = 1.0
+
+_SESSIONS: Dict[str, requests.Session] = {}
+_SESSIONS_LOCK = threading.Lock()
+
+
+def get_session(api_url: str) -> requests.Session:
+    """주소별 공유 세션 (처음 호출 시 생성)"""
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(api_url)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _SESSIONS[api_url] = session
+        return session
+
+
+def close_sessions():
+    with _SESSIONS_LOCK:
+        for session in _SESSIONS.values():
+            session.close()
+        _SESSIONS.clear()
+
+
+# 문자열 본문 (이스케이프 포함, 닫는 따옴표 전까지), 문자열 밖: 다음 구조 문자
+_STRING_BODY = re.compile(rb'(?:[^"\\]|\\.)*', re.DOTALL)
+_STRUCTURAL = re.compile(rb'[{}\[\]:,"]')
+
+
+class ImageStreamWriter:
+    """
+    txt2img 응답 JSON을 조각 단위로 받아 최상위 "images" 배열의 문자열을
+    output_paths에 순서대로 base64 디코딩해 저장
+
+    나머지 값 (parameters, info 등)은 읽고 버림.
+    output_paths보다 많은 이미지 (ControlNet 감지 맵 등)는 저장하지 않음
+    """
+
+    def __init__(self, output_paths: List[str]):
+        self.output_paths = list(output_paths)
+        self.image_count = 0  # 끝까지 받은 이미지 수
+
+        self._stack = []  # 열린 컨테이너 ('{' 또는 '[')
+        self._expect_key = False
+        self._last_key = None  # 최상위 객체의 마지막 키
+        self._images_depth = None  # images 배열이 열린 깊이
+
+        self._in_string = False
+        self._escape = False
+        self._string_role = None  # "key", "image" 또는 None (버림)
+        self._key_buffer = bytearray()
+        self._file = None
+        self._base64_rest = b""
+
+    def feed(self, data: bytes):
+        i = 0
+        n = len(data)
+        while i < n:
+            if self._in_string:
+                i = self._feed_string(data, i, n)
+                continue
+
+            match = _STRUCTURAL.search(data, i)
+            if match is None:
+                return
+            i = match.end()
+            self._structural(data[match.start():i])
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _feed_string(self, data: bytes, i: int, n: int) -> int:
+        if self._escape:
+            # 이전 조각 끝에서 잘린 이스케이프
+            self._escape = False
+            self._string_data(_unescape(b"\\" + data[i:i + 1]))
+            return i + 1
+
+        # 대부분의 응답은 이스케이프가 없으므로 다음 따옴표까지 바로 찾고,
+        # 그 사이에 역슬래시가 있을 때만 정규식으로 문자열 끝을 찾음
+        end = data.find(b'"', i)
+        if end < 0:
+            end = n
+        if data.find(b"\\", i, end) >= 0:
+            end = _STRING_BODY.match(data, i).end()
+
+        if end > i:
+            self._string_data(_unescape(data[i:end]))
+        if end >= n:
+            return n
+
+        if data[end:end + 1] == b'"':
+            self._end_string()
+        else:
+            # 조각 마지막 바이트가 역슬래시
+            self._escape = True
+        return end + 1
+
+    def _structural(self, char: bytes):
+        if char == b'"':
+            self._start_string()
+        elif char in (b"{", b"["):
+            if (char == b"[" and len(self._stack) == 1 and self._last_key == b"images"
+                    and not self._expect_key):
+                self._images_depth = 2
+            self._stack.append(char)
+            self._expect_key = char == b"{"
+        elif char in (b"}", b"]"):
+            if self._stack:
+                self._stack.pop()
+            if self._images_depth is not None and len(self._stack) < self._images_depth:
+                self._images_depth = None
+            self._expect_key = False
+        elif char == b":":
+            self._expect_key = False
+        elif char == b",":
+            self._expect_key = bool(self._stack) and self._stack[-1] == b"{"
+
+    def _start_string(self):
+        self._in_string = True
+        if self._stack and self._stack[-1] == b"{" and self._expect_key:
+            self._string_role = "key"
+            self._key_buffer.clear()
+        elif self._images_depth is not None and len(self._stack) == self._images_depth:
+            index = self.image_count
+            if index < len(self.output_paths):
+                self._string_role = "image"
+                self._file = open(self.output_paths[index], 'wb')
+                self._base64_rest = b""
+            else:
+                self._string_role = "extra_image"
+        else:
+            self._string_role = None
+
+    def _string_data(self, chunk: bytes):
+        if self._string_role == "key":
+            self._key_buffer += chunk
+        elif self._string_role == "image":
+            data = self._base64_rest + chunk
+            usable = len(data) - len(data) % 4
+            if usable:
+                self._file.write(binascii.a2b_base64(data[:usable]))
+            self._base64_rest = data[usable:]
+
+    def _end_string(self):
+        self._in_string = False
+        role = self._string_role
+        self._string_role = None
+
+        if role == "key":
+            if len(self._stack) == 1:
+                self._last_key = bytes(self._key_buffer)
+        elif role == "image":
+            if self._base64_rest:
+                self._file.write(binascii.a2b_base64(self._base64_rest))
+                self._base64_rest = b""
+            self.close()
+            self.image_count += 1
+        elif role == "extra_image":
+            self.image_count += 1
+
+
+def _unescape(segment: bytes) -> bytes:
+    # base64에 나올 수 있는 이스케이프는 "\/"뿐 (다른 이스케이프는 키 비교에만 쓰이므로 그대로 둠)
+    return segment.replace(b"\\/", b"/") if b"\\" in segment else segment
+
+
+def stream_images(response: requests.Response, output_paths: List[str]) -> int:
+    """
+    스트리밍 응답의 images를 output_paths에 저장
+
+    Returns:
+        응답에 있던 이미지 수 (output_paths보다 많을 수 있음)
+    """
+    writer = ImageStreamWriter(output_paths)
+    try:
+        for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+            writer.feed(chunk)
+    finally:
+        writer.close()
+    return writer.image_count
+
+
+class ProgressPoller:
+    """
+    txt2img 호출 동안 별도 스레드에서 /sdapi/v1/progress를 주기적으로 조회해 callback 호출
+
+    callback 인자: {"progress": 0~1, "eta": 남은 초, "step": 현재 스텝, "steps": 전체 스텝,
+                   "preview": 중간 미리보기 PNG base64 (WebUI 라이브 미리보기가 꺼져 있으면 None)}
+    SD WebUI는 진행 상황을 하나만 제공하므로 같은 서버에 동시에 여러 생성을 보내면
+    실제로 실행 중인 생성의 진행률이 보고됨
+
+    사용법:
+        with ProgressPoller(session, api_url, callback):
+            session.post(txt2img ...)
+    """
+
+    def __init__(self, session: requests.Session, api_url: str,
+                 callback: Callable[[Dict], None], interval=PROGRESS_INTERVAL):
+        self.session = session
+        self.endpoint = f"{api_url}/sdapi/v1/progress"
+        self.callback = callback
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_preview = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sd-progress", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def poll(self) -> Optional[Dict]:
+        """진행 상황 한 번 조회 (실패하면 None)"""
+        try:
+            response = self.session.get(
+                self.endpoint, params={"skip_current_image": "false"}, timeout=5
+            )
+            response.raise_for_status()
+            data = response.json()
+        except (requests.exceptions.RequestException, ValueError):
+            return None
+
+        state = data.get("state") or {}
+        preview = data.get("current_image")
+        # 미리보기는 스텝마다 바뀌지 않을 수 있으므로 같은 이미지는 다시 넘기지 않음
+        if preview == self._last_preview:
+            preview = None
+        else:
+            self._last_preview = preview
+        return {
+            "progress": float(data.get("progress") or 0.0),
+            "eta": float(data.get("eta_relative") or 0.0),
+            "step": state.get("sampling_step"),
+            "steps": state.get("sampling_steps"),
+            "preview": preview,
+        }
+
+    def _run(self):
+        # 요청 직후에는 이전 생성의 값이 남아 있을 수 있으므로 한 간격 뒤부터 조회
+        while not self._stop.wait(self.interval):
+            progress = self.poll()
+            if progress is None or progress["progress"] <= 0:
+                continue
+            try:
+                self.callback(progress)
+            except Exception:
+                # 진행 상황 기록 실패가 생성을 중단시키지 않도록
+                pass
@@ -0,0 +1,184 @@
+"""
+스켈레톤 렌더러
+- 랜드마크 배열 (N, 5)과 미리 계산한 연결 인덱스 배열로 그리기
+- 연결선은 색상별로 cv2.polylines 한 번에, 관절은 정수 좌표로 cv2.circle
+- 해상도별 캔버스를 재사용 (스레드별)
+
+mp_drawing.draw_landmarks와 같은 규칙으로 그림:
+- 좌표가 [0, 1] 범위를 벗어난 랜드마크는 생략
+- 포즈 랜드마크는 visibility < 0.5이면 생략, presence가 있으면 presence < 0.5도 생략
+  (Holistic/Pose 출력은 presence 필드를 채우지 않아 배열에서는 0, 이때는 적용하지 않음)
+- 관절은 테두리 원(224, 224, 224) 위에 색상 원
+"""
+import threading
+from typing import Dict, Optional, Tuple
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+
+VISIBILITY_THRESHOLD = 0.5
+PRESENCE_THRESHOLD = 0.5
+BORDER_COLOR = (224, 224, 224)
+
+
+def connection_array(connections) -> np.ndarray:
+    """MediaPipe 연결 집합을 (K, 2) 인덱스 배열로 변환 (순서 고정)"""
+    return np.array(sorted(connections), dtype=np.intp).reshape(-1, 2)
+
+
+class PartStyle:
+    """부위별 그리기 스타일 (연결선 + 관절)"""
+
+    def __init__(self, line_color, line_thickness, point_colors=None,
+                 point_radius=0, point_thickness=0):
+        """
+        Args:
+            line_color: 연결선 색상 (BGR)
+            line_thickness: 연결선 두께
+            point_colors: 관절 색상 (단일 색상 또는 랜드마크별 (N, 3) 배열), None이면 관절 생략
+            point_radius: 관절 반지름
+            point_thickness: 관절 선 두께
+        """
+        self.line_color = line_color
+        self.line_thickness = line_thickness
+        self.point_colors = point_colors
+        self.point_radius = point_radius
+        self.point_thickness = point_thickness
+        self.border_radius = max(point_radius + 1, int(point_radius * 1.2))
+
+
+# 기본 포즈 스타일의 왼쪽/오른쪽 랜드마크 (나머지: 코)
+POSE_LANDMARKS_LEFT = [1, 2, 3, 7, 9, 11, 13, 15, 17, 19, 21, 23, 25, 27, 29, 31]
+POSE_LANDMARKS_RIGHT = [4, 5, 6, 8, 10, 12, 14, 16, 18, 20, 22, 24, 26, 28, 30, 32]
+
+
+def _pose_point_colors() -> np.ndarray:
+    """기본 포즈 스타일 (왼쪽=주황, 오른쪽=청록, 코=흰색)"""
+    colors = np.tile(np.array(BORDER_COLOR, dtype=np.int32), (33, 1))
+    colors[POSE_LANDMARKS_LEFT] = (0, 138, 255)
+    colors[POSE_LANDMARKS_RIGHT] = (231, 217, 0)
+    return colors
+
+
+class SkeletonRenderer:
+    """
+    랜드마크 배열 기반 스켈레톤 렌더러
+
+    render()가 반환하는 캔버스는 같은 스레드의 다음 render() 호출에서 재사용되므로,
+    계속 보관하려면 복사해야 함
+    """
+
+    def __init__(self):
+        holistic = mp.solutions.holistic
+        self.connections = {
+            "pose": connection_array(holistic.POSE_CONNECTIONS),
+            "left_hand": connection_array(holistic.HAND_CONNECTIONS),
+            "right_hand": connection_array(holistic.HAND_CONNECTIONS),
+            "face": connection_array(holistic.FACEMESH_CONTOURS),
+        }
+
+        # 컬러 스켈레톤 (OpenPose 스타일)
+        self.colorful_styles = {
+            "pose": PartStyle(BORDER_COLOR, 2, _pose_point_colors(), 2, 2),
+            "left_hand": PartStyle((255, 100, 100), 2, (255, 0, 0), 2, 2),
+            "right_hand": PartStyle((100, 255, 100), 2, (0, 255, 0), 2, 2),
+            "face": PartStyle((80, 110, 255), 1),
+        }
+
+        # ControlNet용 흰색 스켈레톤
+        self.white_styles = {
+            "pose": PartStyle((255, 255, 255), 2, (255, 255, 255), 3, 3),
+            "left_hand": PartStyle((255, 255, 255), 2, (255, 255, 255), 3, 3),
+            "right_hand": PartStyle((255, 255, 255), 2, (255, 255, 255), 3, 3),
+            "face": PartStyle((255, 255, 255), 1),
+        }
+
+        self._local = threading.local()
+
+    def canvas(self, height: int, width: int) -> np.ndarray:
+        """해상도별 검은 캔버스 (스레드별로 재사용, 매번 0으로 초기화)"""
+        canvases = getattr(self._local, "canvases", None)
+        if canvases is None:
+            canvases = self._local.canvases = {}
+
+        canvas = canvases.get((height, width))
+        if canvas is None:
+            canvas = np.zeros((height, width, 3), dtype=np.uint8)
+            canvases[(height, width)] = canvas
+        else:
+            canvas.fill(0)
+        return canvas
+
+    def render(self, landmarks: Dict[str, Optional[np.ndarray]], height: int, width: int,
+               draw_pose=True, draw_hands=True, draw_face=True, colorful=False) -> np.ndarray:
+        """재사용 캔버스에 스켈레톤 그리기"""
+        return self.draw(self.canvas(height, width), landmarks,
+                         draw_pose=draw_pose, draw_hands=draw_hands,
+                         draw_face=draw_face, colorful=colorful)
+
+    def draw(self, image: np.ndarray, landmarks: Dict[str, Optional[np.ndarray]],
+             draw_pose=True, draw_hands=True, draw_face=True, colorful=False) -> np.ndarray:
+        """
+        이미지 위에 스켈레톤 그리기
+
+        Args:
+            image: 그릴 이미지 (BGR, 제자리 수정)
+            landmarks: extract_landmark_arrays() 결과
+        """
+        styles = self.colorful_styles if colorful else self.white_styles
+        enabled = {
+            "pose": draw_pose,
+            "left_hand": draw_hands,
+            "right_hand": draw_hands,
+            "face": draw_face,
+        }
+
+        for part, style in styles.items():
+            array = landmarks.get(part)
+            if enabled[part] and array is not None:
+                self._draw_part(image, array, self.connections[part], style,
+                                check_visibility=(part == "pose"))
+
+        return image
+
+    def _draw_part(self, image: np.ndarray, array: np.ndarray, connections: np.ndarray,
+                   style: PartStyle, check_visibility: bool):
+        height, width = image.shape[:2]
+        points, valid = self._to_pixels(array, width, height, check_visibility)
+
+        if len(connections):
+            connected = valid[connections[:, 0]] & valid[connections[:, 1]]
+            if connected.any():
+                segments = points[connections[connected]]
+                cv2.polylines(image, segments, False, style.line_color, style.line_thickness)
+
+        if style.point_colors is None:
+            return
+
+        indices = np.flatnonzero(valid)
+        per_point = isinstance(style.point_colors, np.ndarray)
+        for index, (x, y) in zip(indices.tolist(), points[indices].tolist()):
+            color = tuple(style.point_colors[index].tolist()) if per_point else style.point_colors
+            cv2.circle(image, (x, y), style.border_radius, BORDER_COLOR, style.point_thickness)
+            cv2.circle(image, (x, y), style.point_radius, color, style.point_thickness)
+
+    @staticmethod
+    def _to_pixels(array: np.ndarray, width: int, height: int,
+                   check_visibility: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """정규화 좌표 → 픽셀 좌표 (int32) + 그릴 수 있는 랜드마크 마스크"""
+        # MediaPipe와 같은 반올림 결과를 위해 float64로 계산
+        xy = array[:, :2].astype(np.float64)
+        valid = np.all((xy >= -1e-9) & (xy <= 1 + 1e-9), axis=1)
+        if check_visibility:
+            # mp_drawing은 visibility/presence 필드가 있는 랜드마크(포즈)에 둘 다 적용
+            valid &= array[:, 3] >= VISIBILITY_THRESHOLD
+            presence = array[:, 4]
+            if presence.any():
+                valid &= presence >= PRESENCE_THRESHOLD
+
+        points = np.empty((len(array), 2), dtype=np.int32)
+        points[:, 0] = np.minimum(np.floor(xy[:, 0] * width), width - 1)
+        points[:, 1] = np.minimum(np.floor(xy[:, 1] * height), height - 1)
+        return points, valid
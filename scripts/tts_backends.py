@@ -0,0 +1,220 @@
+"""
+TTS 백엔드
+- ElevenLabsBackend: ElevenLabs API (MP3, 네트워크 필요, 글자 수 과금)
+- PiperBackend: 로컬 Piper ONNX 음성 (WAV, 오프라인, download_tts_model.py로 받은 models/tts)
+
+config.json:
+    "tts_backend": "elevenlabs" 또는 "piper" (기본 elevenlabs)
+    "piper_model": models/tts 안의 음성 이름 또는 .onnx 경로 (기본 en_US-lessac-medium)
+        기본 음성은 영어 전용이므로 한국어 답변을 읽으려면 한국어를 지원하는 Piper 음성으로 바꿔야 함
+
+각 백엔드 라이브러리는 실제로 쓸 때만 import (설치되지 않은 백엔드가 다른 백엔드를 막지 않도록)
+"""
+import os
+import struct
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+
+MODEL_DIR = Path(__file__).parent.parent / "models" / "tts"
+DEFAULT_PIPER_MODEL = "en_US-lessac-medium"
+
+# 'Rachel' 음성 사용 (감정 표현 우수, 다국어 지원)
+ELEVENLABS_VOICE_ID = "21m00Tcm4TlvDq8ikWAM"  # Rachel 음성 ID
+ELEVENLABS_MODEL_ID = "eleven_multilingual_v2"  # 다국어 모델 (한국어 지원)
+ELEVENLABS_VOICE_SETTINGS = {
+    "stability": 0.5,  # 안정성 (0.0-1.0)
+    "similarity_boost": 0.75,  # 유사성 강화
+    "style": 0.5,  # 스타일 강도
+    "use_speaker_boost": True  # 화자 부스트
+}
+
+# 스트리밍 WAV 헤더의 길이 필드 (끝을 모를 때 최댓값, 완성된 파일은 finalize에서 수정)
+WAV_HEADER_SIZE = 44
+WAV_UNKNOWN_SIZE = 0xFFFFFFFF
+
+
+class TTSBackend(ABC):
+    """
+    TTS 백엔드 인터페이스 (available, cache_params, stream을 모두 구현해야 생성 가능)
+
+    stream()은 컨테이너(MP3/WAV 헤더 포함)까지 인코딩된 음성 조각을 반환하며,
+    조각을 이어 붙이면 재생 가능한 파일이 됨 (finalize로 마무리)
+    """
+    name = ""
+    content_type = "application/octet-stream"
+    suffix = ""
+
+    @abstractmethod
+    def available(self) -> Tuple[bool, Optional[str]]:
+        """(사용 가능 여부, 불가능한 이유)"""
+
+    @abstractmethod
+    def cache_params(self) -> Dict:
+        """캐시 키에 들어갈 음성 설정 (문장 외에 결과를 바꾸는 값 전체)"""
+
+    @abstractmethod
+    def stream(self, text: str) -> Iterator[bytes]:
+        """text를 합성해 인코딩된 음성 조각을 순서대로 반환"""
+
+    def finalize(self, path):
+        """stream() 조각을 끝까지 쓴 파일 마무리 (기본: 없음)"""
+
+
+class ElevenLabsBackend(TTSBackend):
+    name = "elevenlabs"
+    content_type = "audio/mpeg"
+    suffix = ".mp3"
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+        self._client = None
+        self._error = None
+
+        if not api_key:
+            self._error = "API 키가 설정되지 않았습니다. config.json에 elevenlabs_api_key를 추가하세요."
+            return
+        try:
+            from elevenlabs import VoiceSettings
+            from elevenlabs.client import ElevenLabs
+        except ImportError:
+            self._error = "ElevenLabs가 설치되지 않았습니다. 'pip install elevenlabs'를 실행하세요."
+            return
+        self._voice_settings = VoiceSettings
+        self._client = ElevenLabs(api_key=api_key)
+
+    def available(self):
+        return self._client is not None, self._error
+
+    def cache_params(self):
+        # 백엔드 도입 전 캐시 항목과 같은 키가 되도록 backend 이름은 넣지 않음
+        return {
+            "voice_id": ELEVENLABS_VOICE_ID,
+            "model_id": ELEVENLABS_MODEL_ID,
+            "voice_settings": ELEVENLABS_VOICE_SETTINGS,
+        }
+
+    def stream(self, text):
+        return self._client.text_to_speech.convert(
+            voice_id=ELEVENLABS_VOICE_ID,
+            text=text,
+            model_id=ELEVENLABS_MODEL_ID,
+            voice_settings=self._voice_settings(**ELEVENLABS_VOICE_SETTINGS)
+        )
+
+
+class PiperBackend(TTSBackend):
+    """
+    로컬 Piper 음성
+    ONNX 모델은 처음 합성할 때 한 번 로드해 프로세스(tts_server.py)가 살아 있는 동안 유지.
+    문장 단위로 합성해 문장이 끝날 때마다 PCM 조각을 내보냄 (WAV 헤더 + 16bit PCM)
+    """
+    name = "piper"
+    content_type = "audio/wav"
+    suffix = ".wav"
+
+    def __init__(self, model: Optional[str] = None, speaker_id: Optional[int] = None):
+        model = model or DEFAULT_PIPER_MODEL
+        model_path = Path(model)
+        if model_path.suffix != ".onnx":
+            model_path = MODEL_DIR / f"{model}.onnx"
+        self.model_path = model_path
+        self.config_path = model_path.with_name(model_path.name + ".json")
+        self.speaker_id = speaker_id
+
+        self._voice = None
+        self._load_lock = threading.Lock()
+        # onnxruntime 세션을 여러 요청이 동시에 돌리지 않도록 문장 단위로 직렬화
+        self._synthesis_lock = threading.Lock()
+
+    def available(self):
+        if not self.model_path.exists():
+            return False, f"Piper 모델이 없습니다: {self.model_path} (download_tts_model.py 실행)"
+        try:
+            import piper  # noqa: F401
+        except ImportError:
+            return False, "Piper가 설치되지 않았습니다. 'pip install piper-tts'를 실행하세요."
+        return True, None
+
+    def cache_params(self):
+        return {
+            "backend": self.name,
+            "model": self.model_path.name,
+            "speaker_id": self.speaker_id,
+        }
+
+    @property
+    def voice(self):
+        with self._load_lock:
+            if self._voice is None:
+                from piper.voice import PiperVoice
+                self._voice = PiperVoice.load(str(self.model_path), config_path=str(self.config_path))
+            return self._voice
+
+    def _sentences(self, voice, text) -> Iterator[Tuple[bytes, int]]:
+        """문장별 (16bit 모노 PCM, 샘플레이트)"""
+        if hasattr(voice, "synthesize_stream_raw"):
+            # piper-tts 1.2
+            sample_rate = voice.config.sample_rate
+            for audio in voice.synthesize_stream_raw(text, speaker_id=self.speaker_id):
+                yield audio, sample_rate
+        else:
+            # piper-tts 1.3+: AudioChunk 반환
+            syn_config = None
+            if self.speaker_id is not None:
+                from piper import SynthesisConfig
+                syn_config = SynthesisConfig(speaker_id=self.speaker_id)
+            for chunk in voice.synthesize(text, syn_config=syn_config):
+                yield chunk.audio_int16_bytes, chunk.sample_rate
+
+    def stream(self, text):
+        voice = self.voice
+        sentences = self._sentences(voice, text)
+        header_sent = False
+        while True:
+            with self._synthesis_lock:
+                item = next(sentences, None)
+            if item is None:
+                break
+            audio, sample_rate = item
+            if not header_sent:
+                yield wav_header(sample_rate)
+                header_sent = True
+            yield audio
+
+    def finalize(self, path):
+        fix_wav_sizes(path)
+
+
+def wav_header(sample_rate: int, channels=1, sample_width=2, data_size=WAV_UNKNOWN_SIZE) -> bytes:
+    """PCM WAV 헤더 (data_size를 모르면 최댓값, 브라우저는 스트림 끝까지 재생)"""
+    riff_size = WAV_UNKNOWN_SIZE if data_size == WAV_UNKNOWN_SIZE else data_size + WAV_HEADER_SIZE - 8
+    byte_rate = sample_rate * channels * sample_width
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", riff_size, b"WAVE",
+        b"fmt ", 16, 1, channels, sample_rate, byte_rate, channels * sample_width, sample_width * 8,
+        b"data", data_size
+    )
+
+
+def fix_wav_sizes(path):
+    """스트리밍 헤더로 쓴 WAV 파일의 길이 필드를 실제 크기로 수정"""
+    size = os.path.getsize(path)
+    if size < WAV_HEADER_SIZE:
+        return
+    with open(path, 'r+b') as f:
+        f.seek(4)
+        f.write(struct.pack("<I", size - 8))
+        f.seek(40)
+        f.write(struct.pack("<I", size - WAV_HEADER_SIZE))
+
+
+def get_backend(config: Dict) -> TTSBackend:
+    """config.json의 tts_backend에 따라 백엔드 생성"""
+    backend = config.get('tts_backend', 'elevenlabs')
+    if backend == 'piper':
+        return PiperBackend(config.get('piper_model'), config.get('piper_speaker_id'))
+    return ElevenLabsBackend(config.get('elevenlabs_api_key') or os.getenv('ELEVENLABS_API_KEY', ''))
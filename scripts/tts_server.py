@@ -0,0 +1,193 @@
+"""
+TTS 스트리밍 서버
+- TTSService를 한 번만 로드하고 로컬 HTTP로 요청 처리
+  (Piper 백엔드면 ONNX 음성이 프로세스가 살아 있는 동안 메모리에 유지됨)
+- 음성을 전부 합성할 때까지 기다리지 않고 받는 조각마다 chunked 응답으로 전달
+  (브라우저는 첫 조각부터 재생 시작)
+
+사용법: python tts_server.py [port] [host]
+
+GET  /tts?text=...&no_cache=1   → audio/mpeg 또는 audio/wav (백엔드에 따라, chunked)
+POST /tts {"text": "...", "no_cache": false}
+POST /chat {"message": "...", "model": "phi3:mini", "no_cache": false}
+     → application/x-ndjson (chunked): 답변 조각 + 문장별 음성 이벤트 (chat_speech.py 참고)
+GET  /health
+"""
+import sys
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from chat_speech import ChatSpeech, DEFAULT_MODEL as DEFAULT_CHAT_MODEL
+from tts_service import TTSService
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 7880
+
+
+class TTSServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, tts: TTSService):
+        super().__init__(address, TTSRequestHandler)
+        self.tts = tts
+        self.stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "streaming": 0, "errors": 0}
+        # 챗봇 답변 → 음성 파이프라인 (같은 TTSService를 써서 음성 모델/캐시 공유)
+        self.chat = ChatSpeech(tts)
+
+    def count(self, key, delta=1):
+        with self.stats_lock:
+            self.stats[key] += delta
+
+
+class TTSRequestHandler(BaseHTTPRequestHandler):
+    server: TTSServer
+    # chunked 전송은 HTTP/1.1에서만 가능
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, result, status=200):
+        body = json.dumps(result, ensure_ascii=True).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if parsed.path == "/health":
+            with self.server.stats_lock:
+                stats = dict(self.server.stats)
+            backend = self.server.tts.backend
+            available, error = backend.available()
+            self._send_json({
+                "success": True,
+                "service": "tts",
+                "backend": backend.name,
+                "available": available,
+                "error": error,
+                "stats": stats
+            })
+        elif parsed.path == "/tts":
+            params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+            self._stream(params.get("text", ""), params.get("no_cache") in ("1", "true"))
+        else:
+            self._send_json({"success": False, "error": "알 수 없는 경로"}, 404)
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        if path not in ("/tts", "/chat"):
+            self._send_json({"success": False, "error": "알 수 없는 경로"}, 404)
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length).decode("utf-8")) if length > 0 else {}
+        except ValueError as e:
+            self._send_json({"success": False, "error": f"잘못된 요청: {str(e)}"}, 400)
+            return
+
+        if path == "/chat":
+            self._chat_speech(request)
+        else:
+            self._stream(request.get("text", ""), bool(request.get("no_cache")))
+
+    def _chat_speech(self, request):
+        message = request.get("message", "").strip()
+        if not message:
+            self._send_json({"success": False, "error": "메시지가 비어있습니다"}, 400)
+            return
+
+        events = self.server.chat.run(
+            message, request.get("model") or DEFAULT_CHAT_MODEL, bool(request.get("no_cache"))
+        )
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        self.server.count("requests")
+        self.server.count("streaming")
+        try:
+            for event in events:
+                self._write_chunk(json.dumps(event, ensure_ascii=True).encode("utf-8") + b"\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # 클라이언트가 떠남: Ollama 요청과 남은 합성 중단
+            pass
+        finally:
+            events.close()
+            self.server.count("streaming", -1)
+
+    def _stream(self, text: str, no_cache: bool):
+        text = text.strip()
+        if not text:
+            self._send_json({"success": False, "error": "텍스트가 비어있습니다"}, 400)
+            return
+
+        self.server.count("requests")
+        audio = self.server.tts.stream(text, no_cache)
+
+        # 첫 조각을 받은 뒤에 헤더를 보내야 합성 실패를 JSON 오류로 돌려줄 수 있음
+        try:
+            first = next(audio, b"")
+        except Exception as e:
+            self.server.count("errors")
+            self._send_json({"success": False, "error": f"음성 생성 실패: {str(e)}"}, 502)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", self.server.tts.content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        self.server.count("streaming")
+        try:
+            if first:
+                self._write_chunk(first)
+            for chunk in audio:
+                if chunk:
+                    self._write_chunk(chunk)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # 클라이언트가 재생을 멈추고 연결을 끊음 (끝까지 받지 않은 음성은 캐시되지 않음)
+            audio.close()
+        except Exception as e:
+            # 헤더를 이미 보냈으므로 연결을 끊어 잘린 응답임을 알림
+            self.server.count("errors")
+            sys.stderr.write(f"[tts_server] 스트리밍 중 오류: {str(e)}\n")
+            self.close_connection = True
+        finally:
+            self.server.count("streaming", -1)
+
+    def log_message(self, format, *args):
+        sys.stderr.write("[tts_server] " + (format % args) + "\n")
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PORT
+    host = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_HOST
+
+    server = TTSServer((host, port), TTSService())
+    sys.stderr.write(f"[tts_server] http://{host}:{port} 에서 대기 중\n")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
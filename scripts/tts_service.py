@@ -1,85 +1,239 @@
 #!/usr/bin/env python3
 """
 TTS (Text-to-Speech) 서비스
-ElevenLabs를 사용하여 감정이 풍부한 음성으로 변환
+ElevenLabs(감정이 풍부한 음성) 또는 로컬 Piper 음성으로 변환 (config.json의 tts_backend, tts_backends.py 참고)
+
+같은 문장 + 백엔드/음성 설정은 outputs/tts/cache에 캐시 (API 호출/비용 없이 바로 재생)
+자주 쓰는 문장은 --prewarm으로 미리 합성해 둘 수 있음
 """
 
 import sys
 import json
 import os
+import uuid
 from pathlib import Path
 
-try:
-    from elevenlabs import VoiceSettings
-    from elevenlabs.client import ElevenLabs
-except ImportError:
-    print(json.dumps({
-        "success": False,
-        "error": "ElevenLabs가 설치되지 않았습니다. 'pip install elevenlabs'를 실행하세요."
-    }))
-    sys.exit(1)
+from content_cache import ContentCache, make_key
+from tts_backends import TTSBackend, get_backend
+
+# 캐시된 음성을 스트리밍할 때 읽기 단위
+STREAM_CHUNK_SIZE = 16 * 1024
+
+AUDIO_URL_PREFIX = "/ai_test_sec/outputs/tts/"
 
 
 class TTSService:
-    def __init__(self):
+    def __init__(self, cache=None, backend: TTSBackend = None):
+        """
+        Args:
+            cache: 음성 캐시 (None이면 outputs/tts/cache, False면 사용 안 함)
+            backend: TTS 백엔드 (None이면 config.json의 tts_backend)
+        """
         self.output_path = Path(__file__).parent.parent / "outputs" / "tts"
         self.output_path.mkdir(parents=True, exist_ok=True)
 
-        # API 키 로드 (환경 변수 또는 설정 파일)
+        # 설정 로드 (API 키는 설정 파일 또는 환경 변수)
+        config = {}
         config_file = Path(__file__).parent.parent / "config.json"
         if config_file.exists():
             with open(config_file, 'r', encoding='utf-8') as f:
                 config = json.load(f)
-                self.api_key = config.get('elevenlabs_api_key', '')
-        else:
-            self.api_key = os.getenv('ELEVENLABS_API_KEY', '')
+        self.config = config
+
+        self.backend = backend or get_backend(config)
 
-        if self.api_key:
-            self.client = ElevenLabs(api_key=self.api_key)
-        else:
-            self.client = None
+        if cache is None:
+            max_mb = config.get('tts_cache_max_mb', 200)
+            cache = ContentCache(self.output_path / "cache", max_bytes=int(max_mb * 1024 * 1024))
+        self.cache = cache or None
 
-    def synthesize(self, text, output_file="output.mp3"):
-        """텍스트를 음성으로 변환"""
+    @property
+    def content_type(self):
+        return self.backend.content_type
+
+    def cache_key(self, text):
+        """음성 결과를 결정하는 값 전체 (문장 + 백엔드의 음성 설정)"""
+        return make_key({"text": text, **self.backend.cache_params()})
+
+    def synthesize(self, text, output_file="output.mp3", no_cache=False):
+        """
+        텍스트를 음성으로 변환
+
+        확장자는 백엔드 형식에 맞춤 (Piper면 output.mp3 → output.wav)
+        캐시에 있으면 합성하지 않고 캐시된 파일을 output_file로 복사
+        (API 키가 없어도 캐시된 문장은 재생 가능)
+        """
         try:
-            if not self.client:
-                return False, "API 키가 설정되지 않았습니다. config.json에 elevenlabs_api_key를 추가하세요.", None
-
-            output_path = self.output_path / output_file
-
-            # ElevenLabs 음성 합성
-            # 'Rachel' 음성 사용 (감정 표현 우수, 다국어 지원)
-            audio = self.client.text_to_speech.convert(
-                voice_id="21m00Tcm4TlvDq8ikWAM",  # Rachel 음성 ID
-                text=text,
-                model_id="eleven_multilingual_v2",  # 다국어 모델 (한국어 지원)
-                voice_settings=VoiceSettings(
-                    stability=0.5,  # 안정성 (0.0-1.0)
-                    similarity_boost=0.75,  # 유사성 강화
-                    style=0.5,  # 스타일 강도
-                    use_speaker_boost=True  # 화자 부스트
-                )
-            )
+            suffix = self.backend.suffix
+            output_path = (self.output_path / output_file).with_suffix(suffix)
+            use_cache = self.cache is not None and not no_cache
+            key = self.cache_key(text) if use_cache else None
+
+            if use_cache and self.cache.restore(key, [str(output_path)], suffix):
+                return True, "음성 생성 완료 (캐시)", str(output_path)
+
+            available, error = self.backend.available()
+            if not available:
+                return False, error, None
 
             # 오디오를 바이트로 변환하여 저장
             with open(output_path, 'wb') as f:
-                for chunk in audio:
-                    if isinstance(chunk, bytes):
-                        f.write(chunk)
-                    else:
-                        f.write(chunk)
+                for chunk in self.backend.stream(text):
+                    f.write(chunk)
+            self.backend.finalize(output_path)
+
+            if use_cache:
+                try:
+                    self.cache.put(key, [str(output_path)], suffix)
+                except OSError:
+                    # 캐시 저장 실패는 결과에 영향 없음
+                    pass
 
             return True, "음성 생성 완료", str(output_path)
         except Exception as e:
             return False, f"음성 생성 실패: {str(e)}", None
 
+    def stream(self, text, no_cache=False):
+        """
+        음성 조각을 받는 대로 반환하는 제너레이터 (tts_server.py 스트리밍용)
+
+        캐시에 있으면 캐시 파일을 조각으로 읽어 반환.
+        없으면 백엔드 조각(Piper는 문장 단위)을 그대로 넘기면서 임시 파일에도 써 두고,
+        끝까지 받은 경우에만 캐시에 저장 (중간에 끊긴 음성은 캐시하지 않음)
+
+        Raises:
+            RuntimeError: 백엔드 사용 불가 (API 키/모델 없음)
+            Exception: 합성 실패 (첫 조각을 받기 전에 발생)
+        """
+        suffix = self.backend.suffix
+        use_cache = self.cache is not None and not no_cache
+        key = self.cache_key(text) if use_cache else None
+
+        if use_cache:
+            cached = self.cache.get(key, 1, suffix)
+            if cached is not None:
+                try:
+                    f = open(cached[0], 'rb')
+                except OSError:
+                    # 확인 직후 다른 프로세스가 삭제한 경우 등은 새로 합성
+                    f = None
+                if f is not None:
+                    with f:
+                        while True:
+                            chunk = f.read(STREAM_CHUNK_SIZE)
+                            if not chunk:
+                                return
+                            yield chunk
+
+        available, error = self.backend.available()
+        if not available:
+            raise RuntimeError(error)
+
+        audio = self.backend.stream(text)
+        temp_path = self.output_path / f".stream_{uuid.uuid4().hex}.tmp" if use_cache else None
+        temp_file = open(temp_path, 'wb') if temp_path else None
+        complete = False
+        try:
+            for chunk in audio:
+                if temp_file:
+                    temp_file.write(chunk)
+                yield chunk
+            complete = True
+        finally:
+            if temp_file:
+                temp_file.close()
+                try:
+                    if complete:
+                        self.backend.finalize(temp_path)
+                        self.cache.put(key, [str(temp_path)], suffix)
+                except OSError:
+                    pass
+                finally:
+                    try:
+                        os.remove(temp_path)
+                    except OSError:
+                        pass
+
+    def prewarm(self, phrases):
+        """
+        문장 목록을 미리 합성해 캐시에 저장 (이미 캐시된 문장은 건너뜀)
+
+        Returns:
+            {"total", "cached", "synthesized", "failed": [{"text", "error"}]}
+        """
+        summary = {"total": 0, "cached": 0, "synthesized": 0, "failed": []}
+        if self.cache is None:
+            summary["failed"] = [{"text": text, "error": "캐시를 사용하지 않습니다"} for text in phrases]
+            return summary
+
+        available, error = self.backend.available()
+        for text in phrases:
+            summary["total"] += 1
+            key = self.cache_key(text)
+            if self.cache.get(key, 1, self.backend.suffix) is not None:
+                summary["cached"] += 1
+                continue
+            if not available:
+                summary["failed"].append({"text": text, "error": error})
+                continue
+            try:
+                # stream()이 끝까지 읽히면 캐시에 저장됨
+                for _ in self.stream(text):
+                    pass
+                summary["synthesized"] += 1
+            except Exception as e:
+                summary["failed"].append({"text": text, "error": str(e)})
+        return summary
+
+
+def audio_url(audio_path):
+    """outputs/tts 안의 음성 파일 웹 경로"""
+    return AUDIO_URL_PREFIX + Path(audio_path).name
+
+
+def load_phrases(source=None, config=None):
+    """
+    미리 합성할 문장 목록
+    source: 한 줄에 한 문장인 텍스트 파일 또는 JSON 배열 파일 (없으면 config.json의 tts_prewarm_phrases)
+    """
+    if source is None:
+        return [p for p in (config or {}).get('tts_prewarm_phrases', []) if p.strip()]
+
+    with open(source, 'r', encoding='utf-8') as f:
+        content = f.read()
+    if content.lstrip().startswith("["):
+        phrases = json.loads(content)
+    else:
+        phrases = content.splitlines()
+    return [p.strip() for p in phrases if p.strip()]
+
 
 def main():
-    """메인 함수"""
+    """
+    메인 함수
+    사용법:
+        python tts_service.py <text> [output_filename] [--no-cache]
+        python tts_service.py --prewarm [phrases_file]
+    """
+    no_cache = "--no-cache" in sys.argv
+    if no_cache:
+        sys.argv.remove("--no-cache")
+
+    if len(sys.argv) >= 2 and sys.argv[1] == "--prewarm":
+        tts = TTSService()
+        try:
+            phrases = load_phrases(sys.argv[2] if len(sys.argv) > 2 else None, tts.config)
+        except (OSError, ValueError) as e:
+            print(json.dumps({"success": False, "error": f"문장 목록을 읽을 수 없습니다: {str(e)}"}, ensure_ascii=True))
+            sys.exit(1)
+        summary = tts.prewarm(phrases)
+        print(json.dumps({"success": not summary["failed"], **summary}, ensure_ascii=True))
+        return
+
     if len(sys.argv) < 2:
         print(json.dumps({
             "success": False,
-            "error": "사용법: python tts_service.py <text> [output_filename]"
+            "error": "사용법: python tts_service.py <text> [output_filename] [--no-cache] | --prewarm [phrases_file]"
         }))
         sys.exit(1)
 
@@ -87,7 +241,7 @@ def main():
     output_file = sys.argv[2] if len(sys.argv) > 2 else "output.mp3"
 
     tts = TTSService()
-    success, message, audio_path = tts.synthesize(text, output_file)
+    success, message, audio_path = tts.synthesize(text, output_file, no_cache)
 
     result = {
         "success": success,
@@ -96,7 +250,7 @@ def main():
 
     if success:
         result["audio_path"] = audio_path
-        result["audio_url"] = f"/ai_test_sec/outputs/tts/{output_file}"
+        result["audio_url"] = audio_url(audio_path)
     else:
         result["error"] = message
 
@@ -7,7 +7,7 @@ Write-Host "========================================" -ForegroundColor Cyan
 Write-Host ""
 
 # 1. Ollama 확인
-Write-Host "[1/3] Ollama 서비스 확인..." -ForegroundColor Yellow
+Write-Host "[1/6] Ollama 서비스 확인..." -ForegroundColor Yellow
 try {
     $ollamaTest = Invoke-WebRequest -Uri "http://localhost:11434/api/tags" -UseBasicParsing -TimeoutSec 5
     Write-Host "  Ollama 실행 중" -ForegroundColor Green
@@ -19,7 +19,7 @@ try {
 Write-Host ""
 
 # 2. Stable Diffusion WebUI 시작
-Write-Host "[2/3] Stable Diffusion WebUI 시작..." -ForegroundColor Yellow
+Write-Host "[2/6] Stable Diffusion WebUI 시작..." -ForegroundColor Yellow
 $sdPath = "C:\xampp\htdocs\ai_test_sec\sd-webui\webui-user.bat"
 
 if (Test-Path $sdPath) {
@@ -34,8 +34,49 @@ if (Test-Path $sdPath) {
 
 Write-Host ""
 
-# 3. Apache 상태 확인
-Write-Host "[3/3] Apache 서비스 확인..." -ForegroundColor Yellow
+# 3. 포즈 감지 데몬 시작
+Write-Host "[3/6] 포즈 감지 데몬 시작..." -ForegroundColor Yellow
+$pythonPath = "C:\xampp\htdocs\ai_test_sec\venv\Scripts\python.exe"
+$poseServer = "C:\xampp\htdocs\ai_test_sec\scripts\pose_server.py"
+
+if (Test-Path $pythonPath) {
+    Start-Process $pythonPath -ArgumentList "`"$poseServer`"" -WindowStyle Minimized
+    Write-Host "  포즈 감지 데몬 시작됨 (http://127.0.0.1:7870)" -ForegroundColor Green
+} else {
+    Write-Host "  Python 가상환경을 찾을 수 없습니다 (포즈 감지는 느린 모드로 동작)" -ForegroundColor Red
+}
+
+Write-Host ""
+
+# 4. 이미지 생성 작업 큐 워커 시작
+Write-Host "[4/6] 이미지 생성 워커 시작..." -ForegroundColor Yellow
+$queueWorker = "C:\xampp\htdocs\ai_test_sec\scripts\generation_queue.py"
+
+if (Test-Path $pythonPath) {
+    # 동시 처리 수는 config.json sd_backends의 max_inflight 합 (없으면 1)
+    Start-Process $pythonPath -ArgumentList "`"$queueWorker`"", "worker" -WindowStyle Minimized
+    Write-Host "  이미지 생성 워커 시작됨" -ForegroundColor Green
+} else {
+    Write-Host "  Python 가상환경을 찾을 수 없습니다 (비동기 이미지 생성 불가)" -ForegroundColor Red
+}
+
+Write-Host ""
+
+# 5. TTS 스트리밍 서버 시작
+Write-Host "[5/6] TTS 스트리밍 서버 시작..." -ForegroundColor Yellow
+$ttsServer = "C:\xampp\htdocs\ai_test_sec\scripts\tts_server.py"
+
+if (Test-Path $pythonPath) {
+    Start-Process $pythonPath -ArgumentList "`"$ttsServer`"" -WindowStyle Minimized
+    Write-Host "  TTS 서버 시작됨 (http://127.0.0.1:7880)" -ForegroundColor Green
+} else {
+    Write-Host "  Python 가상환경을 찾을 수 없습니다 (음성은 전체 합성 후 재생)" -ForegroundColor Red
+}
+
+Write-Host ""
+
+# 6. Apache 상태 확인
+Write-Host "[6/6] Apache 서비스 확인..." -ForegroundColor Yellow
 try {
     $apacheTest = Invoke-WebRequest -Uri "http://localhost/ai_test_sec/" -UseBasicParsing -TimeoutSec 5
     Write-Host "  Apache 실행 중" -ForegroundColor Green
@@ -53,6 +94,8 @@ Write-Host ""
 Write-Host "서비스 URL:" -ForegroundColor Yellow
 Write-Host "  - Ollama API:   http://localhost:11434" -ForegroundColor White
 Write-Host "  - SD WebUI:     http://localhost:7860" -ForegroundColor White
+Write-Host "  - 포즈 데몬:    http://127.0.0.1:7870" -ForegroundColor White
+Write-Host "  - TTS 서버:     http://127.0.0.1:7880" -ForegroundColor White
 Write-Host "  - AI 키오스크:  http://localhost/ai_test_sec/" -ForegroundColor Green
 Write-Host ""
 